@@ -1,12 +1,15 @@
 """
 Dependencias de autenticación para FastAPI
 """
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, get_async_db, SessionLocal
 from app.models.user import User, UserRole
 from app.auth.security import verify_token
+from app.auth.user_cache import get_user_by_username
 from app.schemas.user import TokenData
 
 # Esquema de autenticación
@@ -32,7 +35,7 @@ def get_current_user(
     if username is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
+    user = get_user_by_username(db, username)
     if user is None:
         raise credentials_exception
     
@@ -45,6 +48,73 @@ def get_current_user(
     return user
 
 
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """Usuario actual para endpoints asíncronos (misma validación que get_current_user).
+
+    El token y el usuario suelen salir de sus cachés; si no, la consulta se
+    hace con la sesión asíncrona sin ocupar un hilo del threadpool.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="No se pudieron validar las credenciales",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    if credentials is None:
+        raise credentials_exception
+    
+    username = verify_token(credentials.credentials)
+    if username is None:
+        raise credentials_exception
+    
+    user = await db.run_sync(get_user_by_username, username)
+    if user is None:
+        raise credentials_exception
+    
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Usuario inactivo"
+        )
+    
+    return user
+
+
+def get_stream_user(
+    token: Optional[str] = Query(None, description="Token JWT (EventSource no envía cabeceras)"),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> User:
+    """Usuario para streams SSE: acepta el token por query string.
+
+    Usa una sesión propia que se cierra de inmediato para no retener una
+    conexión del pool durante toda la vida del stream.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="No se pudieron validar las credenciales",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    if not token and credentials is not None:
+        token = credentials.credentials
+    username = verify_token(token) if token else None
+    if username is None:
+        raise credentials_exception
+    
+    db = SessionLocal()
+    try:
+        user = get_user_by_username(db, username)
+    finally:
+        db.close()
+    
+    if user is None or not user.is_active:
+        raise credentials_exception
+    return user
+
+
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Obtener usuario activo actual"""
     if not current_user.is_active:
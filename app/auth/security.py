@@ -2,11 +2,30 @@
 Módulo de seguridad para autenticación JWT y hash de contraseñas
 """
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional
 from jose import JWTError, jwt
 import hashlib
 import os
+import time
+import uuid
+from app.cache import TTLCache
 from app.config import settings
+from app.services.event_bus import event_bus, TOKEN_REVOKED
+
+# Claims ya verificados, por hash del token: un token repetido (la misma tableta
+# en cada petición) no vuelve a pasar por la verificación HMAC
+token_cache = TTLCache(
+    max_size=settings.token_cache_max_size,
+    ttl_seconds=settings.access_token_expire_minutes * 60,
+    name="tokens"
+)
+
+# Lista de tokens revocados (jti) hasta su expiración natural
+revoked_tokens = TTLCache(
+    max_size=settings.revoked_tokens_max_size,
+    ttl_seconds=settings.access_token_expire_minutes * 60,
+    name="revoked_tokens"
+)
 
 # Configuración de hash de contraseñas usando hashlib
 def get_password_hash(password: str) -> str:
@@ -39,18 +58,68 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
 
+def _token_key(token: str) -> str:
+    """Clave de caché: hash del token, para no guardar el token en claro"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def decode_token(token: str) -> Optional[Dict[str, Any]]:
+    """Claims de un token JWT válido, o None si es inválido, vencido o revocado.
+
+    La firma se verifica solo la primera vez; después los claims se sirven de
+    `token_cache` hasta el `exp` del token.
+    """
+    key = _token_key(token)
+    payload = token_cache.get(key)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        except JWTError:
+            return None
+        exp = payload.get("exp")
+        if exp:
+            token_cache.set(key, payload, ttl_seconds=exp - time.time())
+    elif payload.get("exp") and payload["exp"] <= time.time():
+        token_cache.invalidate(key)
+        return None
+    
+    if revoked_tokens.get(payload.get("jti") or key) is not None:
+        return None
+    return payload
+
+
 def verify_token(token: str) -> Optional[str]:
     """Verificar y decodificar token JWT"""
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        return username
-    except JWTError:
-        return None 
\ No newline at end of file
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    username: str = payload.get("sub")
+    if username is None:
+        return None
+    return username
+
+
+def revoke_token(token: str) -> bool:
+    """Revocar un token hasta su expiración (en este worker y, con bus entre workers, en los demás)"""
+    payload = decode_token(token)
+    if payload is None:
+        return False
+    event_bus.publish(TOKEN_REVOKED, {
+        "jti": payload.get("jti") or _token_key(token),
+        "exp": payload.get("exp")
+    })
+    return True
+
+
+def _on_token_revoked(bus_event) -> None:
+    exp = bus_event.data.get("exp")
+    ttl = exp - time.time() if exp else None
+    revoked_tokens.set(bus_event.data["jti"], True, ttl_seconds=ttl)
+
+
+event_bus.subscribe(TOKEN_REVOKED, _on_token_revoked)
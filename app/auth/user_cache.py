@@ -0,0 +1,92 @@
+"""
+Caché de usuarios autenticados para evitar consultar la tabla users en cada petición
+"""
+from typing import Any, Dict, Optional
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from app.cache import TTLCache
+from app.config import settings
+from app.models.user import User
+from app.services.event_bus import event_bus, USER_CHANGED
+
+# Campos que, al cambiar, obligan a descartar el usuario en caché
+AUTH_FIELDS = ("username", "is_active", "role", "hashed_password")
+
+user_cache = TTLCache(
+    max_size=settings.user_cache_max_size,
+    ttl_seconds=settings.user_cache_ttl_seconds,
+    name="users"
+)
+
+# Aumenta con cada invalidación: una lectura de la BD que empezó antes no se guarda
+_generation = 0
+
+
+def _snapshot(user: User) -> Dict[str, Any]:
+    """Copiar los valores de columna del usuario (sin estado de sesión)"""
+    return {column.key: getattr(user, column.key) for column in inspect(User).column_attrs}
+
+
+def get_user_by_username(db: Session, username: str) -> Optional[User]:
+    """Obtener usuario por username usando la caché cuando es posible"""
+    snapshot = user_cache.get(username)
+    if snapshot is None:
+        generation = _generation
+        user = db.query(User).filter(User.username == username).first()
+        if user is not None and generation == _generation:
+            user_cache.set(username, _snapshot(user))
+        return user
+
+    # Reconstruir una instancia "detached" y adjuntarla a la sesión sin consultar
+    cached = User(**snapshot)
+    make_transient_to_detached(cached)
+    return db.merge(cached, load=False)
+
+
+def invalidate_user(username: str) -> None:
+    """Descartar un usuario de la caché de este worker"""
+    global _generation
+    _generation += 1
+    user_cache.invalidate(username)
+
+
+def _on_user_changed(bus_event) -> None:
+    global _generation
+    if bus_event.data.get("all"):
+        _generation += 1
+        user_cache.clear()
+        return
+    for username in bus_event.data.get("usernames") or ():
+        invalidate_user(username)
+
+
+# Llega también desde los demás workers si el bus tiene backend
+event_bus.subscribe(USER_CHANGED, _on_user_changed)
+
+
+def _publish_user_changed(target: User, data: Dict[str, Any]) -> None:
+    """Invalidar en todos los workers al confirmar la transacción; antes del
+    commit otra petición podría volver a guardar la fila vieja"""
+    session = object_session(target)
+    if session is not None:
+        event_bus.publish_after_commit(session, USER_CHANGED, data)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_update(mapper, connection, target: User) -> None:
+    """Invalidar si cambió algún campo relevante para la autenticación"""
+    state = inspect(target)
+    if not any(state.attrs[field].history.has_changes() for field in AUTH_FIELDS):
+        return
+    if state.attrs.username.history.has_changes():
+        # El nombre anterior no siempre está en el historial (atributo expirado)
+        _publish_user_changed(target, {"all": True})
+    else:
+        _publish_user_changed(target, {"usernames": [target.username]})
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_on_delete(mapper, connection, target: User) -> None:
+    """Invalidar usuarios eliminados"""
+    _publish_user_changed(target, {"usernames": [target.username]})
@@ -0,0 +1,96 @@
+"""
+Caché en memoria con expiración (TTL) y tamaño máximo para el sistema POS
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Caché LRU acotada con expiración por entrada y contadores de aciertos.
+
+    Es segura entre hilos (los endpoints síncronos corren en el threadpool de
+    Starlette) y vive dentro de cada proceso: con varios workers de uvicorn cada
+    uno mantiene su propia copia, por lo que el TTL acota cuánto puede durar un
+    dato obsoleto en un worker que no recibió la invalidación.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 60.0, name: str = "cache"):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Obtener un valor vigente o `default` si no existe o expiró"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Guardar un valor; `ttl_seconds` permite una expiración distinta a la por defecto"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key: Hashable, loader: Callable[[], Any], ttl_seconds: Optional[float] = None) -> Any:
+        """Obtener un valor o cargarlo con `loader` si no está en caché"""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = loader()
+            self.set(key, value, ttl_seconds)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        """Eliminar una entrada"""
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        """Vaciar la caché completa"""
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores para medir la efectividad de la caché"""
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total * 100, 2) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -12,6 +12,22 @@ class Settings(BaseSettings):
     # Database
     database_url: str = "sqlite:///./restaurante_pos.db"
     database_test_url: str = "sqlite:///./restaurante_pos_test.db"
+    async_database_enabled: bool = False       # Endpoints de hora pico con motor asíncrono (asyncpg/aiosqlite)
+    async_database_url: Optional[str] = None   # Por defecto se deriva de database_url
+    
+    # Réplica de lectura para reportes y tableros (opcional)
+    database_replica_url: Optional[str] = None
+    replica_max_lag_seconds: float = 30.0     # Retraso tolerado si la petición no envía X-Max-Staleness
+    replica_lag_check_seconds: float = 5.0    # Cada cuánto medir el retraso de la réplica
+    
+    # Pool de conexiones (por worker y por motor)
+    db_pool_size: int = 5                   # Conexiones que se mantienen abiertas
+    db_max_overflow: int = 10               # Conexiones extra en picos (se cierran al devolverse)
+    db_pool_timeout: float = 30.0           # Segundos esperando una conexión antes de fallar
+    db_pool_recycle: int = 300              # Reabrir conexiones con más de N segundos
+    db_pool_pre_ping: bool = True           # Verificar la conexión antes de entregarla
+    db_pool_warmup_connections: int = 0     # Conexiones a abrir al arrancar (0 = desactivado)
+    db_pool_slow_checkout_ms: float = 100.0  # Esperas mayores se registran como advertencia
     
     # Security
     secret_key: str = "your-secret-key-here-change-in-production"
@@ -23,6 +39,52 @@ class Settings(BaseSettings):
     session_warning_minutes: int = 2   # Minutos antes del timeout para mostrar advertencia
     session_check_interval: int = 60   # Segundos entre verificaciones de sesión
     
+    # Caché de usuarios autenticados
+    user_cache_ttl_seconds: int = 60   # Tiempo máximo que un worker reutiliza un usuario
+    user_cache_max_size: int = 1024    # Número máximo de usuarios en caché por worker
+    token_cache_max_size: int = 2048   # Tokens verificados en caché por worker (hasta su exp)
+    revoked_tokens_max_size: int = 10000  # Tokens revocados recordados hasta su exp
+    
+    # Caché de configuraciones del sistema
+    business_settings_check_seconds: float = 2.0  # Cada cuánto verificar la versión contra la BD
+    
+    # Numeración de ventas, pedidos y sesiones de caja
+    numbering_block_size: int = 1  # Números reservados por viaje a la BD (>1 para horas pico)
+    numbering_pool_size: int = 2   # Conexiones propias para reservar números (fuera del pool de peticiones)
+    
+    # Bus de eventos entre vistas (cocina, meseros, caja)
+    event_bus_backend: str = "memory"   # "memory" (un worker) o "postgres" (LISTEN/NOTIFY entre workers)
+    event_bus_channel: str = "pos_events"
+    
+    # Resumen de pedidos del día (tablero)
+    orders_summary_cache_ttl_seconds: int = 5  # Peticiones dentro del TTL comparten una consulta
+    
+    # Plano del salón para meseros
+    floor_plan_cache_ttl_seconds: int = 30  # Respaldo si se pierde un aviso de invalidación
+    
+    # Recetas compiladas (lista de materiales) para el consumo de inventario
+    recipe_bom_cache_ttl_seconds: int = 3600  # Se invalida al cambiar recetas; el TTL es solo respaldo
+    menu_availability_refresh_seconds: int = 300  # Recálculo completo de respaldo de la disponibilidad del menú
+    
+    # Catálogo del menú para caja y meseros (respuestas con ETag)
+    catalog_snapshot_ttl_seconds: int = 300  # Se invalida al cambiar productos o categorías; el TTL es solo respaldo
+    
+    # Búsqueda de productos para meseros, caja e inventario
+    product_search_backend: str = "memory"     # "memory" (índice por worker) o "postgres" (pg_trgm, ver migrations/product_search.py)
+    product_search_refresh_seconds: int = 300  # Recarga completa de respaldo del índice en memoria
+    
+    # Escáner de caja (códigos de barras, SKU y códigos en memoria)
+    scan_cache_refresh_seconds: int = 600  # Recarga completa de respaldo; los cambios llegan por el bus
+    scan_batch_max_codes: int = 500        # Códigos por petición en /products/scan
+    
+    # Stream de eventos de cocina (SSE)
+    kitchen_stream_poll_seconds: float = 5.0       # Relectura de respaldo si no llega aviso del bus
+    kitchen_stream_heartbeat_seconds: int = 15     # Comentario keep-alive para proxies
+    kitchen_events_retention_hours: int = 24       # Eventos más viejos se purgan al iniciar
+    
+    # Exportaciones a CSV / Excel
+    export_batch_size: int = 1000  # Filas leídas por lote del cursor del servidor
+    
     # Application
     debug: bool = True
     host: str = "0.0.0.0"
@@ -1,17 +1,27 @@
 """
 Configuración de la base de datos PostgreSQL con SQLAlchemy
 """
-from sqlalchemy import create_engine
+import logging
+import threading
+import time
+from typing import Optional
+from fastapi import Request, Response
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.db_pool import (
+    InstrumentedAsyncQueuePool, InstrumentedQueuePool, InstrumentedReplicaQueuePool, pool_options
+)
+
+logger = logging.getLogger(__name__)
 
 # Crear engine de SQLAlchemy
 engine = create_engine(
     settings.database_url,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=settings.debug
+    poolclass=InstrumentedQueuePool,
+    echo=settings.debug,
+    **pool_options()
 )
 
 # Crear sesión local
@@ -21,6 +31,111 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def get_async_database_url(url: str) -> str:
+    """URL del motor asíncrono: misma base con driver asyncpg o aiosqlite"""
+    for prefix, async_prefix in (
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("postgres://", "postgresql+asyncpg://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
+
+# Motor asíncrono opcional para los endpoints más concurridos. Solo se crea si
+# está habilitado, porque requiere asyncpg (PostgreSQL) o aiosqlite (SQLite).
+async_engine = None
+AsyncSessionLocal = None
+if settings.async_database_enabled:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    
+    async_engine = create_async_engine(
+        settings.async_database_url or get_async_database_url(settings.database_url),
+        poolclass=InstrumentedAsyncQueuePool,
+        echo=settings.debug,
+        **pool_options()
+    )
+    # Sin expirar al confirmar: en modo asíncrono no hay carga perezosa implícita
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+# Réplica de solo lectura opcional para reportes y tableros
+replica_engine = None
+ReplicaSessionLocal = None
+if settings.database_replica_url:
+    replica_engine = create_engine(
+        settings.database_replica_url,
+        poolclass=InstrumentedReplicaQueuePool,
+        echo=settings.debug,
+        **pool_options()
+    )
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    
+    @event.listens_for(ReplicaSessionLocal, "before_flush")
+    def _reject_replica_writes(session, flush_context, instances):
+        raise RuntimeError("La sesión de réplica es de solo lectura")
+
+
+class ReplicaLag:
+    """Retraso de la réplica, medido como máximo cada `replica_lag_check_seconds`.
+
+    None significa que la réplica no responde: las lecturas van a la primaria
+    hasta la próxima verificación.
+    """
+    
+    _lock = threading.Lock()
+    _lag: Optional[float] = None
+    _checked_at = float("-inf")
+    
+    @staticmethod
+    def _measure() -> Optional[float]:
+        try:
+            with replica_engine.connect() as conn:
+                if conn.dialect.name == "postgresql":
+                    # Sin WAL pendiente la réplica está al día aunque la primaria lleve rato sin escribir
+                    return float(conn.execute(text(
+                        "SELECT CASE WHEN NOT pg_is_in_recovery() "
+                        "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                    )).scalar())
+                if conn.dialect.name == "sqlite":
+                    # Réplica local copiada con scripts/replica_sqlite_local.py: user_version
+                    # guarda el momento de la última copia (0: todavía no se copió)
+                    synced_at = conn.execute(text("PRAGMA user_version")).scalar() or 0
+                    return max(time.time() - synced_at, 0.0) if synced_at else None
+                conn.execute(text("SELECT 1"))
+                return 0.0
+        except Exception:
+            logger.warning("La réplica de lectura no responde; se usa la primaria", exc_info=True)
+            return None
+    
+    @classmethod
+    def current(cls) -> Optional[float]:
+        if time.monotonic() - cls._checked_at < settings.replica_lag_check_seconds:
+            return cls._lag
+        with cls._lock:
+            if time.monotonic() - cls._checked_at >= settings.replica_lag_check_seconds:
+                cls._lag = cls._measure()
+                cls._checked_at = time.monotonic()
+        return cls._lag
+
+
+def use_replica(max_staleness: Optional[float] = None) -> bool:
+    """Si una lectura puede ir a la réplica dado el retraso que tolera (segundos)"""
+    if ReplicaSessionLocal is None:
+        return False
+    if max_staleness is None:
+        max_staleness = settings.replica_max_lag_seconds
+    if max_staleness <= 0:
+        return False
+    lag = ReplicaLag.current()
+    return lag is not None and lag <= max_staleness
+
+
 def get_db():
     """Dependency para obtener la sesión de base de datos"""
     db = SessionLocal()
@@ -30,6 +145,37 @@ def get_db():
         db.close()
 
 
+def get_read_db(request: Request, response: Response):
+    """Dependency de solo lectura para reportes y tableros.
+
+    Usa la réplica si está configurada, responde y su retraso no supera lo que
+    tolera la petición: cabecera `X-Max-Staleness` en segundos (0 obliga a
+    leer de la primaria) o `replica_max_lag_seconds` por defecto. Si no, usa la
+    primaria. La fuente elegida se informa en la cabecera `X-Data-Source`.
+    """
+    max_staleness = None
+    header = request.headers.get("x-max-staleness")
+    if header is not None:
+        try:
+            max_staleness = float(header)
+        except ValueError:
+            max_staleness = None
+    
+    replica = use_replica(max_staleness)
+    response.headers["X-Data-Source"] = "replica" if replica else "primary"
+    db = ReplicaSessionLocal() if replica else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """Dependency para obtener una sesión asíncrona de base de datos"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def create_tables():
     """Crear todas las tablas en la base de datos"""
     Base.metadata.create_all(bind=engine) 
\ No newline at end of file
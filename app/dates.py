@@ -0,0 +1,21 @@
+"""
+Rangos de fechas para filtrar columnas de fecha y hora sin envolverlas en funciones
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Tuple
+
+
+def day_range(day: Optional[date] = None) -> Tuple[datetime, datetime]:
+    """Rango semiabierto [inicio, inicio del día siguiente) de un día.
+
+    Filtrar con `columna >= inicio AND columna < fin` permite usar el índice de
+    la columna; `func.date(columna) == día` obliga a evaluar cada fila.
+    """
+    day = day or date.today()
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def date_range(start_date: date, end_date: date) -> Tuple[datetime, datetime]:
+    """Rango semiabierto que cubre de `start_date` a `end_date`, ambos incluidos"""
+    return day_range(start_date)[0], day_range(end_date)[1]
@@ -0,0 +1,186 @@
+"""
+Pool de conexiones instrumentado: espera por conexión, agotamiento y precalentamiento
+"""
+import bisect
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores (ms) de los tramos del histograma de espera
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class PoolMetrics:
+    """Contadores de espera para obtener una conexión del pool (por worker)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.slow_checkouts = 0
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+            self.buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record(self, wait_ms: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self.buckets[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+            if wait_ms >= settings.db_pool_slow_checkout_ms:
+                self.slow_checkouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            labels = [f"<={limit}ms" for limit in WAIT_BUCKETS_MS] + [f">{WAIT_BUCKETS_MS[-1]}ms"]
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "slow_checkouts": self.slow_checkouts,
+                "avg_wait_ms": round(self.total_wait_ms / attempts, 3) if attempts else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 3),
+                "wait_histogram": dict(zip(labels, self.buckets)),
+            }
+
+
+class _InstrumentedPoolMixin:
+    """Mide cuánto espera cada petición por una conexión.
+
+    `_do_get` es el punto donde QueuePool entrega una conexión libre, abre una
+    nueva o espera hasta `pool_timeout`; una espera larga o un timeout indica
+    que el pool quedó corto para la concurrencia del worker.
+    """
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            wait_ms = (time.perf_counter() - start) * 1000
+            self.metrics.record(wait_ms, timed_out=True)
+            logger.error(
+                "Pool de conexiones agotado (%s) tras %.0f ms: %s",
+                self.metrics.name, wait_ms, self.status()
+            )
+            raise
+        wait_ms = (time.perf_counter() - start) * 1000
+        self.metrics.record(wait_ms)
+        if wait_ms >= settings.db_pool_slow_checkout_ms:
+            logger.warning(
+                "Espera de %.0f ms por una conexión (%s): %s",
+                wait_ms, self.metrics.name, self.status()
+            )
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    """QueuePool del motor síncrono con métricas de espera"""
+    metrics = PoolMetrics("sync")
+
+
+class InstrumentedReplicaQueuePool(_InstrumentedPoolMixin, QueuePool):
+    """QueuePool de la réplica de lectura con métricas de espera"""
+    metrics = PoolMetrics("replica")
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """Pool del motor asíncrono con métricas de espera"""
+    metrics = PoolMetrics("async")
+
+
+def pool_options() -> Dict[str, Any]:
+    """Parámetros de pool comunes a los motores síncrono y asíncrono"""
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def pool_stats(engine) -> Optional[Dict[str, Any]]:
+    """Estado actual del pool de un motor y sus métricas de espera"""
+    if engine is None:
+        return None
+    pool = getattr(engine, "sync_engine", engine).pool
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.snapshot())
+    return stats
+
+
+def _warm_up_count(pool, connections: int) -> int:
+    # Las conexiones de overflow se cerrarían al devolverlas
+    if isinstance(pool, QueuePool):
+        return min(connections, pool.size())
+    return connections
+
+
+def warm_up_pool(engine, connections: int) -> int:
+    """Abrir conexiones al arrancar para que las primeras peticiones no paguen la conexión.
+
+    Se toman todas a la vez (si no, el pool devolvería siempre la misma) y se
+    limita a `pool_size`.
+    """
+    pool = engine.pool
+    opened: List = []
+    try:
+        for _ in range(_warm_up_count(pool, connections)):
+            opened.append(engine.raw_connection())
+    except Exception:
+        logger.exception("No se pudo precalentar el pool de conexiones")
+    finally:
+        for connection in opened:
+            connection.close()
+    # El precalentamiento no es espera de peticiones reales
+    if isinstance(pool, _InstrumentedPoolMixin):
+        pool.metrics.reset()
+    return len(opened)
+
+
+async def warm_up_async_pool(engine, connections: int) -> int:
+    """Igual que `warm_up_pool` para el motor asíncrono"""
+    pool = engine.sync_engine.pool
+    opened: List = []
+    try:
+        for _ in range(_warm_up_count(pool, connections)):
+            opened.append(await engine.connect())
+    except Exception:
+        logger.exception("No se pudo precalentar el pool de conexiones asíncrono")
+    finally:
+        for connection in opened:
+            await connection.close()
+    if isinstance(pool, _InstrumentedPoolMixin):
+        pool.metrics.reset()
+    return len(opened)
@@ -0,0 +1,158 @@
+"""
+Exportación a CSV y Excel por streaming, con memoria constante
+"""
+import csv
+import enum
+import io
+import os
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+from typing import Any, Callable, Iterator, List, Sequence
+
+import xlsxwriter
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Query, Session
+
+from app.config import settings
+from app.database import SessionLocal
+
+EXPORT_FORMAT_PATTERN = "^(csv|xlsx)$"
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Tamaño de los bloques en que se envía el archivo Excel ya armado
+FILE_CHUNK_SIZE = 64 * 1024
+
+# Filas por hoja de Excel (incluida la de encabezados)
+XLSX_MAX_ROWS = 1048576
+
+
+def iter_batches(query: Query, batch_size: int = None) -> Iterator[List[Any]]:
+    """Filas de la consulta en lotes de `batch_size`.
+
+    `yield_per` lee con un cursor del lado del servidor (stream_results) en
+    PostgreSQL, así que ni el driver ni SQLAlchemy guardan más de un lote.
+    """
+    batch_size = batch_size or settings.export_batch_size
+    rows = iter(query.yield_per(batch_size))
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _cell(value: Any) -> Any:
+    """Valor apto para CSV y xlsxwriter"""
+    if value is None:
+        return ""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone()
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return "Sí" if value else "No"
+    return value
+
+
+def _csv_chunks(headers: Sequence[str], batches: Iterator[List[Sequence]]) -> Iterator[bytes]:
+    """Un bloque de bytes por lote; el BOM inicial hace que Excel lea UTF-8"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(headers)
+    for batch in batches:
+        writer.writerows([_cell(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _xlsx_chunks(headers: Sequence[str], batches: Iterator[List[Sequence]], sheet_name: str) -> Iterator[bytes]:
+    """Excel en `constant_memory`: cada fila escrita pasa a un archivo temporal.
+
+    Un .xlsx es un zip que solo se puede cerrar al final, así que se arma en
+    disco y después se envía por bloques.
+    """
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+        header_format = workbook.add_format({
+            'bold': True,
+            'bg_color': '#667eea',
+            'font_color': 'white',
+            'border': 1
+        })
+        worksheet = None
+        row_number = XLSX_MAX_ROWS
+        sheets = 0
+        for batch in batches:
+            for row in batch:
+                if row_number >= XLSX_MAX_ROWS:
+                    # Hoja llena (o primera fila): continuar en una nueva
+                    sheets += 1
+                    worksheet = workbook.add_worksheet(sheet_name if sheets == 1 else f"{sheet_name} ({sheets})")
+                    worksheet.write_row(0, 0, headers, header_format)
+                    row_number = 1
+                worksheet.write_row(row_number, 0, [_cell(value) for value in row])
+                row_number += 1
+        if worksheet is None:
+            workbook.add_worksheet(sheet_name).write_row(0, 0, headers, header_format)
+        workbook.close()
+
+        with open(path, "rb") as file:
+            while True:
+                chunk = file.read(FILE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def export_response(
+    filename: str,
+    export_format: str,
+    headers: Sequence[str],
+    build_query: Callable[[Session], Query],
+    to_row: Callable[[Any], Sequence] = tuple,
+    sheet_name: str = "Datos"
+) -> StreamingResponse:
+    """Respuesta por streaming con las filas de `build_query(db)` en CSV o Excel.
+
+    El generador abre su propia sesión para no depender de cuándo se cierra la
+    de la petición mientras se envía la respuesta.
+    """
+    def content() -> Iterator[bytes]:
+        db = SessionLocal()
+        try:
+            batches = (
+                [to_row(row) for row in batch]
+                for batch in iter_batches(build_query(db))
+            )
+            if export_format == "csv":
+                yield from _csv_chunks(headers, batches)
+            else:
+                yield from _xlsx_chunks(headers, batches, sheet_name)
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        content(),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'}
+    )
@@ -9,10 +9,14 @@ from fastapi.responses import HTMLResponse
 import os
 
 from app.config import settings as app_settings
-from app.database import create_tables
+from app.database import create_tables, SessionLocal, engine, async_engine
+from app.db_pool import warm_up_pool, warm_up_async_pool
 from app.routers import auth, products, inventory, settings, notifications, reports, kitchen, caja_ventas, waiters, recipes
 from app.models import *  # Importar todos los modelos para crear las tablas
-from app.middleware import AuthMiddleware, SessionTimeoutMiddleware
+from app.middleware import AuthMiddleware
+from app.services.order_event_service import OrderEventService
+from app.services.product_lookup_service import ProductLookupService
+from app.services.event_bus import event_bus
 
 # Crear aplicación FastAPI
 app = FastAPI(
@@ -23,9 +27,8 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
-# Agregar middlewares de autenticación y timeout
+# Agregar middleware de autenticación y timeout de sesión (ASGI puro)
 app.add_middleware(AuthMiddleware)
-app.add_middleware(SessionTimeoutMiddleware, timeout_minutes=app_settings.access_token_expire_minutes)
 
 # Configurar CORS
 app.add_middleware(
@@ -48,6 +51,10 @@ if os.path.exists("uploads"):
 templates = Jinja2Templates(directory="templates")
 
 # Incluir routers
+if app_settings.async_database_enabled:
+    # Antes que los demás: sus rutas reemplazan a las versiones síncronas
+    from app.routers import hot_paths
+    app.include_router(hot_paths.router, prefix="/api/v1")
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(products.router, prefix="/api/v1")
 app.include_router(inventory.router, prefix="/api/v1")
@@ -67,6 +74,35 @@ async def startup_event():
     # Crear tablas si no existen
     create_tables()
     print("✅ Base de datos inicializada")
+    
+    # Precalentar el pool para que los primeros pedidos no paguen la conexión
+    if app_settings.db_pool_warmup_connections > 0:
+        opened = warm_up_pool(engine, app_settings.db_pool_warmup_connections)
+        print(f"✅ Pool de conexiones precalentado ({opened} conexiones)")
+        if async_engine is not None:
+            opened = await warm_up_async_pool(async_engine, app_settings.db_pool_warmup_connections)
+            print(f"✅ Pool asíncrono precalentado ({opened} conexiones)")
+    
+    # Bus de eventos (backend entre workers según configuración)
+    event_bus.start(engine)
+    
+    # Purgar eventos de cocina antiguos (las pantallas con cursores viejos reciben un snapshot)
+    db = SessionLocal()
+    try:
+        OrderEventService.purge_old_events(db, app_settings.kitchen_events_retention_hours)
+        # Códigos del escáner en memoria: el primer escaneo en caja no espera la carga
+        loaded = ProductLookupService.warm_up(db)
+        print(f"✅ Caché de códigos del escáner cargada ({loaded} productos)")
+    finally:
+        db.close()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Evento de cierre de la aplicación"""
+    event_bus.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 
 @app.get("/", response_class=HTMLResponse)
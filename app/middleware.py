@@ -1,122 +1,141 @@
 """
 Middleware de autenticación para el sistema POS
 """
-from fastapi import Request, HTTPException, status
+from typing import Dict, Iterable, List, Optional
+from fastapi import status
 from fastapi.responses import RedirectResponse
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.responses import Response
-import time
-from typing import Optional
-from app.auth.security import verify_token
-
-
-class AuthMiddleware(BaseHTTPMiddleware):
-    """Middleware para verificar autenticación en páginas protegidas"""
-    
-    def __init__(self, app, exclude_paths: Optional[list] = None):
-        super().__init__(app)
-        self.exclude_paths = exclude_paths or [
-            "/",
-            "/login",
-            "/api/v1/auth/login",
-            "/api/v1/auth/login-json",
-            "/api/v1/settings/",
-            "/api/v1/settings/business-info",
-            "/api/v1/settings/cash-register-config",
-            "/api/v1/products/",
-            "/api/v1/products/categories",
-            "/api/v1/products/subcategories",
-            "/api/v1/caja-ventas/estado",
-            "/api/v1/caja-ventas/movimientos",
-            "/static",
-            "/uploads",
-            "/health",
-            "/docs",
-            "/redoc",
-            "/openapi.json"
-        ]
-    
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        # Verificar si la ruta está excluida de autenticación
-        if any(request.url.path.startswith(path) for path in self.exclude_paths):
-            return await call_next(request)
-        
-        # Para rutas de API, usar el sistema de dependencias existente
-        if request.url.path.startswith("/api/"):
-            return await call_next(request)
-        
-        # Para páginas HTML, verificar token en cookies o headers
-        token = self._extract_token(request)
-        
-        if not token:
-            # No hay token, redirigir al login
-            return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
-        
-        # Verificar si el token es válido
-        username = verify_token(token)
-        if not username:
-            # Token inválido, redirigir al login
-            return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
-        
-        # Token válido, continuar
-        return await call_next(request)
-    
-    def _extract_token(self, request: Request) -> Optional[str]:
-        """Extraer token de cookies o headers"""
-        # Buscar en cookies primero
-        token = request.cookies.get("auth_token")
-        if token:
-            return token
-        
-        # Buscar en headers de autorización
-        auth_header = request.headers.get("authorization")
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.auth.security import decode_token
+
+_PREFIX = object()  # Marca de nodo: toda ruta bajo este nodo coincide
+
+
+class PathPrefixTrie:
+    """Trie de rutas por segmentos.
+
+    Resuelve si una ruta coincide con alguna de las registradas recorriendo sus
+    segmentos una sola vez, en lugar de comparar con cada prefijo de la lista.
+    Los prefijos se comparan por segmento completo: `/static` cubre
+    `/static/css/app.css` pero no `/staticos`.
+    """
+
+    def __init__(self, prefixes: Iterable[str] = ()):
+        self._root: Dict = {}
+        for path in prefixes:
+            self.add(path)
+
+    @staticmethod
+    def _segments(path: str) -> List[str]:
+        return [segment for segment in path.split("/") if segment]
+
+    def add(self, path: str) -> None:
+        node = self._root
+        for segment in self._segments(path):
+            node = node.setdefault(segment, {})
+        node[_PREFIX] = True
+
+    def match(self, path: str) -> bool:
+        node = self._root
+        if _PREFIX in node:
+            return True
+        for segment in self._segments(path):
+            node = node.get(segment)
+            if node is None:
+                return False
+            if _PREFIX in node:
+                return True
+        return False
+
+
+class AuthMiddleware:
+    """Middleware ASGI de autenticación y expiración de sesión para páginas HTML.
+
+    - Los estáticos (`/static`, `/uploads`) pasan directo, sin leer cookies.
+    - Las rutas de API usan el sistema de dependencias existente.
+    - En páginas HTML el token se decodifica una sola vez y sus claims quedan en
+      `scope["state"]["auth_claims"]` (`request.state.auth_claims`).
+    - Una cookie con token vencido o inválido redirige a `/login?reason=timeout`
+      y se borra; una página protegida sin token válido redirige a `/login`.
+    """
+
+    DEFAULT_EXCLUDE_PATHS = [
+        "/",
+        "/login",
+        "/api/v1/auth/login",
+        "/api/v1/auth/login-json",
+        "/api/v1/settings/",
+        "/api/v1/settings/business-info",
+        "/api/v1/settings/cash-register-config",
+        "/api/v1/products/",
+        "/api/v1/products/categories",
+        "/api/v1/products/subcategories",
+        "/api/v1/caja-ventas/estado",
+        "/api/v1/caja-ventas/movimientos",
+        "/health",
+        "/docs",
+        "/redoc",
+        "/openapi.json"
+    ]
+    DEFAULT_STATIC_PATHS = ["/static", "/uploads"]
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        exclude_paths: Optional[list] = None,
+        static_paths: Optional[list] = None
+    ):
+        self.app = app
+        self.exclude_paths = PathPrefixTrie(
+            prefixes=exclude_paths if exclude_paths is not None else self.DEFAULT_EXCLUDE_PATHS
+        )
+        self.static_paths = PathPrefixTrie(
+            prefixes=static_paths if static_paths is not None else self.DEFAULT_STATIC_PATHS
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if path.startswith("/api/") or self.static_paths.match(path):
+            await self.app(scope, receive, send)
+            return
+
+        connection = HTTPConnection(scope)
+        cookie_token = connection.cookies.get("auth_token")
+        token = cookie_token or self._extract_bearer(connection)
+        claims = self._decode(token) if token else None
+        scope.setdefault("state", {})["auth_claims"] = claims
+
+        if cookie_token and claims is None:
+            # Token vencido por inactividad (o inválido)
+            response = RedirectResponse(url="/login?reason=timeout", status_code=status.HTTP_302_FOUND)
+            response.delete_cookie("auth_token")
+            await response(scope, receive, send)
+            return
+
+        if claims is None and not self.exclude_paths.match(path):
+            response = RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def _extract_bearer(connection: HTTPConnection) -> Optional[str]:
+        """Extraer token de la cabecera de autorización"""
+        auth_header = connection.headers.get("authorization")
         if auth_header and auth_header.startswith("Bearer "):
             return auth_header.split(" ")[1]
-        
         return None
 
-
-class SessionTimeoutMiddleware(BaseHTTPMiddleware):
-    """Middleware para manejar timeout de sesión por inactividad"""
-    
-    def __init__(self, app, timeout_minutes: int = 30):
-        super().__init__(app)
-        self.timeout_minutes = timeout_minutes
-    
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        # Solo aplicar a páginas HTML (no a APIs)
-        if not request.url.path.startswith("/api/"):
-            token = self._extract_token(request)
-            if token:
-                # Verificar si el token ha expirado por inactividad
-                if self._is_token_expired_by_inactivity(token):
-                    # Token expirado por inactividad, redirigir al login
-                    response = RedirectResponse(url="/login?reason=timeout", status_code=status.HTTP_302_FOUND)
-                    response.delete_cookie("auth_token")
-                    return response
-        
-        return await call_next(request)
-    
-    def _extract_token(self, request: Request) -> Optional[str]:
-        """Extraer token de cookies"""
-        return request.cookies.get("auth_token")
-    
-    def _is_token_expired_by_inactivity(self, token: str) -> bool:
-        """Verificar si el token ha expirado por inactividad"""
-        try:
-            # Decodificar el token para obtener la fecha de expiración
-            from jose import jwt
-            from app.config import settings
-            
-            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-            exp_timestamp = payload.get("exp")
-            
-            if not exp_timestamp:
-                return True
-            
-            # Verificar si ha expirado
-            current_time = time.time()
-            return current_time > exp_timestamp
-            
-        except Exception:
-            return True
+    @staticmethod
+    def _decode(token: str) -> Optional[dict]:
+        """Claims del token, o None si es inválido, vencido, revocado o no tiene usuario/expiración"""
+        payload = decode_token(token)
+        if payload is None or not payload.get("sub") or not payload.get("exp"):
+            return None
+        return payload
@@ -8,7 +8,9 @@ from .location import Location, Table
 from .inventory import InventoryMovement
 from .recipe import Recipe, RecipeItem
 from .settings import SystemSettings
-from .order import Order, OrderItem
+from .order import Order, OrderItem, OrderEvent
+from .numbering import NumberSequence
+from .sales_rollup import SalesProductRollup, SalesUserRollup, SalesPaymentRollup
 
 __all__ = [
     "User",
@@ -32,5 +34,10 @@ __all__ = [
     "RecipeItem",
     "SystemSettings",
     "Order",
-    "OrderItem"
+    "OrderItem",
+    "OrderEvent",
+    "NumberSequence",
+    "SalesProductRollup",
+    "SalesUserRollup",
+    "SalesPaymentRollup"
 ] 
\ No newline at end of file
@@ -1,7 +1,7 @@
 """
 Modelo para el sistema de caja - Simplificado y Profesional
 """
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, Text, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -66,29 +66,42 @@ class CashSession(Base):
     # Estado
     status = Column(String(20), default=CashStatus.OPEN)
     
+    # Totales acumulados por tipo de movimiento (se actualizan con cada CashMovement)
+    sales_total = Column(Numeric(12, 2), nullable=False, default=0, server_default="0")
+    expenses_total = Column(Numeric(12, 2), nullable=False, default=0, server_default="0")
+    refunds_total = Column(Numeric(12, 2), nullable=False, default=0, server_default="0")
+    withdrawals_total = Column(Numeric(12, 2), nullable=False, default=0, server_default="0")
+    deposits_total = Column(Numeric(12, 2), nullable=False, default=0, server_default="0")
+    movements_count = Column(Integer, nullable=False, default=0, server_default="0")
+    
     # Relaciones
     cash_register = relationship("CashRegister", back_populates="sessions")
     user = relationship("User", backref="cash_sessions")
     movements = relationship("CashMovement", back_populates="session", cascade="all, delete-orphan")
     
+    # Índices para optimización
+    __table_args__ = (
+        Index('idx_cash_session_opened', 'opened_at'),
+        Index('idx_cash_session_register_status', 'cash_register_id', 'status'),
+    )
+    
     def __repr__(self):
         return f"<CashSession(id={self.id}, number='{self.session_number}', status='{self.status}')>"
     
     @property
     def total_sales(self):
         """Total de ventas en esta sesión"""
-        return sum(
-            movement.amount for movement in self.movements 
-            if movement.movement_type == MovementType.SALE
-        )
+        return self.sales_total or 0
     
     @property
     def total_expenses(self):
         """Total de gastos en esta sesión"""
-        return sum(
-            movement.amount for movement in self.movements 
-            if movement.movement_type == MovementType.EXPENSE
-        )
+        return self.expenses_total or 0
+    
+    @property
+    def total_refunds(self):
+        """Total de devoluciones en esta sesión"""
+        return self.refunds_total or 0
     
     @property
     def expected_amount(self):
@@ -96,6 +109,16 @@ class CashSession(Base):
         return self.opening_amount + self.total_sales - self.total_expenses
 
 
+# Columna de CashSession que acumula cada tipo de movimiento (por valor almacenado)
+SESSION_TOTAL_COLUMNS = {
+    MovementType.SALE.value: "sales_total",
+    MovementType.EXPENSE.value: "expenses_total",
+    MovementType.REFUND.value: "refunds_total",
+    MovementType.WITHDRAWAL.value: "withdrawals_total",
+    MovementType.DEPOSIT.value: "deposits_total",
+}
+
+
 class CashMovement(Base):
     """Modelo para los movimientos de caja"""
     __tablename__ = "cash_movements"
@@ -112,5 +135,11 @@ class CashMovement(Base):
     # Relaciones
     session = relationship("CashSession", back_populates="movements")
     
+    # Índices para optimización
+    __table_args__ = (
+        Index('idx_cash_movement_session_type', 'session_id', 'movement_type'),
+        Index('idx_cash_movement_session_created', 'session_id', 'created_at'),
+    )
+    
     def __repr__(self):
         return f"<CashMovement(id={self.id}, type='{self.movement_type}', amount={self.amount})>"
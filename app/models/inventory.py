@@ -157,6 +157,12 @@ class InventoryMovement(Base):
     product = relationship("Product")
     user = relationship("User", back_populates="inventory_movements")
     
+    # Índices para optimización
+    __table_args__ = (
+        Index('idx_inventory_movement_created', 'created_at'),
+        Index('idx_inventory_movement_product_created', 'product_id', 'created_at'),
+    )
+    
     def __repr__(self):
         return f"<InventoryMovement(id={self.id}, type='{self.adjustment_type}', quantity={self.quantity})>"
 
@@ -0,0 +1,19 @@
+"""
+Modelo para los contadores de numeración (ventas, pedidos, sesiones de caja)
+"""
+from sqlalchemy import Column, Integer, String, Date, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class NumberSequence(Base):
+    """Contador por ámbito y día; cada fila entrega números en O(1) con un UPDATE atómico"""
+    __tablename__ = "number_sequences"
+    
+    scope = Column(String(50), primary_key=True)  # "sale", "order", "cash_session:1", ...
+    day = Column(Date, primary_key=True)
+    last_value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<NumberSequence(scope='{self.scope}', day={self.day}, last_value={self.last_value})>"
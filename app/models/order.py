@@ -1,7 +1,7 @@
 """
 Modelo para los pedidos del restaurante
 """
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, Text, ForeignKey, Boolean, Enum
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, Text, ForeignKey, Boolean, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -50,6 +50,7 @@ class Order(Base):
     customer_name = Column(String(100), nullable=True)  # Para pedidos sin cliente registrado
     customer_phone = Column(String(20), nullable=True)
     notes = Column(Text, nullable=True)  # Notas especiales del pedido
+    kitchen_notes = Column(Text, nullable=True)  # Notas internas de cocina
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -63,6 +64,12 @@ class Order(Base):
     customer = relationship("Customer", backref="orders")
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
     
+    # Índices para optimización
+    __table_args__ = (
+        Index('idx_order_created', 'created_at'),
+        Index('idx_order_status_created', 'status', 'created_at'),
+    )
+    
     def __repr__(self):
         return f"<Order(id={self.id}, number='{self.order_number}', status='{self.status}')>"
     
@@ -131,3 +138,26 @@ class OrderItem(Base):
         """Calcular precio total del item"""
         self.total_price = self.unit_price * self.quantity
         return self.total_price
+
+
+# Tipos de evento que consumen las pantallas de cocina
+ORDER_EVENT_CREATED = "created"
+ORDER_EVENT_STARTED = "started"
+ORDER_EVENT_COMPLETED = "completed"
+ORDER_EVENT_STATUS_CHANGED = "status_changed"
+ORDER_EVENT_NOTES_UPDATED = "notes_updated"
+ORDER_EVENT_ITEMS_UPDATED = "items_updated"
+ORDER_EVENT_DELETED = "deleted"
+
+
+class OrderEvent(Base):
+    """Registro de cambios de pedidos; el id creciente sirve de cursor para reanudar el stream de cocina"""
+    __tablename__ = "order_events"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, nullable=False, index=True)  # Sin FK: el evento sobrevive al pedido
+    event_type = Column(String(30), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    
+    def __repr__(self):
+        return f"<OrderEvent(id={self.id}, order_id={self.order_id}, type='{self.event_type}')>"
@@ -1,7 +1,7 @@
 """
 Modelo de Producto para el sistema POS
 """
-from sqlalchemy import Column, Integer, String, Numeric, Boolean, DateTime, Text, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Numeric, Boolean, DateTime, Text, ForeignKey, Enum, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -141,6 +141,11 @@ class Product(Base):
     recipe_items = relationship("RecipeItem", back_populates="product")
     recipe = relationship("Recipe", back_populates="product", uselist=False)
     
+    # Índices para optimización (listados paginados por nombre)
+    __table_args__ = (
+        Index('idx_product_type_name', 'product_type', 'name', 'id'),
+    )
+    
     def __repr__(self):
         return f"<Product(id={self.id}, name='{self.name}', price={self.price})>"
     
@@ -2,8 +2,8 @@
 Modelos para Ventas
 """
 import enum
-from sqlalchemy import Column, Integer, String, Numeric, Text, Boolean, DateTime, ForeignKey, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Numeric, Text, Boolean, DateTime, ForeignKey, Index, func
+from sqlalchemy.orm import relationship, column_property
 from app.database import Base
 
 
@@ -47,8 +47,12 @@ class Sale(Base):
     tip = Column(Numeric(10, 2), default=0)
     commission = Column(Numeric(10, 2), default=0)
     
-    # Estado
-    status = Column(String(10), default=SaleStatus.PENDIENTE)
+    # Estado (active_history: los acumulados de ventas necesitan el valor
+    # anterior aunque el atributo estuviera expirado al cambiarlo)
+    status = column_property(Column(String(10), default=SaleStatus.PENDIENTE), active_history=True)
+    
+    # Auditoría
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relaciones
     customer = relationship("Customer", back_populates="sales")
@@ -56,6 +60,12 @@ class Sale(Base):
     items = relationship("SaleItem", back_populates="sale", cascade="all, delete-orphan")
     payments = relationship("PaymentMethod", back_populates="sale", cascade="all, delete-orphan")
     
+    # Índices para optimización
+    __table_args__ = (
+        Index('idx_sale_created', 'created_at'),
+        Index('idx_sale_status_created', 'status', 'created_at'),
+    )
+    
     def __repr__(self):
         return f"<Sale(id={self.id}, sale_number='{self.sale_number}', total={self.total})>"
 
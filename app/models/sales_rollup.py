@@ -0,0 +1,47 @@
+"""
+Modelos de acumulados diarios de ventas completadas (para reportes)
+"""
+from sqlalchemy import Column, Integer, String, Numeric, Date, ForeignKey
+from app.database import Base
+
+
+class SalesProductRollup(Base):
+    """Unidades e ingresos por día, hora y producto"""
+    __tablename__ = "sales_rollup_products"
+
+    day = Column(Date, primary_key=True)
+    hour = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(12, 2), nullable=False, default=0)
+    line_count = Column(Integer, nullable=False, default=0)  # Items de venta sumados
+
+    def __repr__(self):
+        return f"<SalesProductRollup(day={self.day}, hour={self.hour}, product_id={self.product_id})>"
+
+
+class SalesUserRollup(Base):
+    """Ventas e ingresos por día, hora y usuario que registró la venta"""
+    __tablename__ = "sales_rollup_users"
+
+    day = Column(Date, primary_key=True)
+    hour = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    sale_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(12, 2), nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<SalesUserRollup(day={self.day}, hour={self.hour}, user_id={self.user_id})>"
+
+
+class SalesPaymentRollup(Base):
+    """Pagos y montos por día y método de pago"""
+    __tablename__ = "sales_rollup_payments"
+
+    day = Column(Date, primary_key=True)
+    payment_type = Column(String(20), primary_key=True)
+    payment_count = Column(Integer, nullable=False, default=0)
+    amount = Column(Numeric(12, 2), nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<SalesPaymentRollup(day={self.day}, payment_type='{self.payment_type}')>"
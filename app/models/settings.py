@@ -22,6 +22,10 @@ class SystemSettings(Base):
         return f"<SystemSettings(key='{self.setting_key}', value='{self.setting_value}')>"
 
 
+# Clave reservada para el contador de versión del snapshot de configuraciones
+SETTINGS_VERSION_KEY = "_settings_version"
+
+
 # Configuraciones por defecto
 DEFAULT_SETTINGS = {
     "cash_register_password": "1234",  # Contraseña por defecto de caja
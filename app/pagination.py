@@ -0,0 +1,88 @@
+"""
+Paginación por cursor (keyset) sobre (clave de orden, id)
+
+Con OFFSET la base lee y descarta todas las filas anteriores a la página; con
+un cursor la consulta continúa con `WHERE (clave, id) > (última clave, último
+id)` y usa el índice, así que la página 500 cuesta lo mismo que la primera.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import Date, DateTime, Integer, String, tuple_
+from sqlalchemy.orm import Query
+from sqlalchemy.sql.elements import ColumnElement
+
+CURSOR_DESCRIPTION = (
+    "Paginación por cursor: vacío para la primera página y luego el `next_cursor` "
+    "recibido. Sin este parámetro se usa la paginación anterior con `skip`"
+)
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return getattr(value, "value", value)
+
+
+def _decode_value(column: ColumnElement, value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Date):
+        return date.fromisoformat(value)
+    # Un valor de otro tipo haría fallar la consulta en PostgreSQL
+    if isinstance(column.type, Integer) and (not isinstance(value, int) or isinstance(value, bool)):
+        raise TypeError(value)
+    if isinstance(column.type, String) and not isinstance(value, str):
+        raise TypeError(value)
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Cursor opaco con los valores de la última fila entregada"""
+    raw = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[ColumnElement]) -> List[Any]:
+    """Valores de un cursor para las columnas de orden (400 si no es válido)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        return [_decode_value(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginación inválido")
+
+
+def keyset_page(
+    query: Query,
+    columns: Sequence[ColumnElement],
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = False
+) -> Tuple[List[Any], Optional[str]]:
+    """Una página de `query` ordenada por `columns` (clave de orden, id).
+
+    La consulta debe seleccionar esas columnas y ninguna puede ser NULL. Se
+    pide una fila de más para saber si hay otra página; `next_cursor` es None
+    en la última.
+    """
+    if cursor:
+        key = tuple_(*columns)
+        values = tuple_(*decode_cursor(cursor, columns))
+        query = query.filter(key < values if descending else key > values)
+
+    order = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]._mapping
+    return rows, encode_cursor([last[column] for column in columns])
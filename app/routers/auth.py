@@ -2,14 +2,17 @@
 Router de autenticación
 """
 from datetime import timedelta, datetime
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.user import User
-from app.auth.security import verify_password, create_access_token, get_password_hash
+from app.auth.security import (
+    verify_password, create_access_token, get_password_hash, revoke_token, token_cache, revoked_tokens
+)
 from app.schemas.user import UserCreate, UserResponse, Token, UserLogin
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_user, require_admin
+from app.auth.user_cache import user_cache
 from app.config import settings
 
 router = APIRouter(prefix="/auth", tags=["autenticación"])
@@ -108,7 +111,27 @@ def login_json(user_data: UserLogin, db: Session = Depends(get_db)):
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+@router.post("/logout")
+def logout(request: Request, current_user: User = Depends(get_current_user)):
+    """Cerrar sesión: revoca el token presentado hasta su expiración"""
+    auth_header = request.headers.get("authorization", "")
+    token = auth_header.split(" ", 1)[1] if auth_header.startswith("Bearer ") else None
+    if token:
+        revoke_token(token)
+    return {"message": "Sesión cerrada"}
+
+
 @router.get("/me", response_model=UserResponse)
 def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Obtener información del usuario actual"""
-    return current_user 
\ No newline at end of file
+    return current_user
+
+
+@router.get("/cache-stats")
+def get_user_cache_stats(current_user: User = Depends(require_admin)):
+    """Estadísticas de las cachés de autenticación (por worker)"""
+    return {
+        **user_cache.stats(),
+        "tokens": token_cache.stats(),
+        "revoked_tokens": revoked_tokens.stats()
+    }
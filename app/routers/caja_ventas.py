@@ -2,10 +2,10 @@
 Módulo Unificado: Caja y Ventas
 Integra el sistema de caja con ventas en un solo módulo
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, date
 from decimal import Decimal
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Form, Body
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query, Form, Body
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
@@ -17,6 +17,9 @@ from app.models.product import Product
 from app.auth.dependencies import get_current_active_user
 from app.services.cash_service import CashService
 from app.services.settings_service import SettingsService
+from app.services.numbering_service import NumberingService
+from app.services.menu_availability_service import MenuAvailabilityService
+from app.timing import StageTimer
 
 router = APIRouter(prefix="/caja-ventas", tags=["caja-ventas"])
 
@@ -59,23 +62,14 @@ class AprobacionCierreRequest(BaseModel):
 # ESTADO Y CONTROL DE CAJA
 # ============================================================================
 
-@router.get("/estado")
-def get_estado_caja_ventas(
-    db: Session = Depends(get_db)
-):
-    """Obtener estado completo de caja y ventas"""
-    # Verificar que existe la caja principal
-    cash_register = CashService.get_main_cash_register(db)
-    if not cash_register:
-        cash_register = CashService.create_main_cash_register(db)
-    
-    # Obtener sesión activa
-    active_session = CashService.get_active_session(db, cash_register.id)
-    today_session = CashService.get_today_session(db, cash_register.id)
-    
-    # Obtener información del negocio
-    business_info = SettingsService.get_business_info(db)
-    
+def _estado_payload(
+    cash_register: CashRegister,
+    active_session: Optional[CashSession],
+    today_session: Optional[CashSession],
+    business_info: Dict[str, str],
+    requiere_caja: bool
+) -> Dict[str, Any]:
+    """Respuesta de /estado (compartida con la versión asíncrona)"""
     # Calcular estadísticas si hay sesión activa
     estadisticas = None
     if active_session:
@@ -97,7 +91,7 @@ def get_estado_caja_ventas(
         "sesion_activa": active_session is not None,
         "sesion_hoy": today_session is not None,
         "puede_vender": active_session is not None,
-        "requiere_caja": SettingsService.require_cash_register(db),
+        "requiere_caja": requiere_caja,
         "sesion_activa_info": {
             "id": active_session.id,
             "session_number": active_session.session_number,
@@ -120,6 +114,32 @@ def get_estado_caja_ventas(
     }
 
 
+@router.get("/estado")
+def get_estado_caja_ventas(
+    db: Session = Depends(get_db)
+):
+    """Obtener estado completo de caja y ventas"""
+    # Verificar que existe la caja principal
+    cash_register = CashService.get_main_cash_register(db)
+    if not cash_register:
+        cash_register = CashService.create_main_cash_register(db)
+    
+    # Obtener sesión activa
+    active_session = CashService.get_active_session(db, cash_register.id)
+    today_session = CashService.get_today_session(db, cash_register.id)
+    
+    # Obtener información del negocio
+    business_info = SettingsService.get_business_info(db)
+    
+    return _estado_payload(
+        cash_register,
+        active_session,
+        today_session,
+        business_info,
+        SettingsService.require_cash_register(db)
+    )
+
+
 # ============================================================================
 # APERTURA DE CAJA
 # ============================================================================
@@ -182,110 +202,152 @@ def abrir_caja(
 # REGISTRO DE VENTAS
 # ============================================================================
 
+def _validar_items_venta(request: VentaRequest, products: Dict[int, Product]) -> Tuple[List[Dict[str, Any]], Decimal]:
+    """Validar los items del carrito contra los productos cargados y calcular el total"""
+    total_venta = Decimal('0')
+    items_validos = []
+    
+    for item in request.items:
+        product_id = item.get('product_id')
+        quantity = item.get('quantity', 1)
+        price = Decimal(str(item.get('price', 0)))
+        
+        # Verificar producto
+        product = products.get(product_id)
+        if not product:
+            raise HTTPException(status_code=404, detail=f"Producto {product_id} no encontrado")
+        
+        subtotal = price * quantity
+        total_venta += subtotal
+        
+        items_validos.append({
+            'product': product,
+            'quantity': quantity,
+            'price': price,
+            'subtotal': subtotal
+        })
+    
+    if total_venta <= 0:
+        raise HTTPException(status_code=400, detail="El total de la venta debe ser mayor a 0")
+    
+    return items_validos, total_venta
+
+
+def _nueva_venta(
+    request: VentaRequest,
+    items_validos: List[Dict[str, Any]],
+    total_venta: Decimal,
+    sale_number: str,
+    user_id: int
+) -> Sale:
+    """Venta con sus items y método de pago, lista para agregar a la sesión"""
+    return Sale(
+        sale_number=sale_number,
+        user_id=user_id,
+        customer_id=request.customer_id,
+        total=total_venta,
+        status="pendiente",
+        items=[
+            SaleItem(
+                product_id=item_data['product'].id,
+                quantity=item_data['quantity'],
+                unit_price=item_data['price'],
+                total=item_data['subtotal']
+            )
+            for item_data in items_validos
+        ],
+        payments=[
+            PaymentMethod(
+                payment_type=request.payment_method,
+                amount=total_venta,
+                notes=request.notes
+            )
+        ]
+    )
+
+
 @router.post("/registrar-venta")
 def registrar_venta(
     request: VentaRequest,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Registrar una venta (solo si caja está abierta)"""
-    # Verificar que hay sesión activa
-    cash_register = CashService.get_main_cash_register(db)
-    if not cash_register:
-        raise HTTPException(status_code=404, detail="No hay caja registrada")
+    """Registrar una venta (solo si caja está abierta)
+
+    Todos los productos se resuelven en una sola consulta y la venta, sus
+    items, el pago y el movimiento de caja se confirman en una única
+    transacción. Los tiempos por etapa se devuelven en `Server-Timing`.
+    """
+    timer = StageTimer()
     
-    active_session = CashService.get_active_session(db, cash_register.id)
-    if not active_session:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No se puede registrar venta. La caja debe estar abierta"
-        )
+    # Verificar que hay sesión activa
+    with timer.stage("session"):
+        cash_register = CashService.get_main_cash_register(db)
+        if not cash_register:
+            raise HTTPException(status_code=404, detail="No hay caja registrada")
+        
+        active_session = CashService.get_active_session(db, cash_register.id)
+        if not active_session:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No se puede registrar venta. La caja debe estar abierta"
+            )
     
     try:
+        # Cargar todos los productos del carrito en una sola consulta
+        with timer.stage("products"):
+            product_ids = {item.get('product_id') for item in request.items}
+            products = {
+                product.id: product
+                for product in db.query(Product).filter(Product.id.in_(product_ids)).all()
+            }
+        
         # Calcular total de la venta
-        total_venta = Decimal('0')
-        items_validos = []
+        with timer.stage("totals"):
+            items_validos, total_venta = _validar_items_venta(request, products)
         
-        for item in request.items:
-            product_id = item.get('product_id')
-            quantity = item.get('quantity', 1)
-            price = Decimal(str(item.get('price', 0)))
+        with timer.stage("persist"):
+            # Generar número de venta único
+            sale_number = NumberingService.next_sale_number(db)
             
-            # Verificar producto
-            product = db.query(Product).filter(Product.id == product_id).first()
-            if not product:
-                raise HTTPException(status_code=404, detail=f"Producto {product_id} no encontrado")
+            # Crear la venta con sus items y método de pago (se insertan en el mismo flush)
+            sale = _nueva_venta(request, items_validos, total_venta, sale_number, current_user.id)
+            db.add(sale)
+            db.flush()  # Para obtener el ID
             
-            subtotal = price * quantity
-            total_venta += subtotal
-            
-            items_validos.append({
-                'product': product,
-                'quantity': quantity,
-                'price': price,
-                'subtotal': subtotal
-            })
-        
-        if total_venta <= 0:
-            raise HTTPException(status_code=400, detail="El total de la venta debe ser mayor a 0")
-        
-        # Generar número de venta único
-        from datetime import datetime
-        sale_number = f"V{datetime.now().strftime('%Y%m%d%H%M%S')}{current_user.id:03d}"
-        
-        # Crear la venta
-        sale = Sale(
-            sale_number=sale_number,
-            user_id=current_user.id,
-            customer_id=request.customer_id,
-            total=total_venta,
-            status="pendiente"
-        )
-        db.add(sale)
-        db.flush()  # Para obtener el ID
-        
-        # Crear items de venta
-        for item_data in items_validos:
-            sale_item = SaleItem(
+            # Registrar movimiento de caja dentro de la misma transacción
+            CashService.register_sale_movement(
+                db=db,
+                session_id=active_session.id,
                 sale_id=sale.id,
-                product_id=item_data['product'].id,
-                quantity=item_data['quantity'],
-                unit_price=item_data['price'],
-                total=item_data['subtotal']
+                amount=total_venta,
+                description=f"Venta #{sale.id}",
+                commit=False
             )
-            db.add(sale_item)
-        
-        # Crear método de pago
-        payment_method = PaymentMethod(
-            sale_id=sale.id,
-            payment_type=request.payment_method,
-            amount=total_venta,
-            notes=request.notes
-        )
-        db.add(payment_method)
+            # Leer antes del commit para no recargar las instancias expiradas
+            sale_id = sale.id
+            session_number = active_session.session_number
         
-        # Registrar movimiento de caja
-        CashService.register_sale_movement(
-            db=db,
-            session_id=active_session.id,
-            sale_id=sale.id,
-            amount=total_venta,
-            description=f"Venta #{sale.id}"
-        )
+        with timer.stage("commit"):
+            db.commit()
         
-        db.commit()
+        response.headers["Server-Timing"] = timer.header_value()
         
         return {
             "message": "Venta registrada exitosamente",
             "venta": {
-                "id": sale.id,
-                "total": sale.total,
+                "id": sale_id,
+                "total": total_venta,
                 "payment_method": request.payment_method,
                 "items_count": len(items_validos),
-                "session_number": active_session.session_number
+                "session_number": session_number
             }
         }
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error registrando venta: {str(e)}")
@@ -447,6 +509,23 @@ def get_movimientos_sesion(
     return result
 
 
+@router.get("/menu-disponibilidad")
+def get_menu_disponibilidad(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Unidades que se pueden preparar de cada plato con receta según el stock de ingredientes"""
+    availability = MenuAvailabilityService.get_availability(db)
+    return [
+        {
+            "product_id": product_id,
+            "unidades_disponibles": units,
+            "disponible": units > 0
+        }
+        for product_id, units in availability.items()
+    ]
+
+
 @router.get("/reporte-sesion/{session_id}")
 def get_reporte_sesion(
     session_id: int,
@@ -4,7 +4,7 @@ Router de clientes
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
 from app.models.customer import Customer, Credit, Payment
 from app.auth.dependencies import get_current_active_user, require_admin
@@ -217,7 +217,7 @@ def create_customer_payment(
 
 @router.get("/reports/debts")
 def get_debts_report(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Obtener reporte de deudas de clientes"""
@@ -248,7 +248,7 @@ def get_debts_report(
 
 @router.get("/reports/customers")
 def get_customers_report(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Obtener reporte general de clientes"""
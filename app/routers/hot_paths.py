@@ -0,0 +1,264 @@
+"""
+Versiones asíncronas de los endpoints de hora pico
+
+Se registran antes que los routers síncronos solo con
+`async_database_enabled`, y como atienden las mismas rutas las reemplazan. La
+lógica es la misma de cada router: el código de servicios corre con
+`AsyncSession.run_sync`, así que la espera de la BD no ocupa un hilo del
+threadpool.
+
+Lo que protege una caché con `threading.Lock` (numeración, configuraciones,
+disponibilidad del menú) no puede correr con `run_sync`: un greenlet que espera
+I/O con el lock tomado dejaría bloqueado el event loop al siguiente que lo
+pida. Esas partes usan primero el valor en memoria y, solo si hay que ir a la
+BD, pasan al threadpool con una sesión propia.
+"""
+import asyncio
+from typing import Any, Callable, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.database import SessionLocal, get_async_db
+from app.models.user import User, UserRole
+from app.models.order import Order
+from app.models.product import Product
+from app.auth.dependencies import get_current_user_async
+from app.services.cash_service import CashService
+from app.services.settings_service import SettingsService
+from app.services.numbering_service import NumberingService
+from app.services.table_service import (
+    TableService, floor_plan_cache, FLOOR_PLAN_KEY, floor_plan_generation, store_floor_plan
+)
+from app.services.menu_availability_service import MenuAvailabilityService
+from app.services.catalog_service import CatalogService
+from app.services.product_search_service import ProductSearchService
+from app.routers.caja_ventas import VentaRequest, _estado_payload, _validar_items_venta, _nueva_venta
+from app.routers.kitchen import KITCHEN_STATUSES, _kitchen_orders_query, _serialize_kitchen_order, _require_kitchen_role
+from app.routers.waiters import (
+    TableStatusResponse, ProductQuickResponse, WAITER_CATALOG_KEY, WAITER_SEARCH_LIMIT,
+    _waiter_products, _waiter_catalog, _serialize_waiter_products
+)
+from app.timing import StageTimer
+
+router = APIRouter()
+
+# Una sola recarga del plano por worker aunque varias tablets refresquen a la vez
+_floor_plan_reload = asyncio.Lock()
+
+
+async def _in_threadpool(function: Callable[..., Any], *args) -> Any:
+    """Ejecutar código de servicios síncronos en el threadpool con una sesión propia"""
+    def call():
+        db = SessionLocal()
+        try:
+            return function(db, *args)
+        finally:
+            db.close()
+    return await run_in_threadpool(call)
+
+
+async def _settings_snapshot():
+    """Configuraciones desde memoria; si toca verificar la versión, en el threadpool"""
+    return SettingsService.peek_snapshot() or await _in_threadpool(SettingsService.get_snapshot)
+
+
+# ============================================================================
+# CAJA Y VENTAS
+# ============================================================================
+
+@router.get("/caja-ventas/estado", tags=["caja-ventas"])
+async def get_estado_caja_ventas(
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Obtener estado completo de caja y ventas"""
+    snapshot = await _settings_snapshot()
+
+    def estado(sync_db: Session):
+        cash_register = CashService.get_main_cash_register(sync_db)
+        if not cash_register:
+            cash_register = CashService.create_main_cash_register(sync_db)
+
+        return _estado_payload(
+            cash_register,
+            CashService.get_active_session(sync_db, cash_register.id),
+            CashService.get_today_session(sync_db, cash_register.id),
+            SettingsService.get_business_info(sync_db, snapshot),
+            SettingsService.require_cash_register(sync_db, snapshot)
+        )
+
+    return await db.run_sync(estado)
+
+
+@router.post("/caja-ventas/registrar-venta", tags=["caja-ventas"])
+async def registrar_venta(
+    request: VentaRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """Registrar una venta (solo si caja está abierta)
+
+    Mismo flujo que la versión síncrona: productos en una consulta y venta,
+    items, pago y movimiento de caja en una única transacción. Los tiempos por
+    etapa se devuelven en `Server-Timing`.
+    """
+    timer = StageTimer()
+    user_id = current_user.id
+
+    def validar(sync_db: Session):
+        with timer.stage("session"):
+            cash_register = CashService.get_main_cash_register(sync_db)
+            if not cash_register:
+                raise HTTPException(status_code=404, detail="No hay caja registrada")
+
+            active_session = CashService.get_active_session(sync_db, cash_register.id)
+            if not active_session:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="No se puede registrar venta. La caja debe estar abierta"
+                )
+
+        with timer.stage("products"):
+            product_ids = {item.get('product_id') for item in request.items}
+            products = {
+                product.id: product
+                for product in sync_db.query(Product).filter(Product.id.in_(product_ids)).all()
+            }
+
+        with timer.stage("totals"):
+            items_validos, total_venta = _validar_items_venta(request, products)
+        return active_session, items_validos, total_venta
+
+    def persistir(sync_db: Session, sale_number: str):
+        sale = _nueva_venta(request, items_validos, total_venta, sale_number, user_id)
+        sync_db.add(sale)
+        sync_db.flush()  # Para obtener el ID
+
+        CashService.register_sale_movement(
+            db=sync_db,
+            session_id=active_session.id,
+            sale_id=sale.id,
+            amount=total_venta,
+            description=f"Venta #{sale.id}",
+            commit=False
+        )
+        return sale.id
+
+    try:
+        active_session, items_validos, total_venta = await db.run_sync(validar)
+
+        with timer.stage("persist"):
+            # La numeración reserva con su propio lock y conexión
+            sale_number = await _in_threadpool(NumberingService.next_sale_number)
+            sale_id = await db.run_sync(persistir, sale_number)
+
+        with timer.stage("commit"):
+            await db.commit()
+
+        response.headers["Server-Timing"] = timer.header_value()
+
+        return {
+            "message": "Venta registrada exitosamente",
+            "venta": {
+                "id": sale_id,
+                "total": total_venta,
+                "payment_method": request.payment_method,
+                "items_count": len(items_validos),
+                "session_number": active_session.session_number
+            }
+        }
+
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error registrando venta: {str(e)}")
+
+
+# ============================================================================
+# COCINA
+# ============================================================================
+
+@router.get("/kitchen/orders", tags=["cocina"])
+async def get_kitchen_orders(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """Obtener órdenes para la cocina"""
+    _require_kitchen_role(current_user, "Solo el personal de cocina puede acceder a esta vista")
+
+    def pedidos(sync_db: Session):
+        orders = _kitchen_orders_query(sync_db).filter(
+            Order.status.in_(KITCHEN_STATUSES)
+        ).order_by(Order.created_at.asc()).all()
+        return [_serialize_kitchen_order(order) for order in orders]
+
+    return await db.run_sync(pedidos)
+
+
+# ============================================================================
+# MESEROS
+# ============================================================================
+
+def _require_waiter_role(user: User) -> None:
+    if user.role not in [UserRole.MESERO, UserRole.ADMIN, UserRole.SUPERVISOR]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo meseros pueden acceder a esta información"
+        )
+
+
+@router.get("/waiters/tables/", response_model=List[TableStatusResponse], tags=["meseros"])
+async def get_tables_for_waiters(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """Obtener estado de todas las mesas para meseros"""
+    _require_waiter_role(current_user)
+
+    floor_plan = floor_plan_cache.get(FLOOR_PLAN_KEY)
+    if floor_plan is not None:
+        return floor_plan
+
+    async with _floor_plan_reload:
+        floor_plan = floor_plan_cache.get(FLOOR_PLAN_KEY)
+        if floor_plan is None:
+            generation = floor_plan_generation()
+            floor_plan = await db.run_sync(TableService._load_floor_plan)
+            store_floor_plan(generation, floor_plan)
+    return floor_plan
+
+
+@router.get("/waiters/products/", response_model=List[ProductQuickResponse], tags=["meseros"])
+async def get_products_for_waiters(
+    request: Request,
+    category: Optional[str] = None,
+    search: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """Obtener productos disponibles para meseros con filtros"""
+    _require_waiter_role(current_user)
+
+    if not search:
+        # El snapshot vigente no toca la BD; armarlo usa locks de hilos
+        snapshot = (
+            CatalogService.peek_snapshot((WAITER_CATALOG_KEY, category))
+            or await _in_threadpool(_waiter_catalog, category)
+        )
+        return CatalogService.response(request, snapshot)
+
+    # Con el índice al día la búsqueda no toca la BD
+    ranked_ids = ProductSearchService.peek_search(search, WAITER_SEARCH_LIMIT, category=category)
+    if ranked_ids is None:
+        ranked_ids = await _in_threadpool(ProductSearchService.search, search, WAITER_SEARCH_LIMIT, True, None, category)
+    products = await db.run_sync(_waiter_products, category, ranked_ids)
+    availability = MenuAvailabilityService.peek_availability()
+    if availability is None:
+        availability = await _in_threadpool(MenuAvailabilityService.get_availability)
+
+    return _serialize_waiter_products(products, availability)
@@ -8,7 +8,9 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_, desc
 import logging
 
-from app.database import get_db
+from app.database import get_db, get_read_db
+from app.dates import day_range
+from app.exports import EXPORT_FORMAT_PATTERN, export_response
 from app.models.user import User, UserRole
 from app.models.product import Product
 from app.models.product import Category
@@ -39,6 +41,11 @@ def get_inventory_service(db: Session = Depends(get_db)) -> InventoryService:
     return InventoryService(db)
 
 
+def get_report_inventory_service(db: Session = Depends(get_read_db)) -> InventoryService:
+    """Servicio de inventario de solo lectura para reportes (réplica si hay)"""
+    return InventoryService(db)
+
+
 # ==================== ENDPOINTS DE UBICACIONES ====================
 
 @router.post("/locations", response_model=InventoryLocationResponse)
@@ -235,6 +242,38 @@ def get_movements(
     return movements
 
 
+@router.get("/movements/export")
+def export_movements(
+    export_format: str = Query("xlsx", alias="format", pattern=EXPORT_FORMAT_PATTERN),
+    product_id: Optional[int] = Query(None, description="Filtrar por producto"),
+    movement_type: Optional[MovementType] = Query(None, description="Filtrar por tipo de movimiento"),
+    start_date: Optional[date] = Query(None, description="Fecha de inicio"),
+    end_date: Optional[date] = Query(None, description="Fecha de fin"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Exportar movimientos de inventario a Excel o CSV (por streaming, en lotes)"""
+    def build_query(db: Session):
+        query = db.query(
+            InventoryMovement.created_at, Product.code, Product.name, InventoryMovement.adjustment_type,
+            InventoryMovement.reason, InventoryMovement.quantity, InventoryMovement.previous_stock,
+            InventoryMovement.new_stock, User.full_name, InventoryMovement.notes
+        ).join(Product, Product.id == InventoryMovement.product_id).outerjoin(
+            User, User.id == InventoryMovement.user_id
+        )
+        if product_id:
+            query = query.filter(InventoryMovement.product_id == product_id)
+        if movement_type:
+            query = query.filter(InventoryMovement.adjustment_type == movement_type.value)
+        if start_date:
+            query = query.filter(InventoryMovement.created_at >= day_range(start_date)[0])
+        if end_date:
+            query = query.filter(InventoryMovement.created_at < day_range(end_date)[1])
+        return query.order_by(desc(InventoryMovement.created_at), desc(InventoryMovement.id))
+    
+    headers = ['Fecha', 'Código', 'Producto', 'Tipo', 'Motivo', 'Cantidad', 'Stock Anterior', 'Stock Nuevo', 'Usuario', 'Notas']
+    return export_response("movimientos_inventario", export_format, headers, build_query, sheet_name="Movimientos")
+
+
 @router.get("/movements/product/{product_id}", response_model=List[InventoryMovementResponse])
 def get_product_movements(
     product_id: int,
@@ -356,7 +395,7 @@ def complete_count(
 @router.get("/summary", response_model=InventorySummaryResponse)
 def get_inventory_summary(
     current_user: User = Depends(get_current_active_user),
-    inventory_service: InventoryService = Depends(get_inventory_service)
+    inventory_service: InventoryService = Depends(get_report_inventory_service)
 ):
     """Obtener resumen del inventario"""
     summary = inventory_service.get_inventory_summary()
@@ -368,7 +407,7 @@ def get_movement_report(
     start_date: date = Query(..., description="Fecha de inicio"),
     end_date: date = Query(..., description="Fecha de fin"),
     current_user: User = Depends(get_current_active_user),
-    inventory_service: InventoryService = Depends(get_inventory_service)
+    inventory_service: InventoryService = Depends(get_report_inventory_service)
 ):
     """Obtener reporte de movimientos de inventario"""
     if current_user.role not in [UserRole.ADMIN, UserRole.ALMACEN, UserRole.SUPERVISOR]:
@@ -384,7 +423,7 @@ def get_movement_report(
 @router.get("/report/low-stock", response_model=LowStockReport)
 def get_low_stock_report(
     current_user: User = Depends(get_current_active_user),
-    inventory_service: InventoryService = Depends(get_inventory_service)
+    inventory_service: InventoryService = Depends(get_report_inventory_service)
 ):
     """Obtener reporte de productos con stock bajo"""
     if current_user.role not in [UserRole.ADMIN, UserRole.ALMACEN, UserRole.SUPERVISOR]:
@@ -428,7 +467,7 @@ def get_low_stock_report(
 def get_expiration_report(
     days: int = Query(30, ge=1, le=365, description="Días hasta la expiración"),
     current_user: User = Depends(get_current_active_user),
-    inventory_service: InventoryService = Depends(get_inventory_service)
+    inventory_service: InventoryService = Depends(get_report_inventory_service)
 ):
     """Obtener reporte de productos próximos a expirar"""
     if current_user.role not in [UserRole.ADMIN, UserRole.ALMACEN, UserRole.SUPERVISOR]:
@@ -568,27 +607,29 @@ def adjust_stock_legacy(
 def get_daily_inventory_report(
     report_date: date = Query(default_factory=date.today),
     current_user: User = Depends(get_current_active_user),
-    inventory_service: InventoryService = Depends(get_inventory_service)
+    inventory_service: InventoryService = Depends(get_report_inventory_service)
 ):
     """Obtener reporte diario de inventario (endpoint legacy)"""
+    start, end = day_range(report_date)
     movements = inventory_service.db.query(InventoryMovement).filter(
-        func.date(InventoryMovement.created_at) == report_date
+        InventoryMovement.created_at >= start,
+        InventoryMovement.created_at < end
     ).all()
     
     summary = {
         "date": report_date,
         "total_movements": len(movements),
-        "additions": len([m for m in movements if m.movement_type in [MovementType.ENTRADA, MovementType.DEVOLUCION]]),
-        "subtractions": len([m for m in movements if m.movement_type in [MovementType.SALIDA, MovementType.MERMA, MovementType.CADUCIDAD]]),
-        "total_added": sum([m.quantity for m in movements if m.movement_type in [MovementType.ENTRADA, MovementType.DEVOLUCION]]),
-        "total_subtracted": sum([m.quantity for m in movements if m.movement_type in [MovementType.SALIDA, MovementType.MERMA, MovementType.CADUCIDAD]]),
+        "additions": len([m for m in movements if m.adjustment_type in [MovementType.ENTRADA, MovementType.DEVOLUCION]]),
+        "subtractions": len([m for m in movements if m.adjustment_type in [MovementType.SALIDA, MovementType.MERMA, MovementType.CADUCIDAD]]),
+        "total_added": sum([m.quantity for m in movements if m.adjustment_type in [MovementType.ENTRADA, MovementType.DEVOLUCION]]),
+        "total_subtracted": sum([m.quantity for m in movements if m.adjustment_type in [MovementType.SALIDA, MovementType.MERMA, MovementType.CADUCIDAD]]),
         "movements": [
             {
                 "id": m.id,
                 "product_name": m.product.name,
-                "type": m.movement_type.value,
+                "type": m.adjustment_type,
                 "quantity": m.quantity,
-                "reason": m.reason.value,
+                "reason": m.reason,
                 "created_at": m.created_at,
                 "user": m.user.username if m.user else "Sistema"
             }
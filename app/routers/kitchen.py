@@ -1,91 +1,230 @@
 """
 Router para gestión de cocina - Vista unificada
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+import time
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, SessionLocal
 from app.models.user import User, UserRole
-from app.models.order import Order, OrderItem
+from app.models.order import Order, OrderItem, OrderStatus
 from app.models.location import Table, TableStatus
 from app.models.product import Product
-from app.schemas.order import KitchenOrderResponse
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_user, get_stream_user
+from app.services.event_bus import event_bus, ORDER_TOPIC
+from app.services.order_event_service import OrderEventService
+from app.sse import format_sse, SSE_HEADERS
 
 router = APIRouter(prefix="/kitchen", tags=["cocina"])
 
 
-@router.get("/orders", response_model=List[KitchenOrderResponse])
+# Estados que se muestran en la pantalla de cocina
+KITCHEN_STATUSES = [OrderStatus.PENDING, OrderStatus.PREPARING, OrderStatus.READY]
+
+# Tiempo máximo que el stream espera un id de evento faltante antes de saltarlo
+GAP_GRACE_SECONDS = 2.0
+GAP_RETRY_SECONDS = 0.2
+
+
+def _kitchen_orders_query(db: Session):
+    """Consulta de pedidos con las relaciones que necesita la cocina"""
+    return db.query(Order).options(
+        joinedload(Order.table),
+        joinedload(Order.waiter),
+        joinedload(Order.items).joinedload(OrderItem.product)
+    )
+
+
+def _serialize_kitchen_order(order: Order) -> dict:
+    """Convertir un pedido al formato de la vista de cocina"""
+    # Construir items con información del producto
+    order_items = []
+    for item in order.items:
+        order_items.append({
+            "id": item.id,
+            "order_id": item.order_id,
+            "product_id": item.product_id,
+            "quantity": item.quantity,
+            "unit_price": float(item.unit_price),
+            "subtotal": float(item.total_price),
+            "notes": item.notes,
+            "special_instructions": item.special_instructions,
+            "is_ready": item.is_ready,
+            "created_at": item.created_at,
+            "updated_at": item.updated_at,
+            "product": {
+                "id": item.product.id,
+                "name": item.product.name,
+                "description": item.product.description,
+                "price": float(item.product.price) if item.product.price else 0.0
+            } if item.product else None
+        })
+    
+    return {
+        "id": order.id,
+        "order_number": order.order_number,
+        "table_number": str(order.table.table_number) if order.table else "N/A",
+        "waiter_name": order.waiter.full_name if order.waiter else "N/A",
+        "status": order.status,
+        "notes": order.notes,
+        "kitchen_notes": order.kitchen_notes,
+        "created_at": order.created_at,
+        "updated_at": order.updated_at,
+        "items": order_items
+    }
+
+
+def _require_kitchen_role(user: User, detail: str) -> None:
+    """Solo personal de cocina y admin"""
+    if user.role not in [UserRole.COCINA, UserRole.ADMIN]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+
+
+@router.get("/orders")
 def get_kitchen_orders(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Obtener órdenes para la cocina"""
-    # Solo personal de cocina y admin pueden ver esto
-    if current_user.role not in [UserRole.COCINA, UserRole.ADMIN]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Solo el personal de cocina puede acceder a esta vista"
-        )
+    _require_kitchen_role(current_user, "Solo el personal de cocina puede acceder a esta vista")
     
-    # Obtener órdenes pendientes y en preparación con relaciones cargadas
-    orders = db.query(Order).options(
-        joinedload(Order.table),
-        joinedload(Order.waiter),
-        joinedload(Order.items).joinedload(OrderItem.product)
-    ).filter(
-        Order.status.in_(["pendiente", "en_preparacion", "listo"])
-    ).order_by(Order.priority.desc(), Order.created_at.asc()).all()
-    
-    kitchen_orders = []
-    for order in orders:
-        # Construir items con información del producto
-        order_items = []
-        for item in order.items:
-            item_data = {
-                "id": item.id,
-                "order_id": item.order_id,  # Agregar el campo order_id que falta
-                "product_id": item.product_id,
-                "quantity": item.quantity,
-                "unit_price": float(item.unit_price),
-                "subtotal": float(item.subtotal),
-                "special_instructions": item.special_instructions,
-                "status": item.status,
-                "created_at": item.created_at,
-                "updated_at": item.updated_at,
-                "kitchen_start_time": item.kitchen_start_time,
-                "kitchen_end_time": item.kitchen_end_time,
-                "product": {
-                    "id": item.product.id,
-                    "name": item.product.name,
-                    "description": item.product.description,
-                    "price": float(item.product.price) if item.product.price else 0.0
-                } if item.product else None
-            }
-            order_items.append(item_data)
+    # Obtener órdenes pendientes, en preparación y listas con relaciones cargadas
+    orders = _kitchen_orders_query(db).filter(
+        Order.status.in_(KITCHEN_STATUSES)
+    ).order_by(Order.created_at.asc()).all()
+    
+    return [_serialize_kitchen_order(order) for order in orders]
+
+
+def _read_stream_batch(cursor: Optional[int], skip_gaps: bool = False) -> Tuple[int, Optional[List[dict]], List[dict], bool]:
+    """Leer eventos desde el cursor; si el cursor no es reanudable devuelve un snapshot.
+
+    Retorna (nuevo_cursor, snapshot | None, mensajes, hay_hueco). Un hueco en los
+    ids suele ser una transacción que aún no confirma: se espera a que aparezca
+    salvo que `skip_gaps` indique que ya pasó el tiempo de gracia (rollback).
+    """
+    db = SessionLocal()
+    try:
+        oldest, latest = OrderEventService.get_cursor_bounds(db)
+        
+        # Pantalla nueva, o cursor purgado / de otra base: enviar el estado completo
+        if cursor is None or cursor > latest or (oldest and cursor < oldest - 1):
+            orders = _kitchen_orders_query(db).filter(
+                Order.status.in_(KITCHEN_STATUSES)
+            ).order_by(Order.created_at.asc()).all()
+            return latest, [_serialize_kitchen_order(order) for order in orders], [], False
+        
+        events = []
+        has_gap = False
+        expected_id = cursor + 1
+        for order_event in OrderEventService.get_events_since(db, cursor):
+            if order_event.id != expected_id and not skip_gaps:
+                has_gap = True
+                break
+            events.append(order_event)
+            expected_id = order_event.id + 1
+        
+        if not events:
+            return cursor, None, [], has_gap
+        
+        # Agrupar por pedido: cada pedido se envía una vez con su último id de evento
+        grouped: Dict[int, dict] = {}
+        for order_event in events:
+            entry = grouped.setdefault(order_event.order_id, {"event_id": 0, "types": []})
+            entry["event_id"] = order_event.id
+            if order_event.event_type not in entry["types"]:
+                entry["types"].append(order_event.event_type)
         
-        # Convertir a diccionario para evitar problemas de validación
-        kitchen_order_dict = {
-            "id": order.id,
-            "order_number": order.order_number,
-            "table_number": str(order.table.table_number) if order.table else "N/A",
-            "waiter_name": order.waiter.full_name if order.waiter else "N/A",
-            "people_count": order.people_count,
-            "status": order.status,
-            "priority": order.priority,
-            "notes": order.notes,
-            "kitchen_notes": order.kitchen_notes,
-            "created_at": order.created_at,
-            "kitchen_start_time": order.kitchen_start_time,
-            "kitchen_end_time": order.kitchen_end_time,
-            "items": order_items
+        orders = {
+            order.id: order
+            for order in _kitchen_orders_query(db).filter(Order.id.in_(grouped.keys())).all()
         }
-        kitchen_orders.append(kitchen_order_dict)
+        
+        messages = []
+        for order_id, entry in sorted(grouped.items(), key=lambda pair: pair[1]["event_id"]):
+            order = orders.get(order_id)
+            visible = order is not None and order.status in KITCHEN_STATUSES
+            messages.append({
+                "event_id": entry["event_id"],
+                "type": entry["types"][-1],
+                "types": entry["types"],
+                "order_id": order_id,
+                # None indica que el pedido ya no debe mostrarse en cocina
+                "order": _serialize_kitchen_order(order) if visible else None
+            })
+        return events[-1].id, None, messages, has_gap
+    finally:
+        db.close()
+
+
+@router.get("/stream")
+def stream_kitchen_orders(
+    request: Request,
+    cursor: Optional[int] = Query(None, description="Último id de evento recibido"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    current_user: User = Depends(get_stream_user)
+):
+    """Stream SSE de cambios de pedidos para las pantallas de cocina.
+
+    Al conectar sin cursor se envía un evento `snapshot` con los pedidos activos;
+    luego llegan eventos `created`, `started`, `completed`, `notes_updated`,
+    `items_updated`, `status_changed` o `deleted` con el pedido ya serializado.
+    El navegador reenvía `Last-Event-ID` al reconectar y solo recibe lo que se perdió.
+    Los avisos del bus de eventos despiertan el stream; la relectura periódica
+    es solo un respaldo.
+    """
+    _require_kitchen_role(current_user, "Solo el personal de cocina puede acceder a esta vista")
     
-    return kitchen_orders
+    resume_from = cursor
+    if last_event_id and last_event_id.isdigit():
+        resume_from = int(last_event_id)
+    
+    async def event_generator():
+        current = resume_from
+        last_sent = time.monotonic()
+        gap_seen_at = None
+        subscription = event_bus.open_subscription(ORDER_TOPIC)
+        yield "retry: 3000\n\n"
+        
+        try:
+            while not await request.is_disconnected():
+                skip_gaps = gap_seen_at is not None and time.monotonic() - gap_seen_at >= GAP_GRACE_SECONDS
+                current, snapshot, messages, has_gap = await run_in_threadpool(
+                    _read_stream_batch, current, skip_gaps
+                )
+                gap_seen_at = (gap_seen_at or time.monotonic()) if has_gap else None
+                
+                if snapshot is not None:
+                    yield format_sse({"cursor": current, "orders": snapshot}, "snapshot", current)
+                    last_sent = time.monotonic()
+                for message in messages:
+                    yield format_sse(message, message["type"], message["event_id"])
+                    last_sent = time.monotonic()
+                
+                if time.monotonic() - last_sent >= settings.kitchen_stream_heartbeat_seconds:
+                    yield ": ping\n\n"
+                    last_sent = time.monotonic()
+                
+                # Esperar un aviso del bus; con un hueco pendiente se reintenta pronto
+                timeout = GAP_RETRY_SECONDS if has_gap else min(
+                    settings.kitchen_stream_poll_seconds, settings.kitchen_stream_heartbeat_seconds
+                )
+                if await subscription.get(timeout) is not None:
+                    subscription.drain()  # Una sola lectura por ráfaga de eventos
+        finally:
+            subscription.close()
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
 
 
 @router.put("/orders/{order_id}/start")
@@ -108,19 +247,13 @@ def start_order_preparation(
             detail="Orden no encontrada"
         )
     
-    if order.status != "pendiente":
+    if order.status != OrderStatus.PENDING:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Solo se pueden iniciar órdenes pendientes"
         )
     
-    order.status = "en_preparacion"
-    order.kitchen_start_time = datetime.now()
-    
-    # Marcar items como en preparación
-    for item in order.items:
-        item.status = "en_preparacion"
-        item.kitchen_start_time = datetime.now()
+    order.status = OrderStatus.PREPARING
     
     db.commit()
     db.refresh(order)
@@ -148,19 +281,17 @@ def complete_order(
             detail="Orden no encontrada"
         )
     
-    if order.status != "en_preparacion":
+    if order.status != OrderStatus.PREPARING:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Solo se pueden completar órdenes en preparación"
         )
     
-    order.status = "listo"
-    order.kitchen_end_time = datetime.now()
+    order.status = OrderStatus.READY
     
     # Marcar items como listos
     for item in order.items:
-        item.status = "listo"
-        item.kitchen_end_time = datetime.now()
+        item.is_ready = True
     
     db.commit()
     db.refresh(order)
@@ -1,16 +1,20 @@
 """
 Router para sistema de notificaciones en tiempo real
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
 
+from app.config import settings
 from app.database import get_db
 from app.models.user import User, UserRole
-from app.models.order import Order
+from app.models.order import Order, OrderStatus, ORDER_EVENT_CREATED, ORDER_EVENT_COMPLETED
 from app.models.location import Table
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_user, get_stream_user
+from app.services.event_bus import BusEvent, event_bus, ORDER_TOPIC, CASH_MOVEMENT, CASH_SESSION_OPENED, CASH_SESSION_CLOSED
+from app.sse import format_sse, SSE_HEADERS
 
 router = APIRouter(prefix="/notifications", tags=["notificaciones"])
 
@@ -136,6 +140,101 @@ class NotificationService:
             })
         
         return sorted(notifications, key=lambda x: x["created_at"], reverse=True)
+    
+    @staticmethod
+    def notification_from_event(bus_event: BusEvent, user_id: int, role: UserRole) -> Optional[dict]:
+        """Convertir un evento del bus en la notificación que corresponde al rol del usuario"""
+        data = bus_event.data
+        is_admin = role == UserRole.ADMIN
+        created_at = datetime.fromtimestamp(bus_event.created_at)
+        
+        if bus_event.topic == f"{ORDER_TOPIC}{ORDER_EVENT_COMPLETED}":
+            if is_admin or (role == UserRole.MESERO and data.get("waiter_id") == user_id):
+                return {
+                    "id": f"order_ready_{data['order_id']}",
+                    "type": "order_ready",
+                    "title": "Orden Lista",
+                    "message": f"Orden {data.get('order_number', data['order_id'])} lista para servir",
+                    "order_id": data["order_id"],
+                    "table_id": data.get("table_id"),
+                    "priority": "high",
+                    "created_at": created_at,
+                    "icon": "check-circle",
+                    "color": "success"
+                }
+        
+        elif bus_event.topic == f"{ORDER_TOPIC}{ORDER_EVENT_CREATED}":
+            if is_admin or role == UserRole.COCINA:
+                return {
+                    "id": f"order_new_{data['order_id']}",
+                    "type": "order_new",
+                    "title": "Nueva Orden",
+                    "message": f"Orden {data.get('order_number', data['order_id'])} recibida",
+                    "order_id": data["order_id"],
+                    "priority": "medium",
+                    "created_at": created_at,
+                    "icon": "receipt",
+                    "color": "primary"
+                }
+        
+        elif bus_event.topic.startswith(ORDER_TOPIC) and data.get("status") == OrderStatus.SERVED.value:
+            if is_admin or role == UserRole.CAJA:
+                return {
+                    "id": f"payment_pending_{data['order_id']}",
+                    "type": "payment_pending",
+                    "title": "Pago Pendiente",
+                    "message": f"Orden {data.get('order_number', data['order_id'])} servida, pendiente de pago",
+                    "order_id": data["order_id"],
+                    "table_id": data.get("table_id"),
+                    "priority": "medium",
+                    "created_at": created_at,
+                    "icon": "cash",
+                    "color": "warning"
+                }
+        
+        return None
+
+
+# Tópicos que interesan a cada rol (el dashboard de admin recibe todo)
+ROLE_TOPICS = {
+    UserRole.MESERO: [ORDER_TOPIC],
+    UserRole.COCINA: [ORDER_TOPIC],
+    UserRole.CAJA: [ORDER_TOPIC, CASH_MOVEMENT, CASH_SESSION_OPENED, CASH_SESSION_CLOSED],
+    UserRole.ADMIN: ["*"],
+}
+
+
+@router.get("/stream")
+def stream_notifications(
+    request: Request,
+    current_user: User = Depends(get_stream_user)
+):
+    """Stream SSE de eventos de pedidos y caja para las vistas de meseros, cocina, caja y dashboard.
+
+    Cada mensaje lleva el tópico del bus, sus datos y, si aplica al rol, la
+    notificación ya armada; las vistas lo usan para refrescarse sin polling.
+    """
+    topics = ROLE_TOPICS.get(current_user.role, [ORDER_TOPIC])
+    user_id, role = current_user.id, current_user.role
+    
+    async def event_generator():
+        subscription = event_bus.open_subscription(topics)
+        yield "retry: 3000\n\n"
+        try:
+            while not await request.is_disconnected():
+                bus_event = await subscription.get(settings.kitchen_stream_heartbeat_seconds)
+                if bus_event is None:
+                    yield ": ping\n\n"
+                    continue
+                yield format_sse({
+                    "topic": bus_event.topic,
+                    "data": bus_event.data,
+                    "notification": NotificationService.notification_from_event(bus_event, user_id, role)
+                }, bus_event.topic)
+        finally:
+            subscription.close()
+    
+    return StreamingResponse(event_generator(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 
 @router.get("/")
@@ -3,38 +3,89 @@ Router de productos
 """
 import os
 import uuid
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form, Request, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 import xlsxwriter
 from io import BytesIO
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
 from app.database import get_db
+from app.exports import EXPORT_FORMAT_PATTERN, MEDIA_TYPES, export_response
 from app.models.user import User
 from app.models.product import Product, Category, SubCategory, ProductType
 from app.models.inventory import InventoryMovement
 from app.schemas.product import (
     ProductCreate, ProductUpdate, ProductResponse, InventoryProductResponse,
     CategoryCreate, CategoryUpdate, CategoryResponse,
-    SubCategoryCreate, SubCategoryUpdate, SubCategoryResponse
+    SubCategoryCreate, SubCategoryUpdate, SubCategoryResponse,
+    ProductListItem, ProductPage, InventoryProductListItem, InventoryProductPage,
+    BarcodeScanRequest
 )
+from app.schemas.pagination import CursorPage
+from app.pagination import CURSOR_DESCRIPTION, keyset_page
 from app.auth import get_current_active_user, require_admin
+from app.services.catalog_service import CatalogService
+from app.services.product_search_service import ProductSearchService
+from app.services.product_lookup_service import ProductLookupService
+from app.config import settings
 
 router = APIRouter(prefix="/products", tags=["productos"])
 
+# Clave de orden de los listados por cursor
+PRODUCT_SORT_PATTERN = "^(id|name)$"
+
+# Serializadores de las respuestas que se guardan en el snapshot del catálogo
+_PRODUCT_LIST = TypeAdapter(List[ProductResponse])
+_CATEGORY_LIST = TypeAdapter(List[CategoryResponse])
+
+
+def _product_sort_columns(sort: str):
+    """(clave de orden, id) para la paginación por cursor"""
+    return (Product.id,) if sort == "id" else (Product.name, Product.id)
+
+
+def _product_page(db: Session, query_filter, cursor: str, limit: int, sort: str) -> ProductPage:
+    """Página de productos con solo las columnas de los listados"""
+    query = db.query(
+        *(getattr(Product, field) for field in ProductListItem.model_fields)
+    ).filter(*query_filter)
+    rows, next_cursor = keyset_page(query, _product_sort_columns(sort), cursor, limit)
+    return ProductPage(
+        items=[ProductListItem.model_validate(row) for row in rows],
+        next_cursor=next_cursor
+    )
+
 # ==================== ENDPOINTS ESPECÍFICOS POR TIPO (DEBEN IR ANTES QUE LAS RUTAS GENÉRICAS) ====================
 
 @router.get("/inventory")
 def get_inventory_products(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    sort: str = Query("name", pattern=PRODUCT_SORT_PATTERN),
     db: Session = Depends(get_db)
 ):
-    """Obtener productos de inventario (materias primas) - versión debug"""
+    """Obtener productos de inventario (materias primas) - versión debug
+    
+    Con `cursor` devuelve `{items, next_cursor}` con las columnas de la
+    pantalla de inventario.
+    """
+    if cursor is not None:
+        query = db.query(
+            *(getattr(Product, field) for field in InventoryProductListItem.model_fields)
+        ).filter(
+            Product.is_active == True,
+            Product.product_type == ProductType.INVENTORY
+        )
+        rows, next_cursor = keyset_page(query, _product_sort_columns(sort), cursor, limit)
+        return InventoryProductPage(
+            items=[InventoryProductListItem.model_validate(row) for row in rows],
+            next_cursor=next_cursor
+        )
+    
     try:
         # Primero probemos sin filtros
         print("🔍 Iniciando consulta de productos...")
@@ -98,17 +149,20 @@ def get_inventory_products(
             "details": error_details
         }
 
-@router.get("/sales", response_model=List[ProductResponse])
+@router.get("/sales", response_model=Union[List[ProductResponse], ProductPage])
 def get_sales_products(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    sort: str = Query("name", pattern=PRODUCT_SORT_PATTERN),
     db: Session = Depends(get_db)
 ):
     """Obtener productos de venta (platos preparados)"""
-    products = db.query(Product).filter(
-        Product.is_active == True,
-        Product.product_type == ProductType.SALES
-    ).offset(skip).limit(limit).all()
+    query_filter = (Product.is_active == True, Product.product_type == ProductType.SALES)
+    if cursor is not None:
+        return _product_page(db, query_filter, cursor, limit, sort)
+    
+    products = db.query(Product).filter(*query_filter).order_by(Product.id).offset(skip).limit(limit).all()
     return products
 
 @router.get("/inventory/low-stock", response_model=List[InventoryProductResponse])
@@ -201,9 +255,57 @@ def save_product_image(file: UploadFile) -> str:
 
 # Rutas para categorías
 @router.get("/categories", response_model=List[CategoryResponse])
-def get_categories(db: Session = Depends(get_db)):
-    """Obtener todas las categorías (activas e inactivas)"""
-    return db.query(Category).all()
+def get_categories(request: Request, db: Session = Depends(get_db)):
+    """Obtener todas las categorías (activas e inactivas)
+    
+    Se sirve desde el snapshot del catálogo, con ETag.
+    """
+    snapshot = CatalogService.get_snapshot("categories", lambda: _CATEGORY_LIST.dump_json(
+        _CATEGORY_LIST.validate_python(db.query(Category).all(), from_attributes=True)
+    ))
+    return CatalogService.response(request, snapshot)
+
+@router.get("/catalog-cache-stats")
+def get_catalog_cache_stats(current_user: User = Depends(require_admin)):
+    """Estadísticas del snapshot del catálogo (por worker)"""
+    return CatalogService.stats()
+
+@router.get("/search-index-stats")
+def get_search_index_stats(current_user: User = Depends(require_admin)):
+    """Estadísticas del índice de búsqueda de productos (por worker)"""
+    return ProductSearchService.stats()
+
+@router.get("/scan-cache-stats")
+def get_scan_cache_stats(current_user: User = Depends(require_admin)):
+    """Estadísticas de la caché de códigos del escáner (por worker)"""
+    return ProductLookupService.stats()
+
+@router.post("/scan")
+def scan_products(
+    scan: BarcodeScanRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Resolver una ráfaga de códigos del escáner (código de barras, SKU o código)
+    
+    Devuelve un resultado por código en el mismo orden, repetidos incluidos,
+    con la forma de InventoryAlertService.process_barcode_scan.
+    """
+    if len(scan.codes) > settings.scan_batch_max_codes:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {settings.scan_batch_max_codes} códigos por escaneo"
+        )
+    
+    results = []
+    missing = []
+    for code, record in zip(scan.codes, ProductLookupService.lookup_many(db, scan.codes)):
+        if record is None:
+            missing.append(code)
+            results.append({"success": False, "message": "Producto no encontrado", "barcode": code})
+        else:
+            results.append(record.to_scan_result())
+    return {"results": results, "found": len(scan.codes) - len(missing), "missing": missing}
 
 @router.get("/categories/{category_id}", response_model=CategoryResponse)
 def get_category(category_id: int, db: Session = Depends(get_db)):
@@ -290,21 +392,35 @@ def create_subcategory(
     return db_subcategory
 
 # Rutas para productos
-@router.get("/", response_model=List[ProductResponse])
+@router.get("/", response_model=Union[List[ProductResponse], ProductPage])
 def get_products(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     product_type: Optional[ProductType] = Query(None, description="Filtrar por tipo de producto"),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    sort: str = Query("id", pattern=PRODUCT_SORT_PATTERN),
     db: Session = Depends(get_db)
 ):
-    """Obtener lista de productos"""
-    query = db.query(Product).filter(Product.is_active == True)
+    """Obtener lista de productos
     
+    Con `cursor` devuelve `{items, next_cursor}` con las columnas de los
+    listados; sin él, la lista completa de la página `skip`/`limit` desde el
+    snapshot del catálogo, con ETag.
+    """
+    query_filter = [Product.is_active == True]
     if product_type:
-        query = query.filter(Product.product_type == product_type)
+        query_filter.append(Product.product_type == product_type)
     
-    products = query.offset(skip).limit(limit).all()
-    return products
+    if cursor is not None:
+        return _product_page(db, query_filter, cursor, limit, sort)
+    
+    def load() -> bytes:
+        products = db.query(Product).filter(*query_filter).order_by(Product.id).offset(skip).limit(limit).all()
+        return _PRODUCT_LIST.dump_json(_PRODUCT_LIST.validate_python(products, from_attributes=True))
+    
+    key = ("products", skip, limit, product_type.value if product_type else None)
+    return CatalogService.response(request, CatalogService.get_snapshot(key, load))
 
 @router.post("/debug")
 async def debug_create_product(
@@ -521,54 +637,29 @@ def import_products(
         "total_rows": len(products.get("products", []))
     }
 
-# Exportar productos a Excel
+# Exportar productos a Excel o CSV
 @router.get("/export")
 def export_products(
-    db: Session = Depends(get_db),
+    export_format: str = Query("xlsx", alias="format", pattern=EXPORT_FORMAT_PATTERN),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Exportar productos a Excel"""
-    products = db.query(Product).filter(Product.is_active == True).all()
-    
-    # Crear archivo Excel en memoria
-    output = BytesIO()
-    workbook = xlsxwriter.Workbook(output)
-    worksheet = workbook.add_worksheet("Productos")
+    """Exportar productos activos a Excel o CSV (por streaming, en lotes)"""
+    def build_query(db: Session):
+        return db.query(
+            Product.code, Product.name, Product.price, Product.cost_price, Product.stock,
+            Product.min_stock, Product.max_stock, Product.category, Product.description, Product.is_active
+        ).filter(Product.is_active == True).order_by(Product.id)
     
-    # Estilos
-    header_format = workbook.add_format({
-        'bold': True,
-        'bg_color': '#667eea',
-        'font_color': 'white',
-        'border': 1
-    })
+    def to_row(product):
+        return (
+            product.code, product.name, product.price, product.cost_price or 0, product.stock,
+            product.min_stock or 0, product.max_stock or 100,
+            product.category.name if product.category else '',
+            product.description or '', product.is_active
+        )
     
-    # Encabezados
     headers = ['Código', 'Nombre', 'Precio', 'Precio Costo', 'Stock', 'Stock Mínimo', 'Stock Máximo', 'Categoría', 'Descripción', 'Activo']
-    for col, header in enumerate(headers):
-        worksheet.write(0, col, header, header_format)
-    
-    # Datos
-    for row, product in enumerate(products, 1):
-        worksheet.write(row, 0, product.code)
-        worksheet.write(row, 1, product.name)
-        worksheet.write(row, 2, product.price)
-        worksheet.write(row, 3, product.cost_price or 0)
-        worksheet.write(row, 4, product.stock)
-        worksheet.write(row, 5, product.min_stock or 0)
-        worksheet.write(row, 6, product.max_stock or 100)
-        worksheet.write(row, 7, product.category.name if product.category else '')
-        worksheet.write(row, 8, product.description or '')
-        worksheet.write(row, 9, 'Sí' if product.is_active else 'No')
-    
-    workbook.close()
-    output.seek(0)
-    
-    return FileResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        filename="productos.xlsx"
-    )
+    return export_response("productos", export_format, headers, build_query, to_row, sheet_name="Productos")
 
 @router.get("/{product_id}", response_model=ProductResponse)
 def get_product(product_id: int, db: Session = Depends(get_db)):
@@ -747,12 +838,12 @@ def export_template(
     worksheet.write(10, 8, "Sí")
     
     workbook.close()
-    output.seek(0)
     
-    return FileResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        filename="plantilla_productos.xlsx"
+    # FileResponse espera una ruta; la plantilla es pequeña y va completa en memoria
+    return Response(
+        content=output.getvalue(),
+        media_type=MEDIA_TYPES["xlsx"],
+        headers={"Content-Disposition": 'attachment; filename="plantilla_productos.xlsx"'}
     )
 
 
@@ -975,6 +1066,9 @@ class InventoryMovementResponse(BaseModel):
         from_attributes = True
 
 
+InventoryMovementPage = CursorPage[InventoryMovementResponse]
+
+
 @router.get("/inventory/movements/debug")
 def debug_inventory_movements(
     db: Session = Depends(get_db),
@@ -1015,7 +1109,7 @@ def debug_inventory_movements(
             "details": error_details
         }
 
-@router.get("/inventory/movements", response_model=List[InventoryMovementResponse])
+@router.get("/inventory/movements", response_model=Union[List[InventoryMovementResponse], InventoryMovementPage])
 def get_inventory_movements(
     start_date: Optional[str] = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="Fecha de fin (YYYY-MM-DD)"),
@@ -1023,29 +1117,68 @@ def get_inventory_movements(
     movement_type: Optional[str] = Query(None, description="Tipo de movimiento"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Obtener histórico de movimientos de inventario"""
+    """Obtener histórico de movimientos de inventario
+    
+    Con `cursor` devuelve `{items, next_cursor}`, del más reciente al más
+    antiguo, leyendo solo las columnas de la respuesta.
+    """
     try:
         
-        # Construir consulta base (sin JOIN con User por ahora)
-        query = db.query(InventoryMovement).join(Product)
-        
         # Aplicar filtros
+        query_filter = []
         if start_date:
             start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
-            query = query.filter(InventoryMovement.created_at >= start_datetime)
+            query_filter.append(InventoryMovement.created_at >= start_datetime)
         
         if end_date:
             end_datetime = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
-            query = query.filter(InventoryMovement.created_at < end_datetime)
+            query_filter.append(InventoryMovement.created_at < end_datetime)
         
         if product_id:
-            query = query.filter(InventoryMovement.product_id == product_id)
+            query_filter.append(InventoryMovement.product_id == product_id)
         
         if movement_type:
-            query = query.filter(InventoryMovement.adjustment_type == movement_type)
+            query_filter.append(InventoryMovement.adjustment_type == movement_type)
+        
+        if cursor is not None:
+            query = db.query(
+                InventoryMovement.id, InventoryMovement.product_id, Product.name, Product.code,
+                InventoryMovement.adjustment_type, InventoryMovement.reason, InventoryMovement.quantity,
+                InventoryMovement.previous_stock, InventoryMovement.new_stock, InventoryMovement.notes,
+                InventoryMovement.user_id, User.full_name, InventoryMovement.created_at
+            ).join(Product, Product.id == InventoryMovement.product_id).outerjoin(
+                User, User.id == InventoryMovement.user_id
+            ).filter(*query_filter)
+            # Los ids siguen el orden de inserción: ordenar por created_at daría
+            # el mismo resultado y en SQLite no se puede comparar con el cursor
+            rows, next_cursor = keyset_page(query, (InventoryMovement.id,), cursor, limit, descending=True)
+            return InventoryMovementPage(
+                items=[
+                    InventoryMovementResponse(
+                        id=row.id,
+                        product_id=row.product_id,
+                        product_name=row.name,
+                        product_code=row.code or "",
+                        movement_type=row.adjustment_type,
+                        reason=row.reason,
+                        quantity=float(row.quantity),
+                        previous_stock=float(row.previous_stock),
+                        new_stock=float(row.new_stock),
+                        notes=row.notes,
+                        user_name=row.full_name or f"Usuario {row.user_id}",
+                        created_at=row.created_at
+                    )
+                    for row in rows
+                ],
+                next_cursor=next_cursor
+            )
+        
+        # Construir consulta base (sin JOIN con User por ahora)
+        query = db.query(InventoryMovement).join(Product).filter(*query_filter)
         
         # Ordenar por fecha más reciente primero
         query = query.order_by(InventoryMovement.created_at.desc())
@@ -1078,6 +1211,8 @@ def get_inventory_movements(
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
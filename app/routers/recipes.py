@@ -15,10 +15,10 @@ from app.schemas.recipe import (
     RecipeItemCreate, RecipeItemUpdate, RecipeItemResponse,
     RecipeCostCalculation, InventoryConsumptionRequest, 
     InventoryConsumptionResponse, InventoryAvailabilityCheck,
-    InventoryAvailabilityResponse
+    InventoryAvailabilityResponse, InventoryTicketConsumptionRequest
 )
-from app.auth.dependencies import get_current_active_user
-from app.services.inventory_consumption_service import InventoryConsumptionService
+from app.auth.dependencies import get_current_active_user, require_admin
+from app.services.inventory_consumption_service import InventoryConsumptionService, bom_cache
 
 router = APIRouter(prefix="/recipes", tags=["recetas"])
 
@@ -28,6 +28,12 @@ def get_inventory_consumption_service(db: Session = Depends(get_db)) -> Inventor
     return InventoryConsumptionService(db)
 
 
+@router.get("/bom-cache-stats")
+def get_bom_cache_stats(current_user: User = Depends(require_admin)):
+    """Estadísticas de la caché de recetas compiladas (por worker)"""
+    return bom_cache.stats()
+
+
 # ==================== ENDPOINTS DE RECETAS ====================
 
 @router.post("/", response_model=RecipeResponse)
@@ -414,6 +420,49 @@ def consume_inventory(
         )
 
 
+@router.post("/consume-ticket", response_model=InventoryConsumptionResponse)
+def consume_ticket_inventory(
+    request: InventoryTicketConsumptionRequest,
+    current_user: User = Depends(get_current_active_user),
+    consumption_service: InventoryConsumptionService = Depends(get_inventory_consumption_service)
+):
+    """Consumir el inventario de una venta o pedido completo en una sola transacción"""
+    if current_user.role not in [UserRole.ADMIN, UserRole.SUPERVISOR, UserRole.CAJA]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para consumir inventario"
+        )
+    
+    if request.items:
+        lines = [(item.product_id, item.quantity) for item in request.items]
+    elif request.sale_id:
+        lines = consumption_service.lines_for_sale(request.sale_id)
+    elif request.order_id:
+        lines = consumption_service.lines_for_order(request.order_id)
+    else:
+        lines = []
+    
+    if not lines:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El ticket no tiene productos"
+        )
+    
+    try:
+        result = consumption_service.consume_inventory_for_ticket(
+            lines,
+            current_user.id,
+            sale_id=request.sale_id,
+            order_id=request.order_id
+        )
+        return InventoryConsumptionResponse(**result)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
 # ==================== ENDPOINTS DE PRODUCTOS ====================
 
 @router.get("/products/with-recipes", response_model=List[dict])
@@ -7,13 +7,17 @@ from sqlalchemy import func, and_, or_
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 
-from app.database import get_db
+from app.database import get_read_db
+from app.dates import date_range
+from app.exports import EXPORT_FORMAT_PATTERN, export_response
 from app.models.user import User, UserRole
 from app.models.order import Order, OrderItem
 from app.models.sale import Sale, SaleStatus
 from app.models.product import Product
 from app.models.location import Table
+from app.models.customer import Customer
 from app.auth.dependencies import get_current_user
+from app.services.sales_rollup_service import SalesRollupService
 
 router = APIRouter(prefix="/reports", tags=["reportes"])
 
@@ -21,7 +25,7 @@ router = APIRouter(prefix="/reports", tags=["reportes"])
 @router.get("/daily-summary")
 def get_daily_summary(
     report_date: Optional[date] = Query(default=None, description="Fecha del reporte (YYYY-MM-DD)"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Resumen diario del restaurante"""
@@ -48,38 +52,30 @@ def get_daily_summary(
     completed_orders = orders_query.filter(Order.status == "servido").count()
     cancelled_orders = orders_query.filter(Order.status == "cancelado").count()
     
-    # Tiempo promedio de preparación
-    prep_times = db.query(
-        func.extract('epoch', Order.kitchen_end_time - Order.kitchen_start_time).label('prep_time')
-    ).filter(
+    # Tiempo promedio de atención: del pedido a servirlo (los pedidos no
+    # guardan cuándo entran y salen de cocina)
+    serve_times = db.query(Order.created_at, Order.served_at).filter(
         Order.created_at >= start_date,
         Order.created_at < end_date,
-        Order.kitchen_start_time.isnot(None),
-        Order.kitchen_end_time.isnot(None)
+        Order.served_at.isnot(None)
     ).all()
     
     avg_prep_time = 0
-    if prep_times:
-        avg_prep_time = sum([pt.prep_time for pt in prep_times]) / len(prep_times) / 60
+    if serve_times:
+        avg_prep_time = sum(
+            (served_at - created_at).total_seconds() for created_at, served_at in serve_times
+        ) / len(serve_times) / 60
     
-    # Estadísticas de ventas
-    sales_query = db.query(Sale).filter(
-        Sale.created_at >= start_date,
-        Sale.created_at < end_date
-    )
-    
-    total_sales = sales_query.filter(Sale.status == "completada").count()
-    total_revenue = db.query(func.sum(Sale.total)).filter(
-        Sale.created_at >= start_date,
-        Sale.created_at < end_date,
-        Sale.status == "completada"
-    ).scalar() or 0
+    # Estadísticas de ventas (acumulados diarios; hoy se calcula desde las ventas)
+    sales_totals = SalesRollupService.get_totals(db, report_date, report_date, dimensions=("users",))
+    total_sales = sum(sale_count for sale_count, _ in sales_totals.users.values())
+    total_revenue = sum(revenue for _, revenue in sales_totals.users.values())
     
     # Productos más vendidos
     top_products = db.query(
         Product.name,
         func.sum(OrderItem.quantity).label('total_quantity'),
-        func.sum(OrderItem.subtotal).label('total_revenue')
+        func.sum(OrderItem.total_price).label('total_revenue')
     ).join(OrderItem).join(Order).filter(
         Order.created_at >= start_date,
         Order.created_at < end_date,
@@ -88,15 +84,15 @@ def get_daily_summary(
         func.sum(OrderItem.quantity).desc()
     ).limit(10).all()
     
-    # Rendimiento por mesero
+    # Rendimiento por mesero (los pedidos no se enlazan con la venta; se usa su total)
     waiter_performance = db.query(
         User.full_name,
         func.count(Order.id).label('orders_count'),
-        func.sum(Sale.total).label('total_sales')
-    ).join(Order, User.id == Order.waiter_id).join(Sale, Order.sale_id == Sale.id).filter(
+        func.sum(Order.final_amount).label('total_sales')
+    ).join(Order, User.id == Order.waiter_id).filter(
         Order.created_at >= start_date,
         Order.created_at < end_date,
-        Sale.status == "completada"
+        Order.status == "servido"
     ).group_by(User.id, User.full_name).all()
     
     # Distribución por horas
@@ -149,7 +145,7 @@ def get_daily_summary(
 def get_kitchen_performance(
     start_date: Optional[date] = Query(default=None),
     end_date: Optional[date] = Query(default=None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Reporte de rendimiento de cocina"""
@@ -245,7 +241,7 @@ def get_waiter_performance(
     waiter_id: Optional[int] = Query(default=None),
     start_date: Optional[date] = Query(default=None),
     end_date: Optional[date] = Query(default=None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Reporte de rendimiento de meseros"""
@@ -352,7 +348,7 @@ def get_waiter_performance(
 @router.get("/table-turnover")
 def get_table_turnover(
     report_date: Optional[date] = Query(default=None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Reporte de rotación de mesas"""
@@ -427,3 +423,54 @@ def get_table_turnover(
         },
         "tables": table_data
     }
+
+
+@router.get("/sales/export")
+def export_sales(
+    export_format: str = Query("xlsx", alias="format", pattern=EXPORT_FORMAT_PATTERN),
+    start_date: Optional[date] = Query(default=None),
+    end_date: Optional[date] = Query(default=None),
+    sale_status: Optional[SaleStatus] = Query(default=None, alias="status"),
+    current_user: User = Depends(get_current_user)
+):
+    """Exportar ventas a Excel o CSV (por streaming, en lotes)"""
+    
+    if current_user.role not in [UserRole.ADMIN, UserRole.SUPERVISOR, UserRole.CAJA]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para ver reportes"
+        )
+    
+    if not start_date:
+        start_date = date.today() - timedelta(days=30)
+    if not end_date:
+        end_date = date.today()
+    range_start, range_end = date_range(start_date, end_date)
+    
+    def build_query(db: Session):
+        query = db.query(
+            Sale.sale_number, Sale.created_at, Sale.status, User.full_name,
+            Customer.first_name, Customer.last_name,
+            Sale.subtotal, Sale.discount, Sale.tip, Sale.total
+        ).outerjoin(User, User.id == Sale.user_id).outerjoin(
+            Customer, Customer.id == Sale.customer_id
+        ).filter(
+            Sale.created_at >= range_start,
+            Sale.created_at < range_end
+        )
+        if sale_status:
+            query = query.filter(Sale.status == sale_status.value)
+        return query.order_by(Sale.created_at, Sale.id)
+    
+    def to_row(sale):
+        customer = " ".join(part for part in (sale.first_name, sale.last_name) if part)
+        return (
+            sale.sale_number, sale.created_at, sale.status, sale.full_name, customer,
+            sale.subtotal, sale.discount, sale.tip, sale.total
+        )
+    
+    headers = ['Número', 'Fecha', 'Estado', 'Usuario', 'Cliente', 'Subtotal', 'Descuento', 'Propina', 'Total']
+    return export_response(
+        f"ventas_{start_date.isoformat()}_{end_date.isoformat()}", export_format,
+        headers, build_query, to_row, sheet_name="Ventas"
+    )
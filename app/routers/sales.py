@@ -1,38 +1,32 @@
 """
 Router de ventas - Integrado con Sistema de Caja Protegido
 """
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime, date
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
 from app.models.sale import Sale, SaleItem, SaleStatus
 from app.models.product import Product
 from app.models.customer import Customer
 from app.auth.dependencies import get_current_active_user
+from app.pagination import CURSOR_DESCRIPTION, keyset_page
 from app.schemas.sale import (
     SaleCreate, SaleUpdate, SaleResponse, SaleWithDetails,
-    SaleItemCreate, SaleItemResponse
+    SaleItemCreate, SaleItemResponse, SaleListItem, SalePage
 )
 from app.services.cash_service import CashService
 from app.services.settings_service import SettingsService
+from app.services.numbering_service import NumberingService
+from app.services.sales_rollup_service import SalesRollupService
 
 router = APIRouter(prefix="/sales", tags=["ventas"])
 
 
 def generate_sale_number(db: Session) -> str:
     """Generar número único de venta"""
-    today = date.today()
-    prefix = f"V{today.strftime('%Y%m%d')}"
-    
-    # Contar ventas del día
-    count = db.query(func.count(Sale.id)).filter(
-        func.date(Sale.created_at) == today
-    ).scalar()
-    
-    return f"{prefix}-{count + 1:04d}"
+    return NumberingService.next_sale_number(db)
 
 
 def check_cash_register_status(db: Session) -> dict:
@@ -63,53 +57,79 @@ def check_cash_register_status(db: Session) -> dict:
     }
 
 
-@router.get("/", response_model=List[SaleWithDetails])
+def _customer_name(first_name: Optional[str], last_name: Optional[str]) -> Optional[str]:
+    """Nombre completo del cliente a partir de las columnas de la consulta"""
+    return " ".join(part for part in (first_name, last_name) if part) or None
+
+
+@router.get("/", response_model=Union[List[SaleWithDetails], SalePage])
 def get_sales(
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Obtener lista de ventas"""
-    sales = db.query(Sale).order_by(Sale.id.desc()).offset(skip).limit(limit).all()
+    """Obtener lista de ventas
     
-    # Agregar información del cliente
-    result = []
-    for sale in sales:
-        sale_dict = {
-            "id": sale.id,
-            "sale_number": sale.sale_number,
-            "customer_id": sale.customer_id,
-            "user_id": sale.user_id,
-            "total": sale.total,
-            "status": sale.status,
-            "items": [],
-            "customer_name": None
-        }
-        
-        # Obtener nombre del cliente
-        if sale.customer_id:
-            customer = db.query(Customer).filter(Customer.id == sale.customer_id).first()
-            if customer:
-                sale_dict["customer_name"] = customer.full_name
-        
-        # Obtener items de la venta
-        items = db.query(SaleItem).filter(SaleItem.sale_id == sale.id).all()
-        sale_dict["items"] = [
-            {
-                "id": item.id,
-                "sale_id": item.sale_id,
-                "product_id": item.product_id,
-                "quantity": item.quantity,
-                "unit_price": item.unit_price,
-                "total": item.total
-            }
-            for item in items
-        ]
-        
-        result.append(sale_dict)
+    Con `cursor` devuelve `{items, next_cursor}` de la más reciente a la más
+    antigua, sin los items de cada venta.
+    """
+    if cursor is not None:
+        query = db.query(
+            Sale.id, Sale.sale_number, Sale.customer_id, Sale.user_id, Sale.total, Sale.status,
+            Sale.created_at, Customer.first_name, Customer.last_name
+        ).outerjoin(Customer, Customer.id == Sale.customer_id)
+        # Los ids siguen el orden de inserción (ver get_inventory_movements)
+        rows, next_cursor = keyset_page(query, (Sale.id,), cursor, limit, descending=True)
+        return SalePage(
+            items=[
+                SaleListItem(
+                    id=row.id,
+                    sale_number=row.sale_number,
+                    customer_id=row.customer_id,
+                    customer_name=_customer_name(row.first_name, row.last_name),
+                    user_id=row.user_id,
+                    total=row.total,
+                    status=row.status,
+                    created_at=row.created_at
+                )
+                for row in rows
+            ],
+            next_cursor=next_cursor
+        )
+    
+    # Dos consultas por página, sin importar su tamaño: las ventas con el
+    # nombre del cliente y después todos sus items
+    sales = db.query(
+        Sale.id, Sale.sale_number, Sale.customer_id, Sale.user_id, Sale.total, Sale.status,
+        Customer.first_name, Customer.last_name
+    ).outerjoin(Customer, Customer.id == Sale.customer_id).order_by(
+        Sale.id.desc()
+    ).offset(skip).limit(limit).all()
+    if not sales:
+        return []
     
-    return result
+    items_by_sale = {sale.id: [] for sale in sales}
+    for item in db.query(
+        SaleItem.id, SaleItem.sale_id, SaleItem.product_id, SaleItem.quantity,
+        SaleItem.unit_price, SaleItem.total
+    ).filter(SaleItem.sale_id.in_(list(items_by_sale))).order_by(SaleItem.sale_id, SaleItem.id):
+        items_by_sale[item.sale_id].append(SaleItemResponse.model_validate(item))
+    
+    return [
+        SaleWithDetails(
+            id=sale.id,
+            sale_number=sale.sale_number,
+            customer_id=sale.customer_id,
+            user_id=sale.user_id,
+            total=sale.total,
+            status=sale.status,
+            items=items_by_sale[sale.id],
+            customer_name=_customer_name(sale.first_name, sale.last_name)
+        )
+        for sale in sales
+    ]
 
 
 @router.get("/cash-status")
@@ -268,18 +288,14 @@ def get_sale(
 @router.get("/reports/daily")
 def get_daily_report(
     report_date: date = Query(default_factory=date.today),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Reporte diario de ventas"""
-    # Ventas del día
-    sales = db.query(Sale).filter(
-        func.date(Sale.created_at) == report_date,
-        Sale.status == "completada"
-    ).all()
-    
-    total_sales = len(sales)
-    total_amount = sum(sale.total for sale in sales)
+    # Ventas del día (acumulados diarios; hoy se calcula desde las ventas)
+    totals = SalesRollupService.get_totals(db, report_date, report_date, dimensions=("users",))
+    total_sales = sum(sale_count for sale_count, _ in totals.users.values())
+    total_amount = sum(revenue for _, revenue in totals.users.values())
     
     # Obtener reporte de caja del día (solo si se requiere caja)
     cash_report = None
@@ -297,7 +313,7 @@ def get_daily_report(
 
 @router.get("/reports/weekly")
 def get_weekly_report(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Reporte semanal de ventas"""
@@ -307,12 +323,8 @@ def get_weekly_report(
     end_date = date.today()
     start_date = end_date - timedelta(days=6)
     
-    # Ventas de la semana
-    sales = db.query(Sale).filter(
-        func.date(Sale.created_at) >= start_date,
-        func.date(Sale.created_at) <= end_date,
-        Sale.status == "completada"
-    ).all()
+    # Ventas de la semana (acumulados diarios; hoy se calcula desde las ventas)
+    totals = SalesRollupService.get_totals(db, start_date, end_date, dimensions=("users",))
     
     # Agrupar por día
     daily_sales = {}
@@ -320,16 +332,16 @@ def get_weekly_report(
         current_date = start_date + timedelta(days=i)
         daily_sales[current_date.strftime('%Y-%m-%d')] = 0
     
-    for sale in sales:
-        sale_date = sale.created_at.date().strftime('%Y-%m-%d')
+    for (sale_date, _, _), (_, revenue) in totals.users.items():
+        sale_date = sale_date.strftime('%Y-%m-%d')
         if sale_date in daily_sales:
-            daily_sales[sale_date] += sale.total
+            daily_sales[sale_date] += revenue
     
     return {
         "start_date": start_date,
         "end_date": end_date,
-        "total_sales": len(sales),
-        "total_amount": sum(sale.total for sale in sales),
+        "total_sales": sum(sale_count for sale_count, _ in totals.users.values()),
+        "total_amount": sum(revenue for _, revenue in totals.users.values()),
         "daily_sales": list(daily_sales.values()),
         "labels": [d.strftime('%a') for d in [start_date + timedelta(days=i) for i in range(7)]]
     }
\ No newline at end of file
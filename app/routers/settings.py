@@ -7,9 +7,10 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from datetime import datetime
 
-from app.database import get_db
+from app.database import get_db, engine, async_engine, replica_engine
+from app.db_pool import pool_stats
 from app.models.user import User
-from app.auth.dependencies import get_current_active_user
+from app.auth.dependencies import get_current_active_user, require_admin
 from app.services.settings_service import SettingsService
 
 
@@ -57,6 +58,16 @@ def get_all_settings(
     return result
 
 
+@router.get("/db-pool-stats")
+def get_db_pool_stats(current_user: User = Depends(require_admin)):
+    """Estado del pool de conexiones y esperas por conexión (por worker)"""
+    return {
+        "sync": pool_stats(engine),
+        "async": pool_stats(async_engine),
+        "replica": pool_stats(replica_engine)
+    }
+
+
 @router.get("/business-info")
 def get_business_info(
     db: Session = Depends(get_db)
@@ -1,11 +1,11 @@
 """
 Router específico para meseros - Optimizado para toma de pedidos
 """
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from pydantic import BaseModel
+from sqlalchemy import and_
+from pydantic import BaseModel, TypeAdapter
 from decimal import Decimal
 from datetime import datetime
 
@@ -16,6 +16,10 @@ from app.models.location import Table, TableStatus
 from app.models.product import Product
 from app.auth.dependencies import get_current_active_user
 from app.services.order_service import OrderService
+from app.services.table_service import TableService
+from app.services.menu_availability_service import MenuAvailabilityService
+from app.services.catalog_service import CatalogService, CatalogSnapshot
+from app.services.product_search_service import ProductSearchService
 
 router = APIRouter(prefix="/waiters", tags=["meseros"])
 
@@ -49,6 +53,14 @@ class ProductQuickResponse(BaseModel):
     category: Optional[str] = None
     image_url: Optional[str] = None
     is_available: bool = True
+    available_quantity: Optional[int] = None  # Unidades preparables según receta
+
+
+# Snapshot del catálogo para meseros: (WAITER_CATALOG_KEY, categoría)
+WAITER_CATALOG_KEY = "waiter_products"
+# Resultados de una búsqueda por texto (los más relevantes)
+WAITER_SEARCH_LIMIT = 100
+_WAITER_PRODUCT_LIST = TypeAdapter(List[ProductQuickResponse])
 
 class ActiveOrderResponse(BaseModel):
     id: int
@@ -77,63 +89,77 @@ def get_tables_for_waiters(
             detail="Solo meseros pueden acceder a esta información"
         )
     
-    # Obtener todas las mesas con información de pedidos activos
-    tables = db.query(Table).all()
-    
-    table_statuses = []
-    for table in tables:
-        # Buscar pedido activo en esta mesa
-        active_order = db.query(Order).filter(
-            and_(
-                Order.table_id == table.id,
-                Order.status.in_([OrderStatus.PENDING, OrderStatus.PREPARING, OrderStatus.READY, OrderStatus.SERVED])
-            )
-        ).first()
-        
-        table_status = {
-            "id": table.id,
-            "table_number": table.table_number,
-            "status": table.status,
-            "current_order": active_order.order_number if active_order else None,
-            "waiter_name": active_order.waiter.full_name if active_order and active_order.waiter else None,
-            "created_at": active_order.created_at.isoformat() if active_order else None
-        }
-        table_statuses.append(table_status)
-    
-    return table_statuses
+    # Plano del salón: una consulta (o ninguna si está en caché)
+    return TableService.get_floor_plan(db)
 
 
 @router.get("/products/", response_model=List[ProductQuickResponse])
 def get_products_for_waiters(
+    request: Request,
     category: Optional[str] = None,
     search: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Obtener productos disponibles para meseros con filtros"""
+    """Obtener productos disponibles para meseros con filtros
+    
+    Sin `search` se sirve desde el snapshot del catálogo, con ETag.
+    """
     if current_user.role not in [UserRole.MESERO, UserRole.ADMIN, UserRole.SUPERVISOR]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Solo meseros pueden acceder a esta información"
         )
     
+    if not search:
+        return CatalogService.response(request, _waiter_catalog(db, category))
+    
+    ranked_ids = ProductSearchService.search(db, search, WAITER_SEARCH_LIMIT, category=category)
+    products = _waiter_products(db, category, ranked_ids)
+    availability = MenuAvailabilityService.get_availability(db)
+    
+    return _serialize_waiter_products(products, availability)
+
+
+def _waiter_products(db: Session, category: Optional[str], ranked_ids: Optional[List[int]] = None) -> List[Product]:
+    """Productos activos con los filtros de la vista de meseros.
+
+    `ranked_ids` (de `ProductSearchService`) limita a los resultados de una
+    búsqueda y los devuelve en su orden de relevancia.
+    """
     query = db.query(Product).filter(Product.is_active == True)
     
     # Filtrar por categoría
     if category:
         query = query.filter(Product.category == category)
     
-    # Filtrar por búsqueda
-    if search:
-        query = query.filter(
-            or_(
-                Product.name.ilike(f"%{search}%"),
-                Product.description.ilike(f"%{search}%")
-            )
-        )
-    
-    products = query.order_by(Product.name).all()
+    if ranked_ids is not None:
+        if not ranked_ids:
+            return []
+        position = {product_id: index for index, product_id in enumerate(ranked_ids)}
+        products = query.filter(Product.id.in_(ranked_ids)).all()
+        return sorted(products, key=lambda product: position[product.id])
     
+    return query.order_by(Product.name).all()
+
+
+def _waiter_catalog(db: Session, category: Optional[str]) -> CatalogSnapshot:
+    """Snapshot de los productos para meseros con su disponibilidad.
+
+    Las búsquedas por texto no se guardan: cada una desplazaría de la caché a
+    las vistas que las tablets piden todo el tiempo.
+    """
+    def load() -> bytes:
+        products = _waiter_products(db, category, None)
+        availability = MenuAvailabilityService.get_availability(db)
+        return _WAITER_PRODUCT_LIST.dump_json(
+            _WAITER_PRODUCT_LIST.validate_python(_serialize_waiter_products(products, availability))
+        )
+    return CatalogService.get_snapshot((WAITER_CATALOG_KEY, category), load)
+
+
+def _serialize_waiter_products(products: List[Product], availability: Dict[int, int]) -> List[dict]:
+    """Productos para meseros con su disponibilidad según receta o stock"""
     return [
         {
             "id": p.id,
@@ -141,7 +167,9 @@ def get_products_for_waiters(
             "price": p.price,
             "category": p.category,
             "image_url": p.image_url,
-            "is_available": p.stock_quantity > 0 if p.track_stock else True
+            "is_available": availability[p.id] > 0 if p.id in availability
+                            else (p.stock_quantity > 0 if p.track_stock else True),
+            "available_quantity": availability.get(p.id)
         }
         for p in products
     ]
@@ -0,0 +1,13 @@
+"""
+Esquema de respuesta para la paginación por cursor
+"""
+from typing import Generic, List, Optional, TypeVar
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+class CursorPage(BaseModel, Generic[T]):
+    """Página de resultados; `next_cursor` es None en la última"""
+    items: List[T]
+    next_cursor: Optional[str] = None
@@ -1,10 +1,11 @@
 """
 Esquemas Pydantic para Productos y Categorías
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 from app.models.product import ProductCategory, ProductType
+from app.schemas.pagination import CursorPage
 
 
 class CategoryBase(BaseModel):
@@ -163,4 +164,49 @@ class InventoryProductResponse(BaseModel):
 class ProductWithCategory(ProductResponse):
     """Esquema de producto con información de categoría"""
     category: Optional[CategoryResponse] = None
-    subcategory: Optional[SubCategoryResponse] = None 
\ No newline at end of file
+    subcategory: Optional[SubCategoryResponse] = None
+
+
+class ProductListItem(BaseModel):
+    """Columnas de un producto en los listados paginados por cursor"""
+    id: int
+    code: Optional[str] = None
+    name: str
+    price: Optional[float] = None
+    product_type: ProductType
+    category_id: Optional[int] = None
+    subcategory_id: Optional[int] = None
+    stock: Optional[int] = None
+    image_url: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class InventoryProductListItem(BaseModel):
+    """Columnas que usa la pantalla de inventario"""
+    id: int
+    code: Optional[str] = None
+    name: str
+    description: Optional[str] = None
+    category_id: Optional[int] = None
+    unit: Optional[str] = None
+    stock_quantity: Optional[int] = None
+    min_stock_level: Optional[int] = None
+    max_stock_level: Optional[int] = None
+    purchase_price: Optional[float] = None
+    supplier: Optional[str] = None
+    barcode: Optional[str] = None
+    created_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class BarcodeScanRequest(BaseModel):
+    """Códigos leídos por el escáner (código de barras, SKU o código interno)"""
+    codes: List[str] = Field(..., min_length=1)
+
+
+ProductPage = CursorPage[ProductListItem]
+InventoryProductPage = CursorPage[InventoryProductListItem]
@@ -111,6 +111,19 @@ class InventoryConsumptionRequest(BaseModel):
     sale_id: Optional[int] = Field(None, description="ID de la venta")
 
 
+class InventoryTicketLine(BaseModel):
+    """Línea de un ticket para consumo de inventario"""
+    product_id: int = Field(..., gt=0, description="ID del producto vendido")
+    quantity: int = Field(..., gt=0, description="Cantidad vendida")
+
+
+class InventoryTicketConsumptionRequest(BaseModel):
+    """Esquema para consumir el inventario de una venta o pedido completo"""
+    items: List[InventoryTicketLine] = Field(default_factory=list, description="Líneas del ticket; si se omiten se leen de la venta o pedido")
+    sale_id: Optional[int] = Field(None, description="ID de la venta")
+    order_id: Optional[int] = Field(None, description="ID del pedido")
+
+
 class InventoryConsumptionResponse(BaseModel):
     """Esquema para respuesta de consumo de inventario"""
     success: bool
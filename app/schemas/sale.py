@@ -6,6 +6,7 @@ from typing import Optional, List
 from datetime import datetime
 from decimal import Decimal
 from typing import Literal
+from app.schemas.pagination import CursorPage
 
 
 class SaleItemCreate(BaseModel):
@@ -60,4 +61,19 @@ class SaleWithDetails(SaleResponse):
     customer_name: Optional[str] = None
     
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+
+class SaleListItem(BaseModel):
+    """Columnas de una venta en el listado paginado por cursor (sin items)"""
+    id: int
+    sale_number: str
+    customer_id: Optional[int] = None
+    customer_name: Optional[str] = None
+    user_id: int
+    total: Decimal
+    status: Literal["pendiente", "completada", "cancelada", "devuelta"]
+    created_at: Optional[datetime] = None
+
+
+SalePage = CursorPage[SaleListItem]
@@ -7,9 +7,14 @@ from decimal import Decimal
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func
 
-from app.models.cash_register import CashRegister, CashSession, CashMovement, CashStatus, MovementType
+from app.models.cash_register import (
+    CashRegister, CashSession, CashMovement, CashStatus, MovementType, SESSION_TOTAL_COLUMNS
+)
+from app.dates import day_range
 from app.models.user import User
 from app.models.sale import Sale
+from app.services.numbering_service import NumberingService
+from app.services.event_bus import event_bus, CASH_MOVEMENT, CASH_SESSION_OPENED, CASH_SESSION_CLOSED
 
 
 class CashService:
@@ -50,14 +55,40 @@ class CashService:
     @staticmethod
     def get_today_session(db: Session, cash_register_id: int) -> Optional[CashSession]:
         """Obtener la última sesión del día actual"""
-        today = date.today()
+        start, end = day_range()
         return db.query(CashSession).filter(
             and_(
                 CashSession.cash_register_id == cash_register_id,
-                func.date(CashSession.opened_at) == today
+                CashSession.opened_at >= start,
+                CashSession.opened_at < end
             )
         ).order_by(CashSession.opened_at.desc()).first()
     
+    @staticmethod
+    def _add_movement(db: Session, movement: CashMovement) -> CashMovement:
+        """Agregar un movimiento y actualizar los totales de la sesión en la misma transacción"""
+        db.add(movement)
+        
+        values = {CashSession.movements_count: CashSession.movements_count + 1}
+        movement_type = getattr(movement.movement_type, "value", movement.movement_type)
+        column_name = SESSION_TOTAL_COLUMNS.get(movement_type)
+        if column_name:
+            column = getattr(CashSession, column_name)
+            values[column] = column + (movement.amount or 0)
+        
+        # UPDATE atómico: no depende del valor cargado en memoria por este worker
+        db.query(CashSession).filter(CashSession.id == movement.session_id).update(
+            values, synchronize_session="fetch"
+        )
+        
+        event_bus.publish_after_commit(db, CASH_MOVEMENT, {
+            "session_id": movement.session_id,
+            "movement_type": movement_type,
+            "amount": float(movement.amount or 0),
+            "reference": movement.reference
+        })
+        return movement
+    
     @staticmethod
     def can_create_sale(db: Session, cash_register_id: int) -> bool:
         """Verificar si se puede crear una venta (caja debe estar abierta)"""
@@ -80,16 +111,7 @@ class CashService:
             raise ValueError("Ya existe una sesión abierta para esta caja")
         
         # Generar número de sesión único
-        today = date.today()
-        # Contar sesiones del día para generar número único
-        session_count = db.query(CashSession).filter(
-            and_(
-                CashSession.cash_register_id == cash_register_id,
-                func.date(CashSession.opened_at) == today
-            )
-        ).count()
-        
-        session_number = f"S{today.strftime('%Y%m%d')}-{cash_register_id:02d}-{session_count + 1:02d}"
+        session_number = NumberingService.next_session_number(db, cash_register_id)
         
         # Crear sesión
         session = CashSession(
@@ -110,7 +132,12 @@ class CashService:
             description="Apertura de caja",
             notes=opening_notes
         )
-        db.add(opening_movement)
+        CashService._add_movement(db, opening_movement)
+        event_bus.publish_after_commit(db, CASH_SESSION_OPENED, {
+            "session_id": session.id,
+            "cash_register_id": cash_register_id,
+            "session_number": session_number
+        })
         
         db.commit()
         db.refresh(session)
@@ -146,7 +173,12 @@ class CashService:
             description="Cierre de caja",
             notes=closing_notes
         )
-        db.add(closing_movement)
+        CashService._add_movement(db, closing_movement)
+        event_bus.publish_after_commit(db, CASH_SESSION_CLOSED, {
+            "session_id": session.id,
+            "cash_register_id": session.cash_register_id,
+            "session_number": session.session_number
+        })
         
         db.commit()
         db.refresh(session)
@@ -158,9 +190,14 @@ class CashService:
         session_id: int, 
         sale_id: int, 
         amount: Decimal,
-        description: str = None
+        description: str = None,
+        commit: bool = True
     ) -> CashMovement:
-        """Registrar movimiento de venta en caja"""
+        """Registrar movimiento de venta en caja
+
+        Con `commit=False` el movimiento queda en la transacción del llamador,
+        que se encarga de confirmarla junto con la venta.
+        """
         
         if not description:
             description = f"Venta #{sale_id}"
@@ -172,9 +209,10 @@ class CashService:
             description=description,
             reference=str(sale_id)
         )
-        db.add(movement)
-        db.commit()
-        db.refresh(movement)
+        CashService._add_movement(db, movement)
+        if commit:
+            db.commit()
+            db.refresh(movement)
         return movement
     
     @staticmethod
@@ -197,7 +235,7 @@ class CashService:
             reference=reference,
             notes=notes
         )
-        db.add(movement)
+        CashService._add_movement(db, movement)
         db.commit()
         db.refresh(movement)
         return movement
@@ -209,19 +247,10 @@ class CashService:
         if not session:
             return None
         
-        # Calcular totales
-        total_sales = sum(
-            m.amount for m in session.movements 
-            if m.movement_type == MovementType.SALE
-        )
-        total_expenses = sum(
-            m.amount for m in session.movements 
-            if m.movement_type == MovementType.EXPENSE
-        )
-        total_refunds = sum(
-            m.amount for m in session.movements 
-            if m.movement_type == MovementType.REFUND
-        )
+        # Totales acumulados en la sesión
+        total_sales = session.total_sales
+        total_expenses = session.total_expenses
+        total_refunds = session.total_refunds
         
         expected_amount = session.opening_amount + total_sales - total_expenses - total_refunds
         difference = None
@@ -252,8 +281,10 @@ class CashService:
             report_date = date.today()
         
         # Obtener sesión del día
+        start, end = day_range(report_date)
         session = db.query(CashSession).filter(
-            func.date(CashSession.opened_at) == report_date
+            CashSession.opened_at >= start,
+            CashSession.opened_at < end
         ).first()
         
         if not session:
@@ -268,3 +299,51 @@ class CashService:
         summary["has_session"] = True
         
         return summary
+    
+    @staticmethod
+    def reconcile_session_totals(db: Session, session_id: int = None, fix: bool = False) -> List[dict]:
+        """Recalcular los totales desde el libro de movimientos y reportar diferencias"""
+        ledger_query = db.query(
+            CashMovement.session_id,
+            CashMovement.movement_type,
+            func.coalesce(func.sum(CashMovement.amount), 0),
+            func.count(CashMovement.id)
+        )
+        sessions_query = db.query(CashSession)
+        if session_id is not None:
+            ledger_query = ledger_query.filter(CashMovement.session_id == session_id)
+            sessions_query = sessions_query.filter(CashSession.id == session_id)
+        
+        ledger = {}
+        for movement_session_id, movement_type, amount, count in ledger_query.group_by(
+            CashMovement.session_id, CashMovement.movement_type
+        ).all():
+            totals = ledger.setdefault(movement_session_id, {"movements_count": 0})
+            totals["movements_count"] += count
+            column_name = SESSION_TOTAL_COLUMNS.get(movement_type)
+            if column_name:
+                totals[column_name] = Decimal(str(amount))
+        
+        drifts = []
+        for session in sessions_query.all():
+            expected = ledger.get(session.id, {"movements_count": 0})
+            differences = {}
+            for column_name in list(SESSION_TOTAL_COLUMNS.values()) + ["movements_count"]:
+                stored = getattr(session, column_name) or 0
+                actual = expected.get(column_name, 0)
+                if Decimal(str(stored)) != Decimal(str(actual)):
+                    differences[column_name] = {"stored": stored, "ledger": actual}
+                    if fix:
+                        setattr(session, column_name, actual)
+            
+            if differences:
+                drifts.append({
+                    "session_id": session.id,
+                    "session_number": session.session_number,
+                    "differences": differences
+                })
+        
+        if fix and drifts:
+            db.commit()
+        
+        return drifts
@@ -0,0 +1,156 @@
+"""
+Snapshot del catálogo del menú (productos y categorías) con ETag para caja y meseros
+"""
+import gzip
+import hashlib
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+from fastapi import Request, Response, status
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.cache import TTLCache
+from app.config import settings
+from app.models.product import Product, Category
+from app.services.event_bus import event_bus, CATALOG_CHANGED, RECIPE_CHANGED, STOCK_CHANGED
+
+# Cuerpos más chicos no se comprimen: el encabezado de gzip no compensa
+GZIP_MIN_BYTES = 1024
+
+# Las pantallas guardan la respuesta y la revalidan siempre con If-None-Match
+CACHE_CONTROL = "private, no-cache"
+
+catalog_cache = TTLCache(max_size=64, ttl_seconds=settings.catalog_snapshot_ttl_seconds, name="catalog")
+
+
+class CatalogSnapshot:
+    """Respuesta JSON ya serializada, comprimida y con su hash de contenido"""
+    __slots__ = ("body", "gzip_body", "etag", "built_at")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self.built_at = time.time()
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (lista de ETags, W/ o *)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class CatalogService:
+    """Snapshots del catálogo por vista (`key`), armados una vez por cambio.
+
+    Cada snapshot guarda el JSON de la respuesta, su versión gzip y un ETag
+    con el hash del contenido. Las pantallas que repiten la petición con
+    If-None-Match reciben un 304 sin tocar la BD ni serializar nada. Los
+    cambios de productos, categorías, stock o recetas vacían la caché (en
+    todos los workers si el bus tiene backend) y la siguiente petición arma
+    el snapshot de nuevo.
+    """
+
+    _lock = threading.Lock()
+    _generation = 0
+    builds = 0
+    not_modified = 0
+
+    @staticmethod
+    def peek_snapshot(key: Hashable) -> Optional[CatalogSnapshot]:
+        """Snapshot vigente sin tocar la BD; None si hay que armarlo"""
+        return catalog_cache.get(key)
+
+    @staticmethod
+    def get_snapshot(key: Hashable, loader: Callable[[], bytes]) -> CatalogSnapshot:
+        """Snapshot de `key`, armándolo con `loader` (el JSON de la respuesta) si no está"""
+        snapshot = catalog_cache.get(key)
+        if snapshot is not None:
+            return snapshot
+
+        # Un solo armado aunque varias pantallas pidan el catálogo a la vez
+        with CatalogService._lock:
+            snapshot = catalog_cache.get(key)
+            if snapshot is None:
+                generation = CatalogService._generation
+                snapshot = CatalogSnapshot(loader())
+                CatalogService.builds += 1
+                # Si el catálogo cambió mientras se armaba, servirlo sin guardarlo
+                if generation == CatalogService._generation:
+                    catalog_cache.set(key, snapshot)
+        return snapshot
+
+    @staticmethod
+    def response(request: Request, snapshot: CatalogSnapshot) -> Response:
+        """304 si el cliente ya tiene esta versión; si no, el JSON (gzip si lo acepta)"""
+        headers = {"ETag": snapshot.etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        if _etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+            CatalogService.not_modified += 1
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        body = snapshot.body
+        if snapshot.gzip_body is not None and "gzip" in request.headers.get("accept-encoding", ""):
+            body = snapshot.gzip_body
+            headers["Content-Encoding"] = "gzip"
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    @staticmethod
+    def invalidate() -> None:
+        """Descartar todos los snapshots de este worker.
+
+        No espera el lock: un armado en curso ve la nueva generación y no
+        guarda su resultado.
+        """
+        CatalogService._generation += 1
+        catalog_cache.clear()
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """Contadores de la caché y de respuestas 304"""
+        return {
+            **catalog_cache.stats(),
+            "builds": CatalogService.builds,
+            "not_modified": CatalogService.not_modified,
+        }
+
+
+def _invalidate_catalog(bus_event) -> None:
+    CatalogService.invalidate()
+
+
+# El stock y las recetas cambian la disponibilidad que muestran caja y meseros
+event_bus.subscribe([CATALOG_CHANGED, STOCK_CHANGED, RECIPE_CHANGED], _invalidate_catalog)
+
+
+def _publish_catalog_changed(session: Session, product_id: Optional[int]) -> None:
+    """Un solo aviso por transacción, con los productos que cambiaron
+    (`categories` si cambió alguna categoría)"""
+    for topic, data in session.info.get("bus_pending") or ():
+        if topic == CATALOG_CHANGED:
+            break
+    else:
+        data = {"product_ids": []}
+        event_bus.publish_after_commit(session, CATALOG_CHANGED, data)
+    if product_id is None:
+        data["categories"] = True
+    elif product_id not in data["product_ids"]:
+        data["product_ids"].append(product_id)
+
+
+@event.listens_for(Product, "after_insert")
+@event.listens_for(Product, "after_update")
+@event.listens_for(Product, "after_delete")
+@event.listens_for(Category, "after_insert")
+@event.listens_for(Category, "after_update")
+@event.listens_for(Category, "after_delete")
+def _publish_catalog_change(mapper, connection, target) -> None:
+    """Publicar cambios de productos y categorías al confirmar la transacción"""
+    session = object_session(target)
+    if session is not None:
+        _publish_catalog_changed(session, target.id if isinstance(target, Product) else None)
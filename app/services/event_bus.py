@@ -0,0 +1,293 @@
+"""
+Bus de eventos en proceso (publicar/suscribir) con backend opcional entre workers
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Tópicos publicados por el sistema
+ORDER_TOPIC = "order."                 # order.created, order.started, order.completed, ...
+CASH_MOVEMENT = "cash.movement"
+CASH_SESSION_OPENED = "cash.session_opened"
+CASH_SESSION_CLOSED = "cash.session_closed"
+TABLE_CHANGED = "table.changed"
+RECIPE_CHANGED = "recipe.changed"
+STOCK_CHANGED = "inventory.stock_changed"
+CATALOG_CHANGED = "catalog.changed"
+TOKEN_REVOKED = "auth.token_revoked"
+USER_CHANGED = "user.changed"
+
+
+class BusEvent:
+    """Evento publicado en el bus"""
+    __slots__ = ("topic", "data", "origin", "created_at")
+
+    def __init__(self, topic: str, data: Dict[str, Any], origin: str, created_at: Optional[float] = None):
+        self.topic = topic
+        self.data = data
+        self.origin = origin
+        self.created_at = created_at if created_at is not None else time.time()
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "topic": self.topic,
+            "data": self.data,
+            "origin": self.origin,
+            "created_at": self.created_at
+        }, default=str)
+
+    @classmethod
+    def from_json(cls, payload: str) -> "BusEvent":
+        raw = json.loads(payload)
+        return cls(raw["topic"], raw.get("data") or {}, raw.get("origin", ""), raw.get("created_at"))
+
+    def __repr__(self):
+        return f"<BusEvent(topic='{self.topic}', data={self.data})>"
+
+
+def _matches(topic: str, patterns: Iterable[str]) -> bool:
+    """Un patrón coincide exacto, por prefijo si termina en '.', o con '*'"""
+    for pattern in patterns:
+        if pattern == "*" or pattern == topic or (pattern.endswith(".") and topic.startswith(pattern)):
+            return True
+    return False
+
+
+class Subscription:
+    """Suscripción asíncrona (para streams SSE); creada dentro del event loop"""
+
+    def __init__(self, bus: "EventBus", patterns: List[str], max_pending: int = 1000):
+        self._bus = bus
+        self.patterns = patterns
+        self._loop = asyncio.get_running_loop()
+        self._queue: "asyncio.Queue[BusEvent]" = asyncio.Queue(maxsize=max_pending)
+
+    def _deliver(self, bus_event: BusEvent) -> None:
+        """Encolar desde cualquier hilo"""
+        def put():
+            try:
+                self._queue.put_nowait(bus_event)
+            except asyncio.QueueFull:
+                # El consumidor se resincroniza desde la BD; perder avisos no pierde datos
+                pass
+        self._loop.call_soon_threadsafe(put)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[BusEvent]:
+        """Esperar el siguiente evento; None si vence el timeout"""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def drain(self) -> List[BusEvent]:
+        """Eventos ya encolados, sin esperar"""
+        events = []
+        while not self._queue.empty():
+            events.append(self._queue.get_nowait())
+        return events
+
+    def close(self) -> None:
+        self._bus._remove_subscription(self)
+
+
+class EventBus:
+    """Bus publicar/suscribir del proceso.
+
+    Los suscriptores síncronos (`subscribe`) se ejecutan en el hilo que publica;
+    las suscripciones asíncronas (`open_subscription`) reciben los eventos en su
+    event loop. Con un backend configurado los eventos también viajan a los
+    demás workers, que los despachan localmente ignorando los propios.
+    """
+
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex
+        self._callbacks: List[tuple] = []
+        self._subscriptions: List[Subscription] = []
+        self._lock = threading.Lock()
+        self.backend = None
+        self.published = 0
+        self.received_remote = 0
+
+    def subscribe(self, patterns, callback: Callable[[BusEvent], None]) -> Callable[[], None]:
+        """Registrar un callback síncrono; retorna la función para darse de baja"""
+        patterns = [patterns] if isinstance(patterns, str) else list(patterns)
+        entry = (patterns, callback)
+        with self._lock:
+            self._callbacks.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._callbacks:
+                    self._callbacks.remove(entry)
+        return unsubscribe
+
+    def open_subscription(self, patterns) -> Subscription:
+        """Crear una suscripción asíncrona (llamar desde el event loop)"""
+        patterns = [patterns] if isinstance(patterns, str) else list(patterns)
+        subscription = Subscription(self, patterns)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def _remove_subscription(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def publish(self, topic: str, data: Optional[Dict[str, Any]] = None) -> BusEvent:
+        """Publicar un evento en este worker y, si hay backend, en los demás"""
+        bus_event = BusEvent(topic, data or {}, self.worker_id)
+        self.published += 1
+        self._dispatch(bus_event)
+        if self.backend is not None:
+            try:
+                self.backend.send(bus_event)
+            except Exception:
+                logger.exception("No se pudo enviar el evento %s al backend", topic)
+        return bus_event
+
+    def receive_remote(self, bus_event: BusEvent) -> None:
+        """Despachar un evento llegado desde otro worker"""
+        if bus_event.origin == self.worker_id:
+            return
+        self.received_remote += 1
+        self._dispatch(bus_event)
+
+    def _dispatch(self, bus_event: BusEvent) -> None:
+        with self._lock:
+            callbacks = [callback for patterns, callback in self._callbacks if _matches(bus_event.topic, patterns)]
+            subscriptions = [sub for sub in self._subscriptions if _matches(bus_event.topic, sub.patterns)]
+
+        for callback in callbacks:
+            try:
+                callback(bus_event)
+            except Exception:
+                logger.exception("Error en suscriptor de %s", bus_event.topic)
+        for subscription in subscriptions:
+            try:
+                subscription._deliver(bus_event)
+            except RuntimeError:
+                # El event loop de la suscripción ya se cerró
+                self._remove_subscription(subscription)
+
+    def publish_after_commit(self, db: Session, topic: str, data: Optional[Dict[str, Any]] = None) -> None:
+        """Publicar cuando la transacción de `db` se confirme (se descarta si hay rollback)"""
+        db.info.setdefault("bus_pending", []).append((topic, data or {}))
+
+    def start(self, engine=None) -> None:
+        """Arrancar el backend entre workers según la configuración"""
+        backend_name = settings.event_bus_backend
+        if backend_name == "memory" or self.backend is not None:
+            return
+        if backend_name == "postgres":
+            if engine is None or engine.dialect.name != "postgresql":
+                logger.warning("event_bus_backend=postgres requiere PostgreSQL; se usa el bus en memoria")
+                return
+            self.backend = PostgresNotifyBackend(self, engine, settings.event_bus_channel)
+            self.backend.start()
+        else:
+            logger.warning("Backend de eventos desconocido: %s", backend_name)
+
+    def stop(self) -> None:
+        if self.backend is not None:
+            self.backend.stop()
+            self.backend = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores del bus"""
+        with self._lock:
+            callbacks = len(self._callbacks)
+            subscriptions = len(self._subscriptions)
+        return {
+            "worker_id": self.worker_id,
+            "backend": type(self.backend).__name__ if self.backend else "memory",
+            "published": self.published,
+            "received_remote": self.received_remote,
+            "callbacks": callbacks,
+            "subscriptions": subscriptions,
+        }
+
+
+class PostgresNotifyBackend:
+    """Reenvía los eventos entre workers con LISTEN/NOTIFY de PostgreSQL"""
+
+    def __init__(self, bus: EventBus, engine, channel: str):
+        self.bus = bus
+        self.engine = engine
+        self.channel = channel
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def send(self, bus_event: BusEvent) -> None:
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                         {"channel": self.channel, "payload": bus_event.to_json()})
+            conn.commit()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._listen_forever, name="event-bus-listen", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _listen_forever(self) -> None:
+        while not self._stop.is_set():
+            raw = None
+            try:
+                raw = self.engine.raw_connection()
+                dbapi_conn = raw.driver_connection
+                dbapi_conn.autocommit = True
+                cursor = dbapi_conn.cursor()
+                cursor.execute(f'LISTEN "{self.channel}"')
+                while not self._stop.is_set():
+                    if select.select([dbapi_conn], [], [], 5)[0]:
+                        dbapi_conn.poll()
+                        while dbapi_conn.notifies:
+                            notify = dbapi_conn.notifies.pop(0)
+                            self.bus.receive_remote(BusEvent.from_json(notify.payload))
+            except Exception:
+                logger.exception("Conexión LISTEN perdida; reintentando")
+                time.sleep(2)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.invalidate()
+                    except Exception:
+                        pass
+
+
+# Instancia global del bus
+event_bus = EventBus()
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session) -> None:
+    """Publicar los eventos diferidos de la transacción confirmada"""
+    pending = session.info.pop("bus_pending", None)
+    for topic, data in pending or ():
+        event_bus.publish(topic, data)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending(session: Session, transaction) -> None:
+    """Descartar eventos cuando la transacción principal termina sin confirmar.
+
+    `after_rollback` también llega al revertir un savepoint (`begin_nested`)
+    y se perdían los avisos de la transacción de afuera. Lo anotado dentro de
+    un savepoint revertido se publica igual: son invalidaciones y una de más
+    solo cuesta una recarga.
+    """
+    if transaction.parent is None and not transaction.nested:
+        session.info.pop("bus_pending", None)
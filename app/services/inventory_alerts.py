@@ -10,6 +10,7 @@ from app.models.product import Product
 from app.models.inventory import InventoryMovement, MovementType
 from app.models.notifications import Notification, NotificationType
 from app.models.user import User, UserRole
+from app.services.product_lookup_service import ProductLookupService
 
 
 class InventoryAlertService:
@@ -275,42 +276,14 @@ class InventoryAlertService:
     
     @staticmethod
     def process_barcode_scan(db: Session, barcode: str) -> Dict[str, Any]:
-        """Procesar escaneo de código de barras"""
-        product = db.query(Product).filter(Product.barcode == barcode).first()
+        """Procesar escaneo de código de barras (también acepta SKU o código interno)"""
+        record = ProductLookupService.lookup(db, barcode)
         
-        if not product:
+        if record is None:
             return {
                 "success": False,
                 "message": "Producto no encontrado",
                 "barcode": barcode
             }
         
-        if not product.is_active:
-            return {
-                "success": False,
-                "message": "Producto inactivo",
-                "product_name": product.name
-            }
-        
-        # Verificar stock si aplica
-        stock_info = None
-        if product.track_stock:
-            stock_info = {
-                "current_stock": product.stock_quantity,
-                "unit": product.unit,
-                "is_low_stock": product.is_low_stock,
-                "is_out_of_stock": product.is_out_of_stock,
-                "alert_message": product.get_stock_alert_message()
-            }
-        
-        return {
-            "success": True,
-            "product": {
-                "id": product.id,
-                "name": product.name,
-                "price": float(product.price),
-                "category": product.category,
-                "image_url": product.image_url,
-                "stock_info": stock_info
-            }
-        }
+        return record.to_scan_result()
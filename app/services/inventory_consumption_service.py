@@ -2,19 +2,52 @@
 Servicio para manejar el consumo automático de inventario
 cuando se venden productos que tienen recetas
 """
-from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+import threading
+from typing import List, Dict, Any, Iterable, Optional, NamedTuple, Tuple
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import event, insert, update, bindparam
 from decimal import Decimal
 import logging
 
+from app.cache import TTLCache
+from app.config import settings
 from app.models.product import Product, ProductType
 from app.models.recipe import Recipe, RecipeItem
 from app.models.inventory import InventoryMovement, MovementType, MovementReason
-from app.models.user import User
+from app.models.sale import SaleItem
+from app.models.order import OrderItem
+from app.services.event_bus import event_bus, RECIPE_CHANGED, STOCK_CHANGED
 
 logger = logging.getLogger(__name__)
 
+BOM_KEY = "bom"
+
+bom_cache = TTLCache(max_size=1, ttl_seconds=settings.recipe_bom_cache_ttl_seconds, name="recipe_bom")
+_bom_lock = threading.Lock()
+# Aumenta con cada invalidación: recetas compiladas antes no se guardan
+_bom_generation = 0
+
+
+class BomLine(NamedTuple):
+    """Ingrediente de una receta compilada"""
+    ingredient_id: int
+    qty_per_unit: float
+    unit: Optional[str]
+    is_optional: bool
+
+
+class CompiledRecipe(NamedTuple):
+    """Receta activa de un producto, lista para consumir sin volver a la BD"""
+    recipe_id: int
+    recipe_name: str
+    lines: Tuple[BomLine, ...]
+
+    @property
+    def required_lines(self) -> Tuple[BomLine, ...]:
+        """Solo ingredientes obligatorios (los que se descuentan al vender)"""
+        return tuple(line for line in self.lines if not line.is_optional)
+
 
 class InventoryConsumptionService:
     """Servicio para manejar el consumo de inventario"""
@@ -22,7 +55,75 @@ class InventoryConsumptionService:
     def __init__(self, db: Session):
         self.db = db
     
-    def consume_inventory_for_sale(self, product_id: int, quantity: int, user_id: int, 
+    @staticmethod
+    def _compile_bom(db: Session) -> Dict[int, CompiledRecipe]:
+        """Compilar las recetas activas con una sola consulta.
+        
+        Si un producto tiene varias recetas activas se usa la de menor id,
+        igual que el `.first()` de la versión anterior.
+        """
+        rows = db.query(
+            Recipe.product_id,
+            Recipe.id,
+            Recipe.name,
+            RecipeItem.product_id,
+            RecipeItem.quantity,
+            RecipeItem.unit,
+            RecipeItem.is_optional
+        ).outerjoin(
+            RecipeItem, RecipeItem.recipe_id == Recipe.id
+        ).filter(
+            Recipe.is_active == True
+        ).order_by(Recipe.id, RecipeItem.id).all()
+        
+        recipes: Dict[int, Tuple[int, str, List[BomLine]]] = {}
+        for product_id, recipe_id, recipe_name, ingredient_id, quantity, unit, is_optional in rows:
+            entry = recipes.setdefault(product_id, (recipe_id, recipe_name, []))
+            if entry[0] != recipe_id or ingredient_id is None:
+                continue
+            entry[2].append(BomLine(ingredient_id, float(quantity), unit, bool(is_optional)))
+        
+        return {
+            product_id: CompiledRecipe(recipe_id, recipe_name, tuple(lines))
+            for product_id, (recipe_id, recipe_name, lines) in recipes.items()
+        }
+    
+    @staticmethod
+    def get_bom(db: Session) -> Dict[int, CompiledRecipe]:
+        """Recetas compiladas por producto desde caché.
+        
+        Se invalida cuando cambian `recipes` o `recipe_items` (aviso del bus);
+        el TTL solo acota lo que dura un dato obsoleto si se pierde el aviso.
+        """
+        bom = bom_cache.get(BOM_KEY)
+        if bom is not None:
+            return bom
+        
+        with _bom_lock:
+            bom = bom_cache.get(BOM_KEY)
+            if bom is None:
+                generation = _bom_generation
+                bom = InventoryConsumptionService._compile_bom(db)
+                # Si una receta cambió mientras se compilaba, usarla sin guardarla
+                if generation == _bom_generation:
+                    bom_cache.set(BOM_KEY, bom)
+        return bom
+    
+    def get_compiled_recipe(self, product_id: int) -> Optional[CompiledRecipe]:
+        """Receta activa compilada de un producto (None si no tiene)"""
+        return self.get_bom(self.db).get(product_id)
+    
+    def _load_products(self, product_ids) -> Dict[int, Product]:
+        """Producto vendido e ingredientes en una sola consulta"""
+        ids = set(product_ids)
+        if not ids:
+            return {}
+        return {
+            product.id: product
+            for product in self.db.query(Product).filter(Product.id.in_(ids)).all()
+        }
+    
+    def consume_inventory_for_sale(self, product_id: int, quantity: int, user_id: int,
                                  sale_id: Optional[int] = None) -> Dict[str, Any]:
         """
         Consumir inventario cuando se vende un producto que tiene receta
@@ -32,78 +133,103 @@ class InventoryConsumptionService:
             quantity: Cantidad vendida
             user_id: ID del usuario que realiza la venta
             sale_id: ID de la venta (opcional)
-            
+        
+        Returns:
+            Dict con información del consumo realizado
+        """
+        return self.consume_inventory_for_ticket([(product_id, quantity)], user_id, sale_id=sale_id)
+    
+    def lines_for_sale(self, sale_id: int) -> List[Tuple[int, int]]:
+        """Líneas (product_id, cantidad) de una venta"""
+        return [
+            (product_id, quantity)
+            for product_id, quantity in self.db.query(SaleItem.product_id, SaleItem.quantity).filter(
+                SaleItem.sale_id == sale_id
+            ).all()
+        ]
+    
+    def lines_for_order(self, order_id: int) -> List[Tuple[int, int]]:
+        """Líneas (product_id, cantidad) de un pedido"""
+        return [
+            (product_id, quantity)
+            for product_id, quantity in self.db.query(OrderItem.product_id, OrderItem.quantity).filter(
+                OrderItem.order_id == order_id
+            ).all()
+        ]
+    
+    def consume_inventory_for_ticket(self, lines: Iterable[Tuple[int, int]], user_id: int,
+                                     sale_id: Optional[int] = None, order_id: Optional[int] = None,
+                                     commit: bool = True) -> Dict[str, Any]:
+        """
+        Consumir el inventario de una venta o pedido completo en una transacción
+        
+        La demanda de cada ingrediente se suma entre todas las líneas. Las filas
+        de los ingredientes se bloquean (SELECT ... FOR UPDATE) en orden de id,
+        así dos cajas que comparten ingredientes esperan en vez de bloquearse
+        mutuamente, y cada descuento es un UPDATE condicional que nunca deja el
+        stock negativo.
+        
+        Args:
+            lines: Pares (product_id, cantidad) del ticket
+            user_id: ID del usuario que realiza la venta
+            sale_id: ID de la venta (opcional)
+            order_id: ID del pedido (opcional)
+            commit: Con False el consumo queda en la transacción del llamador
+        
         Returns:
             Dict con información del consumo realizado
         """
         try:
-            # Obtener el producto
-            product = self.db.query(Product).filter(Product.id == product_id).first()
-            if not product:
-                raise ValueError(f"Producto con ID {product_id} no encontrado")
+            quantities: Dict[int, int] = {}
+            for product_id, quantity in lines:
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+            
+            sold_products = self._load_products(quantities)
+            for product_id in quantities:
+                if product_id not in sold_products:
+                    raise ValueError(f"Producto con ID {product_id} no encontrado")
+            
+            # Demanda total por ingrediente según las recetas compiladas
+            bom = self.get_bom(self.db)
+            demand: Dict[int, float] = {}
+            units: Dict[int, Optional[str]] = {}
+            sources: List[str] = []
+            for product_id, quantity in quantities.items():
+                product = sold_products[product_id]
+                compiled = bom.get(product_id)
+                if compiled is None or not product.is_sales_product:
+                    continue
+                sources.append(f"{product.name} x{quantity}")
+                for line in compiled.required_lines:
+                    demand[line.ingredient_id] = demand.get(line.ingredient_id, 0) + line.qty_per_unit * quantity
+                    units.setdefault(line.ingredient_id, line.unit)
             
-            # Verificar si es un producto de venta con receta
-            if not product.can_consume_inventory():
+            if not demand:
                 return {
                     "success": True,
                     "message": "Producto no requiere consumo de inventario",
                     "consumed_items": []
                 }
             
-            # Obtener la receta del producto
-            recipe = self.db.query(Recipe).filter(
-                and_(
-                    Recipe.product_id == product_id,
-                    Recipe.is_active == True
-                )
-            ).first()
-            
-            if not recipe:
-                logger.warning(f"Producto {product.name} no tiene receta activa")
-                return {
-                    "success": True,
-                    "message": "Producto no tiene receta activa",
-                    "consumed_items": []
-                }
-            
-            # Obtener los ingredientes de la receta
-            recipe_items = self.db.query(RecipeItem).filter(
-                and_(
-                    RecipeItem.recipe_id == recipe.id,
-                    RecipeItem.is_optional == False  # Solo ingredientes obligatorios
-                )
-            ).all()
+            # Bloquear los ingredientes en orden determinístico
+            ingredients = self.db.query(Product).filter(
+                Product.id.in_(demand)
+            ).order_by(Product.id).with_for_update().populate_existing().all()
             
-            if not recipe_items:
-                logger.warning(f"Receta {recipe.name} no tiene ingredientes")
-                return {
-                    "success": True,
-                    "message": "Receta no tiene ingredientes",
-                    "consumed_items": []
-                }
+            found_ids = {ingredient.id for ingredient in ingredients}
+            for ingredient_id in demand:
+                if ingredient_id not in found_ids:
+                    logger.error(f"Ingrediente con ID {ingredient_id} no encontrado")
             
-            consumed_items = []
+            consumption = []
             insufficient_stock_items = []
-            
-            # Verificar stock disponible para todos los ingredientes
-            for recipe_item in recipe_items:
-                required_quantity = recipe_item.quantity * quantity
-                
-                # Obtener el producto ingrediente
-                ingredient = self.db.query(Product).filter(
-                    Product.id == recipe_item.product_id
-                ).first()
-                
-                if not ingredient:
-                    logger.error(f"Ingrediente con ID {recipe_item.product_id} no encontrado")
-                    continue
-                
+            for ingredient in ingredients:
                 # Verificar si es un producto de inventario
                 if not ingredient.is_inventory_product:
                     logger.warning(f"Producto {ingredient.name} no es una materia prima")
                     continue
                 
-                # Verificar stock disponible
+                required_quantity = demand[ingredient.id]
                 if ingredient.stock_quantity < required_quantity:
                     insufficient_stock_items.append({
                         "ingredient_id": ingredient.id,
@@ -112,9 +238,12 @@ class InventoryConsumptionService:
                         "available": ingredient.stock_quantity,
                         "shortage": required_quantity - ingredient.stock_quantity
                     })
+                consumption.append((ingredient, required_quantity))
             
             # Si hay ingredientes con stock insuficiente, no proceder
             if insufficient_stock_items:
+                if commit:
+                    self.db.rollback()  # Liberar los bloqueos
                 return {
                     "success": False,
                     "message": "Stock insuficiente para algunos ingredientes",
@@ -122,48 +251,66 @@ class InventoryConsumptionService:
                     "consumed_items": []
                 }
             
-            # Consumir el inventario
-            for recipe_item in recipe_items:
-                required_quantity = recipe_item.quantity * quantity
-                
-                # Obtener el producto ingrediente
-                ingredient = self.db.query(Product).filter(
-                    Product.id == recipe_item.product_id
-                ).first()
-                
-                # Crear movimiento de inventario
-                movement = InventoryMovement(
-                    product_id=ingredient.id,
-                    user_id=user_id,
-                    movement_type=MovementType.SALIDA,
-                    reason=MovementReason.VENTA,
-                    reason_detail=f"Consumo por venta de {product.name}",
-                    quantity=required_quantity,
-                    previous_stock=ingredient.stock_quantity,
-                    new_stock=ingredient.stock_quantity - required_quantity,
-                    reference_type="sale",
-                    reference_id=sale_id,
-                    notes=f"Consumo automático por venta de {product.name} (cantidad: {quantity})"
+            # Descuento condicional: verifica y descuenta en la misma sentencia
+            products_table = Product.__table__
+            decrement = (
+                update(products_table)
+                .where(
+                    products_table.c.id == bindparam("ingredient_id"),
+                    products_table.c.stock_quantity >= bindparam("consumed")
                 )
+                .values(stock_quantity=products_table.c.stock_quantity - bindparam("consumed"))
+                .returning(products_table.c.stock_quantity)
+            )
+            
+            if sale_id:
+                reference = f"venta #{sale_id}"
+            elif order_id:
+                reference = f"pedido #{order_id}"
+            else:
+                reference = "venta"
+            notes = f"Consumo automático por {reference}: {', '.join(sources)}"
+            
+            consumed_items = []
+            movements = []
+            for ingredient, required_quantity in consumption:
+                new_stock = self.db.execute(
+                    decrement, {"ingredient_id": ingredient.id, "consumed": required_quantity}
+                ).scalar()
+                if new_stock is None:
+                    raise ValueError(f"Stock insuficiente para {ingredient.name}")
+                set_committed_value(ingredient, "stock_quantity", new_stock)
                 
-                self.db.add(movement)
-                
-                # Actualizar stock del ingrediente
-                ingredient.stock_quantity -= required_quantity
-                
+                movements.append({
+                    "product_id": ingredient.id,
+                    "user_id": user_id,
+                    "adjustment_type": MovementType.SALIDA.value,
+                    "reason": MovementReason.VENTA.value,
+                    "quantity": required_quantity,
+                    "previous_stock": new_stock + required_quantity,
+                    "new_stock": new_stock,
+                    "notes": notes
+                })
                 consumed_items.append({
                     "ingredient_id": ingredient.id,
                     "ingredient_name": ingredient.name,
                     "quantity_consumed": required_quantity,
-                    "unit": recipe_item.unit,
+                    "unit": units.get(ingredient.id),
                     "unit_cost": float(ingredient.purchase_price or 0),
-                    "total_cost": float((ingredient.purchase_price or 0) * required_quantity)
+                    "total_cost": float(ingredient.purchase_price or 0) * required_quantity
                 })
             
-            # Confirmar cambios
-            self.db.commit()
+            # Todos los movimientos en un solo INSERT
+            if movements:
+                self.db.execute(insert(InventoryMovement), movements)
+                event_bus.publish_after_commit(self.db, STOCK_CHANGED, {
+                    "product_ids": [movement["product_id"] for movement in movements]
+                })
+            
+            if commit:
+                self.db.commit()
             
-            logger.info(f"Consumo de inventario exitoso para producto {product.name} (cantidad: {quantity})")
+            logger.info(f"Consumo de inventario exitoso para {reference} ({len(consumed_items)} ingredientes)")
             
             return {
                 "success": True,
@@ -173,7 +320,8 @@ class InventoryConsumptionService:
             }
             
         except Exception as e:
-            self.db.rollback()
+            if commit:
+                self.db.rollback()
             logger.error(f"Error al consumir inventario: {str(e)}")
             raise e
     
@@ -184,57 +332,33 @@ class InventoryConsumptionService:
         Args:
             product_id: ID del producto
             quantity: Cantidad a verificar
-            
+        
         Returns:
             Dict con información de disponibilidad
         """
         try:
-            # Obtener el producto
-            product = self.db.query(Product).filter(Product.id == product_id).first()
+            compiled = self.get_compiled_recipe(product_id)
+            required_lines = compiled.required_lines if compiled else ()
+            
+            products = self._load_products([product_id] + [line.ingredient_id for line in required_lines])
+            product = products.get(product_id)
             if not product:
                 raise ValueError(f"Producto con ID {product_id} no encontrado")
             
             # Verificar si es un producto de venta con receta
-            if not product.can_consume_inventory():
+            if not product.is_sales_product or compiled is None:
                 return {
                     "available": True,
                     "message": "Producto no requiere inventario",
                     "ingredients": []
                 }
             
-            # Obtener la receta del producto
-            recipe = self.db.query(Recipe).filter(
-                and_(
-                    Recipe.product_id == product_id,
-                    Recipe.is_active == True
-                )
-            ).first()
-            
-            if not recipe:
-                return {
-                    "available": True,
-                    "message": "Producto no tiene receta activa",
-                    "ingredients": []
-                }
-            
-            # Obtener los ingredientes de la receta
-            recipe_items = self.db.query(RecipeItem).filter(
-                and_(
-                    RecipeItem.recipe_id == recipe.id,
-                    RecipeItem.is_optional == False
-                )
-            ).all()
-            
             ingredients_status = []
             all_available = True
             
-            for recipe_item in recipe_items:
-                required_quantity = recipe_item.quantity * quantity
-                
-                # Obtener el producto ingrediente
-                ingredient = self.db.query(Product).filter(
-                    Product.id == recipe_item.product_id
-                ).first()
+            for line in required_lines:
+                required_quantity = line.qty_per_unit * quantity
+                ingredient = products.get(line.ingredient_id)
                 
                 if not ingredient or not ingredient.is_inventory_product:
                     continue
@@ -249,7 +373,7 @@ class InventoryConsumptionService:
                     "required": required_quantity,
                     "available": ingredient.stock_quantity,
                     "sufficient": available,
-                    "unit": recipe_item.unit
+                    "unit": line.unit
                 })
             
             return {
@@ -257,7 +381,7 @@ class InventoryConsumptionService:
                 "message": "Stock disponible" if all_available else "Stock insuficiente",
                 "ingredients": ingredients_status
             }
-            
+        
         except Exception as e:
             logger.error(f"Error al verificar disponibilidad: {str(e)}")
             raise e
@@ -268,74 +392,86 @@ class InventoryConsumptionService:
         
         Args:
             product_id: ID del producto
-            
+        
         Returns:
             Dict con información del costo de la receta
         """
         try:
-            # Obtener el producto
-            product = self.db.query(Product).filter(Product.id == product_id).first()
-            if not product:
-                raise ValueError(f"Producto con ID {product_id} no encontrado")
+            compiled = self.get_compiled_recipe(product_id)
+            lines = compiled.lines if compiled else ()
             
-            # Obtener la receta del producto
-            recipe = self.db.query(Recipe).filter(
-                and_(
-                    Recipe.product_id == product_id,
-                    Recipe.is_active == True
-                )
-            ).first()
+            products = self._load_products([product_id] + [line.ingredient_id for line in lines])
+            if product_id not in products:
+                raise ValueError(f"Producto con ID {product_id} no encontrado")
             
-            if not recipe:
+            if compiled is None:
                 return {
                     "has_recipe": False,
                     "total_cost": 0,
                     "ingredients": []
                 }
             
-            # Obtener los ingredientes de la receta
-            recipe_items = self.db.query(RecipeItem).filter(
-                RecipeItem.recipe_id == recipe.id
-            ).all()
-            
             ingredients_cost = []
             total_cost = Decimal('0')
             
-            for recipe_item in recipe_items:
-                # Obtener el producto ingrediente
-                ingredient = self.db.query(Product).filter(
-                    Product.id == recipe_item.product_id
-                ).first()
+            for line in lines:
+                ingredient = products.get(line.ingredient_id)
                 
                 if not ingredient or not ingredient.is_inventory_product:
                     continue
                 
                 unit_cost = ingredient.purchase_price or Decimal('0')
-                item_cost = unit_cost * recipe_item.quantity
+                item_cost = unit_cost * Decimal(str(line.qty_per_unit))
                 total_cost += item_cost
                 
                 ingredients_cost.append({
                     "ingredient_id": ingredient.id,
                     "ingredient_name": ingredient.name,
-                    "quantity": recipe_item.quantity,
-                    "unit": recipe_item.unit,
+                    "quantity": line.qty_per_unit,
+                    "unit": line.unit,
                     "unit_cost": float(unit_cost),
                     "total_cost": float(item_cost),
-                    "is_optional": recipe_item.is_optional
+                    "is_optional": line.is_optional
                 })
             
-            # Actualizar el costo total de la receta
-            recipe.total_cost = total_cost
+            # Actualizar el costo total de la receta (UPDATE directo: el costo
+            # no forma parte de la receta compilada y no debe invalidarla)
+            self.db.query(Recipe).filter(Recipe.id == compiled.recipe_id).update(
+                {Recipe.total_cost: total_cost}, synchronize_session=False
+            )
             self.db.commit()
             
             return {
                 "has_recipe": True,
                 "total_cost": float(total_cost),
                 "ingredients": ingredients_cost,
-                "recipe_id": recipe.id,
-                "recipe_name": recipe.name
+                "recipe_id": compiled.recipe_id,
+                "recipe_name": compiled.recipe_name
             }
-            
+        
         except Exception as e:
             logger.error(f"Error al calcular costo de receta: {str(e)}")
             raise e
+
+
+def _invalidate_bom(bus_event) -> None:
+    global _bom_generation
+    _bom_generation += 1
+    bom_cache.invalidate(BOM_KEY)
+
+
+event_bus.subscribe(RECIPE_CHANGED, _invalidate_bom)
+
+
+@event.listens_for(Recipe, "after_insert")
+@event.listens_for(Recipe, "after_update")
+@event.listens_for(Recipe, "after_delete")
+@event.listens_for(RecipeItem, "after_insert")
+@event.listens_for(RecipeItem, "after_update")
+@event.listens_for(RecipeItem, "after_delete")
+def _publish_recipe_changed(mapper, connection, target) -> None:
+    """Publicar cambios de recetas al confirmar la transacción"""
+    session = object_session(target)
+    if session is not None:
+        product_id = target.product_id if isinstance(target, Recipe) else None
+        event_bus.publish_after_commit(session, RECIPE_CHANGED, {"product_id": product_id})
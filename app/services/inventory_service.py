@@ -5,7 +5,7 @@ from typing import List, Optional, Dict, Any, Tuple
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_, or_, desc, asc
+from sqlalchemy import func, and_, desc, asc, case
 from sqlalchemy.exc import IntegrityError
 import logging
 
@@ -16,6 +16,7 @@ from app.models.inventory import (
 )
 from app.models.product import Product
 from app.models.user import User
+from app.services.product_search_service import ProductSearchService
 from app.schemas.inventory import (
     InventoryMovementCreate, InventoryLotCreate, InventoryLocationCreate,
     InventoryAlertCreate, InventoryCountCreate, InventoryCountItemCreate,
@@ -584,28 +585,24 @@ class InventoryService:
     def search_inventory(self, filters: InventorySearchFilters) -> List[Dict[str, Any]]:
         """Búsqueda avanzada de inventario"""
         query = self.db.query(Product).options(
-            joinedload(Product.category),
-            joinedload(Product.subcategory),
-            joinedload(Product.default_location)
+            joinedload(Product.category_rel),
+            joinedload(Product.subcategory_rel)
         )
         
         # Aplicar filtros
+        ranked_ids = None
         if filters.search:
-            search_term = f"%{filters.search}%"
-            query = query.filter(
-                or_(
-                    Product.name.ilike(search_term),
-                    Product.code.ilike(search_term),
-                    Product.description.ilike(search_term)
-                )
+            # Índice sin tildes; los demás filtros se aplican sobre sus resultados
+            ranked_ids = ProductSearchService.search(
+                self.db, filters.search, limit=None, active_only=not filters.include_inactive
             )
+            if not ranked_ids:
+                return []
+            query = query.filter(Product.id.in_(ranked_ids))
         
         if filters.category_id:
             query = query.filter(Product.category_id == filters.category_id)
         
-        if filters.location_id:
-            query = query.filter(Product.default_location_id == filters.location_id)
-        
         if filters.stock_status:
             if filters.stock_status == "normal":
                 query = query.filter(
@@ -626,15 +623,15 @@ class InventoryService:
             elif filters.stock_status == "overstock":
                 query = query.filter(Product.stock >= func.coalesce(Product.max_stock, 999999))
         
-        if filters.track_lots is not None:
-            query = query.filter(Product.track_lots == filters.track_lots)
-        
-        if filters.track_expiration is not None:
-            query = query.filter(Product.track_expiration == filters.track_expiration)
-        
         if not filters.include_inactive:
             query = query.filter(Product.is_active == True)
         
+        if ranked_ids is not None:
+            query = query.order_by(case(
+                {product_id: position for position, product_id in enumerate(ranked_ids)},
+                value=Product.id
+            ))
+        
         products = query.offset(filters.offset).limit(filters.limit).all()
         
         # Formatear resultados
@@ -650,11 +647,8 @@ class InventoryService:
                 "price": float(product.price),
                 "cost_price": float(product.cost_price) if product.cost_price else None,
                 "stock_status": product.stock_status,
-                "category_name": product.category.name if product.category else None,
-                "location_name": product.default_location.name if product.default_location else None,
-                "track_lots": product.track_lots,
-                "track_expiration": product.track_expiration,
-                "total_stock_value": float(product.total_stock_value),
+                "category_name": product.category_rel.name if product.category_rel else None,
+                "total_stock_value": float((product.stock or 0) * (product.cost_price or 0)),
                 "needs_reorder": product.needs_reorder
             }
             results.append(product_data)
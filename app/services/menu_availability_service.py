@@ -0,0 +1,198 @@
+"""
+Disponibilidad del menú: cuántas unidades de cada plato se pueden preparar
+con el stock actual de ingredientes
+"""
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from app.config import settings
+from app.models.product import Product, ProductType
+from app.services.event_bus import event_bus, STOCK_CHANGED
+from app.services.inventory_consumption_service import InventoryConsumptionService, bom_cache, BOM_KEY
+
+
+class MenuAvailabilityService:
+    """Matriz de disponibilidad del menú en memoria.
+
+    Guarda el stock de los ingredientes y una matriz dispersa
+    producto × ingrediente armada desde las recetas compiladas. Las unidades
+    preparables de un plato son el mínimo de stock / cantidad por unidad entre
+    sus ingredientes obligatorios, y se calculan para todo el menú en una
+    pasada. Cuando cambia el stock de un ingrediente solo se relee ese
+    ingrediente y se recalculan los platos que lo usan; si cambian las recetas
+    se rearma la matriz completa.
+    """
+
+    _lock = threading.Lock()
+    _bom = None                                            # Recetas compiladas usadas para la matriz
+    _matrix: Dict[int, Tuple[Tuple[int, float], ...]] = {}  # producto -> ((ingrediente, cantidad), ...)
+    _dependents: Dict[int, Set[int]] = {}                  # ingrediente -> productos que lo usan
+    _stock: Dict[int, Optional[float]] = {}                # ingrediente -> stock (None: no limita)
+    _makeable: Dict[int, int] = {}                         # producto -> unidades preparables
+    _dirty: Set[int] = set()
+    _loaded_at = 0.0
+    full_rebuilds = 0
+    incremental_refreshes = 0
+
+    @staticmethod
+    def _load_stock(db: Session, ingredient_ids: Iterable[int]) -> Dict[int, Optional[float]]:
+        """Stock de los ingredientes en una sola consulta.
+
+        Igual que el consumo, las materias primas inexistentes o que no son de
+        inventario no limitan la preparación.
+        """
+        ids = set(ingredient_ids)
+        stock: Dict[int, Optional[float]] = {ingredient_id: None for ingredient_id in ids}
+        if not ids:
+            return stock
+        rows = db.query(Product.id, Product.stock_quantity, Product.product_type).filter(
+            Product.id.in_(ids)
+        ).all()
+        for ingredient_id, stock_quantity, product_type in rows:
+            if product_type == ProductType.INVENTORY:
+                stock[ingredient_id] = float(stock_quantity or 0)
+        return stock
+
+    @staticmethod
+    def _units(product_id: int) -> Optional[int]:
+        """Mínimo stock / cantidad entre los ingredientes que limitan el plato"""
+        units = None
+        stock = MenuAvailabilityService._stock
+        for ingredient_id, quantity in MenuAvailabilityService._matrix[product_id]:
+            available = stock.get(ingredient_id)
+            if available is None:
+                continue
+            ratio = int(max(available, 0) // quantity)
+            if units is None or ratio < units:
+                units = ratio
+        return units
+
+    @staticmethod
+    def _rebuild(db: Session, bom) -> None:
+        """Armar la matriz y calcular todo el menú"""
+        matrix = {}
+        dependents: Dict[int, Set[int]] = {}
+        for product_id, compiled in bom.items():
+            lines = tuple(
+                (line.ingredient_id, line.qty_per_unit)
+                for line in compiled.required_lines if line.qty_per_unit > 0
+            )
+            if not lines:
+                continue
+            matrix[product_id] = lines
+            for ingredient_id, _ in lines:
+                dependents.setdefault(ingredient_id, set()).add(product_id)
+
+        cls = MenuAvailabilityService
+        cls._matrix = matrix
+        cls._dependents = dependents
+        cls._stock = cls._load_stock(db, dependents)
+        cls._dirty = set()
+        cls._makeable = {}
+        for product_id in matrix:
+            units = cls._units(product_id)
+            if units is not None:
+                cls._makeable[product_id] = units
+        cls._bom = bom
+        cls._loaded_at = time.monotonic()
+        cls.full_rebuilds += 1
+
+    @staticmethod
+    def _refresh_dirty(db: Session) -> None:
+        """Releer solo los ingredientes modificados y recalcular sus platos"""
+        cls = MenuAvailabilityService
+        dirty = {ingredient_id for ingredient_id in cls._dirty if ingredient_id in cls._dependents}
+        cls._dirty = set()
+        if not dirty:
+            return
+
+        cls._stock.update(cls._load_stock(db, dirty))
+        affected = set()
+        for ingredient_id in dirty:
+            affected |= cls._dependents[ingredient_id]
+        for product_id in affected:
+            units = cls._units(product_id)
+            if units is None:
+                cls._makeable.pop(product_id, None)
+            else:
+                cls._makeable[product_id] = units
+        cls.incremental_refreshes += 1
+
+    @staticmethod
+    def get_availability(db: Session) -> Dict[int, int]:
+        """Unidades preparables por producto (solo productos con receta activa)"""
+        bom = InventoryConsumptionService.get_bom(db)
+        cls = MenuAvailabilityService
+        with cls._lock:
+            expired = time.monotonic() - cls._loaded_at > settings.menu_availability_refresh_seconds
+            if bom is not cls._bom or expired:
+                cls._rebuild(db, bom)
+            elif cls._dirty:
+                cls._refresh_dirty(db)
+            return dict(cls._makeable)
+
+    @staticmethod
+    def peek_availability() -> Optional[Dict[int, int]]:
+        """Disponibilidad ya calculada, sin tocar la BD ni esperar el lock.
+
+        Devuelve None si hay algo que recalcular (o si otro hilo está
+        recalculando); el llamador entonces usa `get_availability`.
+        """
+        bom = bom_cache.get(BOM_KEY)
+        cls = MenuAvailabilityService
+        if bom is None or not cls._lock.acquire(blocking=False):
+            return None
+        try:
+            expired = time.monotonic() - cls._loaded_at > settings.menu_availability_refresh_seconds
+            if bom is not cls._bom or expired or cls._dirty:
+                return None
+            return dict(cls._makeable)
+        finally:
+            cls._lock.release()
+
+    @staticmethod
+    def mark_stock_changed(product_ids: Iterable[int]) -> None:
+        """Marcar ingredientes cuyo stock cambió (se releen en la próxima lectura)"""
+        with MenuAvailabilityService._lock:
+            MenuAvailabilityService._dirty.update(int(product_id) for product_id in product_ids)
+
+    @staticmethod
+    def stats() -> Dict[str, int]:
+        """Tamaño de la matriz y contadores de recálculo"""
+        cls = MenuAvailabilityService
+        return {
+            "products": len(cls._matrix),
+            "ingredients": len(cls._dependents),
+            "pending_ingredients": len(cls._dirty),
+            "full_rebuilds": cls.full_rebuilds,
+            "incremental_refreshes": cls.incremental_refreshes,
+        }
+
+
+def _on_stock_changed(bus_event) -> None:
+    MenuAvailabilityService.mark_stock_changed(bus_event.data.get("product_ids") or ())
+
+
+event_bus.subscribe(STOCK_CHANGED, _on_stock_changed)
+
+
+def _publish(target: Product) -> None:
+    session = object_session(target)
+    if session is not None:
+        event_bus.publish_after_commit(session, STOCK_CHANGED, {"product_ids": [target.id]})
+
+
+@event.listens_for(Product, "after_update")
+def _publish_stock_changed(mapper, connection, target: Product) -> None:
+    """Publicar cambios de stock hechos por el ORM al confirmar la transacción"""
+    attrs = inspect(target).attrs
+    if attrs.stock_quantity.history.has_changes() or attrs.product_type.history.has_changes():
+        _publish(target)
+
+
+@event.listens_for(Product, "after_delete")
+def _publish_product_deleted(mapper, connection, target: Product) -> None:
+    _publish(target)
@@ -0,0 +1,173 @@
+"""
+Servicio de numeración de ventas, pedidos y sesiones de caja
+"""
+import threading
+from collections import deque
+from datetime import date
+from typing import Deque, Dict, List, Optional, Tuple
+from sqlalchemy import create_engine, insert, update, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.numbering import NumberSequence
+
+SALE_SCOPE = "sale"
+ORDER_SCOPE = "order"
+
+
+class NumberingService:
+    """Entrega números consecutivos por día sin contar filas.
+
+    Cada ámbito tiene un contador por día en `number_sequences`. Reservar
+    números es un único `UPDATE ... RETURNING` en una transacción propia, así
+    el bloqueo de la fila dura milisegundos y nunca queda atado a la
+    transacción de la venta. Dos workers jamás reciben el mismo número; a
+    cambio pueden quedar huecos si una transacción falla o el proceso se
+    reinicia con números reservados sin usar.
+
+    Con `numbering_block_size > 1` (o `preallocate`) cada worker reserva un
+    bloque y lo consume en memoria; los números siguen siendo únicos pero ya
+    no salen en orden estricto entre workers.
+    """
+
+    # (ámbito, día) -> rangos reservados pendientes [siguiente, último]
+    _blocks: Dict[Tuple[str, date], Deque[List[int]]] = {}
+    # Protege solo `_blocks` y `_engines`; las reservas van fuera del lock
+    _lock = threading.Lock()
+    # Motor de la sesión -> motor propio para reservar
+    _engines: Dict[Engine, Engine] = {}
+
+    @staticmethod
+    def _sequence_engine(db: Session) -> Engine:
+        """Pool chico y separado para las reservas.
+
+        La petición ya tiene una conexión del pool principal; si la reserva
+        pidiera otra del mismo pool, en hora pico todas las peticiones podrían
+        quedar esperando una segunda conexión que nadie libera.
+        """
+        bind = db.get_bind().engine
+        if bind.dialect.name == "sqlite" and bind.url.database in (None, "", ":memory:"):
+            # Otro motor abriría una base en memoria distinta
+            return bind
+        sequence_engine = NumberingService._engines.get(bind)
+        if sequence_engine is None:
+            with NumberingService._lock:
+                sequence_engine = NumberingService._engines.get(bind)
+                if sequence_engine is None:
+                    options = {}
+                    if bind.dialect.name != "sqlite":
+                        options = {
+                            "pool_size": max(1, settings.numbering_pool_size),
+                            "max_overflow": 0,
+                            "pool_timeout": settings.db_pool_timeout,
+                        }
+                    sequence_engine = create_engine(
+                        bind.url,
+                        pool_recycle=settings.db_pool_recycle,
+                        pool_pre_ping=settings.db_pool_pre_ping,
+                        **options
+                    )
+                    NumberingService._engines[bind] = sequence_engine
+        return sequence_engine
+
+    @staticmethod
+    def _reserve(db: Session, scope: str, day: date, count: int) -> int:
+        """Reservar `count` números en la BD y devolver el último del bloque"""
+        table = NumberSequence.__table__
+        increment = (
+            update(table)
+            .where(table.c.scope == scope, table.c.day == day)
+            .values(last_value=table.c.last_value + count, updated_at=func.now())
+            .returning(table.c.last_value)
+        )
+
+        # Conexión propia: la reserva se confirma aunque la venta haga rollback
+        with NumberingService._sequence_engine(db).connect() as conn:
+            with conn.begin():
+                last_value = conn.execute(increment).scalar()
+            if last_value is not None:
+                return last_value
+
+            # Primer número del día para este ámbito
+            try:
+                with conn.begin():
+                    conn.execute(insert(table).values(scope=scope, day=day, last_value=count))
+                return count
+            except IntegrityError:
+                # Otro worker creó la fila al mismo tiempo
+                with conn.begin():
+                    return conn.execute(increment).scalar()
+
+    @staticmethod
+    def _forget_old_blocks(day: date) -> None:
+        """Descartar bloques de días anteriores"""
+        for key in [key for key in NumberingService._blocks if key[1] != day]:
+            del NumberingService._blocks[key]
+
+    @staticmethod
+    def next_value(db: Session, scope: str, day: Optional[date] = None) -> int:
+        """Obtener el siguiente número del día para un ámbito"""
+        day = day or date.today()
+        key = (scope, day)
+
+        with NumberingService._lock:
+            ranges = NumberingService._blocks.get(key)
+            while ranges:
+                current = ranges[0]
+                if current[0] <= current[1]:
+                    value = current[0]
+                    current[0] += 1
+                    return value
+                ranges.popleft()
+
+        # El UPDATE ... RETURNING ya garantiza números únicos: no hace falta el lock
+        block_size = max(1, settings.numbering_block_size)
+        last_value = NumberingService._reserve(db, scope, day, block_size)
+        first_value = last_value - block_size + 1
+        if block_size > 1:
+            with NumberingService._lock:
+                NumberingService._forget_old_blocks(day)
+                NumberingService._blocks.setdefault(key, deque()).append([first_value + 1, last_value])
+        return first_value
+
+    @staticmethod
+    def preallocate(db: Session, scope: str, count: int, day: Optional[date] = None) -> Tuple[int, int]:
+        """Reservar un bloque de números para este worker (p. ej. antes de una hora pico)"""
+        if count <= 0:
+            raise ValueError("La cantidad a reservar debe ser mayor a 0")
+
+        day = day or date.today()
+        last_value = NumberingService._reserve(db, scope, day, count)
+        first_value = last_value - count + 1
+        with NumberingService._lock:
+            NumberingService._forget_old_blocks(day)
+            NumberingService._blocks.setdefault((scope, day), deque()).append([first_value, last_value])
+        return first_value, last_value
+
+    @staticmethod
+    def cash_session_scope(cash_register_id: int) -> str:
+        """Ámbito de numeración de sesiones de una caja"""
+        return f"cash_session:{cash_register_id}"
+
+    @staticmethod
+    def next_sale_number(db: Session) -> str:
+        """Número de venta: V20240131-0001"""
+        today = date.today()
+        value = NumberingService.next_value(db, SALE_SCOPE, today)
+        return f"V{today.strftime('%Y%m%d')}-{value:04d}"
+
+    @staticmethod
+    def next_order_number(db: Session) -> str:
+        """Número de pedido: P20240131-001"""
+        today = date.today()
+        value = NumberingService.next_value(db, ORDER_SCOPE, today)
+        return f"P{today.strftime('%Y%m%d')}-{value:03d}"
+
+    @staticmethod
+    def next_session_number(db: Session, cash_register_id: int) -> str:
+        """Número de sesión de caja: S20240131-01-01"""
+        today = date.today()
+        value = NumberingService.next_value(db, NumberingService.cash_session_scope(cash_register_id), today)
+        return f"S{today.strftime('%Y%m%d')}-{cash_register_id:02d}-{value:02d}"
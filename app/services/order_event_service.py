@@ -0,0 +1,107 @@
+"""
+Servicio de eventos de pedidos para las pantallas de cocina
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event, func, inspect, insert
+from sqlalchemy.orm import Session
+
+from app.services.event_bus import event_bus, ORDER_TOPIC
+from app.models.order import (
+    Order, OrderItem, OrderEvent, OrderStatus,
+    ORDER_EVENT_CREATED, ORDER_EVENT_STARTED, ORDER_EVENT_COMPLETED,
+    ORDER_EVENT_STATUS_CHANGED, ORDER_EVENT_NOTES_UPDATED,
+    ORDER_EVENT_ITEMS_UPDATED, ORDER_EVENT_DELETED
+)
+
+# Evento según el nuevo estado del pedido
+STATUS_EVENTS = {
+    OrderStatus.PREPARING.value: ORDER_EVENT_STARTED,
+    OrderStatus.READY.value: ORDER_EVENT_COMPLETED,
+}
+
+NOTES_FIELDS = ("notes", "kitchen_notes")
+
+
+class OrderEventService:
+    """Lectura del registro de eventos que alimenta el stream de cocina"""
+
+    @staticmethod
+    def get_events_since(db: Session, cursor: int, limit: int = 200) -> List[OrderEvent]:
+        """Eventos posteriores al cursor, en orden (consulta por rango de la PK)"""
+        return db.query(OrderEvent).filter(
+            OrderEvent.id > cursor
+        ).order_by(OrderEvent.id.asc()).limit(limit).all()
+
+    @staticmethod
+    def get_cursor_bounds(db: Session) -> Tuple[int, int]:
+        """Menor y mayor id de evento disponibles (0, 0 si no hay eventos)"""
+        oldest, latest = db.query(func.min(OrderEvent.id), func.max(OrderEvent.id)).one()
+        return oldest or 0, latest or 0
+
+    @staticmethod
+    def purge_old_events(db: Session, retention_hours: int) -> int:
+        """Eliminar eventos más viejos que la retención; las pantallas con cursores
+        anteriores recibirán un snapshot completo al reconectar"""
+        limit_date = datetime.now() - timedelta(hours=retention_hours)
+        deleted = db.query(OrderEvent).filter(
+            OrderEvent.created_at < limit_date
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+
+def _status_value(status) -> Optional[str]:
+    return getattr(status, "value", status)
+
+
+@event.listens_for(Session, "after_flush")
+def _record_order_events(session: Session, flush_context) -> None:
+    """Registrar eventos de pedidos en la misma transacción que el cambio y
+    publicarlos en el bus al confirmar"""
+    pending: Dict[Tuple[int, str], dict] = {}
+
+    def add(order_id: Optional[int], event_type: str, order: Optional[Order] = None) -> None:
+        if order_id is None:
+            return
+        data = pending.setdefault((order_id, event_type), {"order_id": order_id})
+        if order is not None:
+            data.update({
+                "order_number": order.order_number,
+                "status": _status_value(order.status),
+                "waiter_id": order.waiter_id,
+                "table_id": order.table_id,
+            })
+
+    for obj in session.new:
+        if isinstance(obj, Order):
+            add(obj.id, ORDER_EVENT_CREATED, obj)
+        elif isinstance(obj, OrderItem):
+            add(obj.order_id, ORDER_EVENT_ITEMS_UPDATED)
+
+    for obj in session.dirty:
+        if isinstance(obj, Order):
+            attrs = inspect(obj).attrs
+            status_history = attrs.status.history
+            if status_history.added:
+                new_status = _status_value(status_history.added[0])
+                add(obj.id, STATUS_EVENTS.get(new_status, ORDER_EVENT_STATUS_CHANGED), obj)
+            if any(attrs[field].history.has_changes() for field in NOTES_FIELDS):
+                add(obj.id, ORDER_EVENT_NOTES_UPDATED, obj)
+        elif isinstance(obj, OrderItem) and session.is_modified(obj, include_collections=False):
+            add(obj.order_id, ORDER_EVENT_ITEMS_UPDATED)
+
+    for obj in session.deleted:
+        if isinstance(obj, Order):
+            add(obj.id, ORDER_EVENT_DELETED, obj)
+        elif isinstance(obj, OrderItem):
+            add(obj.order_id, ORDER_EVENT_ITEMS_UPDATED)
+
+    if pending:
+        session.connection().execute(
+            insert(OrderEvent.__table__),
+            [{"order_id": order_id, "event_type": event_type} for order_id, event_type in pending]
+        )
+        # Avisar a las vistas suscritas cuando la transacción se confirme
+        for (order_id, event_type), data in pending.items():
+            event_bus.publish_after_commit(session, f"{ORDER_TOPIC}{event_type}", data)
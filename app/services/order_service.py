@@ -1,15 +1,23 @@
 """
 Servicio para el manejo de pedidos del restaurante
 """
+import threading
 from typing import Optional, List, Dict, Any
-from datetime import datetime
+from datetime import datetime, date
 from decimal import Decimal
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy import func
 
+from app.cache import TTLCache
+from app.config import settings
+from app.dates import day_range
 from app.models.order import Order, OrderItem, OrderStatus, OrderType
 from app.models.location import Table, TableStatus
 from app.models.product import Product
+from app.services.numbering_service import NumberingService
+
+orders_summary_cache = TTLCache(max_size=2, ttl_seconds=settings.orders_summary_cache_ttl_seconds, name="orders_summary")
+_orders_summary_lock = threading.Lock()
 
 
 class OrderService:
@@ -18,14 +26,7 @@ class OrderService:
     @staticmethod
     def generate_order_number(db: Session) -> str:
         """Generar número único de pedido"""
-        today = datetime.now().strftime('%Y%m%d')
-        
-        # Contar pedidos del día
-        order_count = db.query(Order).filter(
-            func.date(Order.created_at) == datetime.now().date()
-        ).count()
-        
-        return f"P{today}-{order_count + 1:03d}"
+        return NumberingService.next_order_number(db)
     
     @staticmethod
     def create_order(
@@ -242,56 +243,56 @@ class OrderService:
         }
     
     @staticmethod
-    def get_orders_summary(db: Session) -> Dict[str, Any]:
-        """Obtener resumen de pedidos"""
-        total_orders = db.query(Order).filter(
-            func.date(Order.created_at) == datetime.now().date()
-        ).count()
+    def compute_orders_summary(db: Session, day: date = None) -> Dict[str, Any]:
+        """Resumen de pedidos de un día en una sola consulta.
+
+        Agregación condicional (COUNT(*) FILTER (WHERE ...)) sobre un rango
+        semiabierto de `created_at`, que puede usar el índice de la columna.
+        """
+        start, end = day_range(day)
+        paid = Order.status == OrderStatus.PAID
         
-        pending_orders = db.query(Order).filter(
-            and_(
-                func.date(Order.created_at) == datetime.now().date(),
+        row = db.query(
+            func.count(Order.id).label("total_orders"),
+            func.count(Order.id).filter(
                 Order.status.in_([OrderStatus.PENDING, OrderStatus.PREPARING])
-            )
-        ).count()
-        
-        ready_orders = db.query(Order).filter(
-            and_(
-                func.date(Order.created_at) == datetime.now().date(),
-                Order.status == OrderStatus.READY
-            )
-        ).count()
-        
-        served_orders = db.query(Order).filter(
-            and_(
-                func.date(Order.created_at) == datetime.now().date(),
-                Order.status == OrderStatus.SERVED
-            )
-        ).count()
-        
-        paid_orders = db.query(Order).filter(
-            and_(
-                func.date(Order.created_at) == datetime.now().date(),
-                Order.status == OrderStatus.PAID
-            )
-        ).count()
-        
-        total_revenue = db.query(func.sum(Order.final_amount)).filter(
-            and_(
-                func.date(Order.created_at) == datetime.now().date(),
-                Order.status == OrderStatus.PAID
-            )
-        ).scalar() or Decimal('0.00')
+            ).label("pending_orders"),
+            func.count(Order.id).filter(Order.status == OrderStatus.READY).label("ready_orders"),
+            func.count(Order.id).filter(Order.status == OrderStatus.SERVED).label("served_orders"),
+            func.count(Order.id).filter(paid).label("paid_orders"),
+            func.sum(Order.final_amount).filter(paid).label("total_revenue")
+        ).filter(
+            Order.created_at >= start,
+            Order.created_at < end
+        ).one()
         
         return {
-            "total_orders": total_orders,
-            "pending_orders": pending_orders,
-            "ready_orders": ready_orders,
-            "served_orders": served_orders,
-            "paid_orders": paid_orders,
-            "total_revenue": float(total_revenue)
+            "total_orders": row.total_orders,
+            "pending_orders": row.pending_orders,
+            "ready_orders": row.ready_orders,
+            "served_orders": row.served_orders,
+            "paid_orders": row.paid_orders,
+            "total_revenue": float(row.total_revenue or Decimal('0.00'))
         }
+    
+    @staticmethod
+    def get_orders_summary(db: Session) -> Dict[str, Any]:
+        """Obtener resumen de pedidos del día (caché compartida de TTL corto).
 
+        El tablero y las vistas lo consultan cada pocos segundos; con la caché
+        todas las peticiones dentro del TTL comparten una sola consulta.
+        """
+        today = date.today()
+        summary = orders_summary_cache.get(today)
+        if summary is not None:
+            return summary
+        
+        with _orders_summary_lock:
+            summary = orders_summary_cache.get(today)
+            if summary is None:
+                summary = OrderService.compute_orders_summary(db, today)
+                orders_summary_cache.set(today, summary)
+        return summary
 
 # Importar TableService para evitar dependencias circulares
 from app.services.table_service import TableService
@@ -0,0 +1,249 @@
+"""
+Búsqueda O(1) de productos por código de barras, SKU o código para el escáner de caja
+"""
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.product import Product
+from app.services.event_bus import event_bus, CATALOG_CHANGED, STOCK_CHANGED
+
+
+def normalize_code(code: Optional[str]) -> str:
+    """Los lectores a veces agregan espacios; SKU y código se tipean en minúsculas"""
+    return (code or "").strip().upper()
+
+
+class ScanRecord:
+    """Datos de un producto que necesita la caja al escanearlo"""
+    __slots__ = ("id", "name", "price", "category", "image_url", "is_active", "barcode", "sku", "code",
+                 "stock_info")
+
+    def __init__(self, row):
+        self.id = row.id
+        self.name = row.name
+        self.price = float(row.price or 0)
+        self.category = getattr(row.category, "value", row.category)
+        self.image_url = row.image_url
+        self.is_active = bool(row.is_active)
+        self.barcode = normalize_code(row.barcode)
+        self.sku = normalize_code(row.sku)
+        self.code = normalize_code(row.code)
+        self.stock_info = self._stock_info(row) if row.track_stock else None
+
+    @staticmethod
+    def _stock_info(row) -> Dict[str, Any]:
+        """Mismas reglas que Product.is_low_stock / is_out_of_stock / get_stock_alert_message"""
+        stock = row.stock_quantity or 0
+        min_stock = row.min_stock_level or 0
+        alert_message = None
+        if stock <= 0:
+            alert_message = f"⚠️ {row.name} está AGOTADO"
+        elif stock <= min_stock:
+            alert_message = f"⚠️ {row.name} tiene stock bajo ({stock} {row.unit})"
+        elif stock <= (row.reorder_point or 0):
+            alert_message = f"📦 {row.name} necesita reorden ({stock} {row.unit})"
+        return {
+            "current_stock": stock,
+            "unit": row.unit,
+            "is_low_stock": stock <= min_stock,
+            "is_out_of_stock": stock <= 0,
+            "alert_message": alert_message
+        }
+
+    def to_scan_result(self) -> Dict[str, Any]:
+        """Respuesta de InventoryAlertService.process_barcode_scan"""
+        if not self.is_active:
+            return {
+                "success": False,
+                "message": "Producto inactivo",
+                "product_name": self.name
+            }
+        return {
+            "success": True,
+            "product": {
+                "id": self.id,
+                "name": self.name,
+                "price": self.price,
+                "category": self.category,
+                "image_url": self.image_url,
+                "stock_info": self.stock_info
+            }
+        }
+
+
+class ProductLookupService:
+    """Índices en memoria código de barras / SKU / código -> producto.
+
+    Se carga completo (una consulta) al arrancar. Los productos creados,
+    modificados o eliminados llegan por `catalog.changed` y los cambios de
+    stock por `inventory.stock_changed`; se releen solo esos en la siguiente
+    búsqueda. Un código que no está en el índice se busca una vez en la BD
+    (por índice) antes de darlo por inexistente: sin backend en el bus, un
+    producto creado en otro worker no llega por evento. Si un código se
+    repite entre campos gana el código de barras, luego el SKU y luego el
+    código interno.
+    """
+
+    _lock = threading.Lock()
+    _records: Dict[int, ScanRecord] = {}
+    _barcodes: Dict[str, int] = {}
+    _skus: Dict[str, int] = {}
+    _codes: Dict[str, int] = {}
+    _dirty: Set[int] = set()
+    _loaded_at: Optional[float] = None
+    full_reloads = 0
+    incremental_refreshes = 0
+    lookups = 0
+    misses = 0
+    db_fallbacks = 0
+
+    @staticmethod
+    def _load_rows(db: Session, product_ids: Optional[Iterable[int]] = None):
+        query = db.query(
+            Product.id, Product.name, Product.price, Product.category, Product.image_url, Product.is_active,
+            Product.barcode, Product.sku, Product.code, Product.track_stock, Product.stock_quantity,
+            Product.min_stock_level, Product.reorder_point, Product.unit
+        )
+        if product_ids is not None:
+            query = query.filter(Product.id.in_(list(product_ids)))
+        return query
+
+    @staticmethod
+    def _remove(product_id: int) -> None:
+        cls = ProductLookupService
+        record = cls._records.pop(product_id, None)
+        if record is None:
+            return
+        for index, code in ((cls._barcodes, record.barcode), (cls._skus, record.sku), (cls._codes, record.code)):
+            if code and index.get(code) == product_id:
+                del index[code]
+
+    @staticmethod
+    def _add(row) -> None:
+        cls = ProductLookupService
+        cls._remove(row.id)
+        record = ScanRecord(row)
+        cls._records[record.id] = record
+        for index, code in ((cls._barcodes, record.barcode), (cls._skus, record.sku), (cls._codes, record.code)):
+            if code:
+                index[code] = record.id
+
+    @staticmethod
+    def _reload(db: Session) -> None:
+        cls = ProductLookupService
+        cls._records, cls._barcodes, cls._skus, cls._codes = {}, {}, {}, {}
+        for row in cls._load_rows(db).all():
+            cls._add(row)
+        cls._dirty = set()
+        cls._loaded_at = time.monotonic()
+        cls.full_reloads += 1
+
+    @staticmethod
+    def _refresh_dirty(db: Session) -> None:
+        """Releer solo los productos modificados"""
+        cls = ProductLookupService
+        dirty, cls._dirty = cls._dirty, set()
+        rows = cls._load_rows(db, dirty).all()
+        for row in rows:
+            cls._add(row)
+        for product_id in dirty - {row.id for row in rows}:
+            cls._remove(product_id)
+        cls.incremental_refreshes += 1
+
+    @staticmethod
+    def _ensure_fresh(db: Session) -> None:
+        """Llamar con el lock tomado"""
+        cls = ProductLookupService
+        if cls._loaded_at is None or time.monotonic() - cls._loaded_at > settings.scan_cache_refresh_seconds:
+            cls._reload(db)
+        elif cls._dirty:
+            cls._refresh_dirty(db)
+
+    @staticmethod
+    def _find(key: str) -> Optional[ScanRecord]:
+        cls = ProductLookupService
+        product_id = cls._barcodes.get(key) or cls._skus.get(key) or cls._codes.get(key)
+        return cls._records[product_id] if product_id is not None else None
+
+    @staticmethod
+    def _find_many(db: Session, codes: List[str]) -> List[Optional[ScanRecord]]:
+        """Llamar con el lock tomado; una sola consulta para todos los que falten"""
+        cls = ProductLookupService
+        keys = [normalize_code(code) for code in codes]
+        records = [cls._find(key) for key in keys]
+        missing = {key for key, record in zip(keys, records) if record is None and key}
+        if missing:
+            # Tal como se escanearon o en mayúsculas, para usar los índices únicos
+            variants = missing | {(code or "").strip() for code, key in zip(codes, keys) if key in missing}
+            rows = cls._load_rows_by_code(db, variants)
+            for row in rows:
+                cls._add(row)
+            cls.db_fallbacks += 1
+            records = [record or cls._find(key) for key, record in zip(keys, records)]
+        cls.lookups += len(records)
+        cls.misses += sum(record is None for record in records)
+        return records
+
+    @staticmethod
+    def _load_rows_by_code(db: Session, codes: Set[str]):
+        codes = list(codes)
+        return ProductLookupService._load_rows(db).filter(
+            or_(Product.barcode.in_(codes), Product.sku.in_(codes), Product.code.in_(codes))
+        ).all()
+
+    @staticmethod
+    def warm_up(db: Session) -> int:
+        """Cargar el índice completo (al arrancar); devuelve los productos cargados"""
+        with ProductLookupService._lock:
+            ProductLookupService._reload(db)
+            return len(ProductLookupService._records)
+
+    @staticmethod
+    def lookup(db: Session, code: str) -> Optional[ScanRecord]:
+        """Producto con ese código de barras, SKU o código (None si no existe)"""
+        with ProductLookupService._lock:
+            ProductLookupService._ensure_fresh(db)
+            return ProductLookupService._find_many(db, [code])[0]
+
+    @staticmethod
+    def lookup_many(db: Session, codes: Iterable[str]) -> List[Optional[ScanRecord]]:
+        """Varios códigos de una ráfaga del escáner, en el mismo orden"""
+        with ProductLookupService._lock:
+            ProductLookupService._ensure_fresh(db)
+            return ProductLookupService._find_many(db, list(codes))
+
+    @staticmethod
+    def mark_changed(product_ids: Iterable[int]) -> None:
+        """Marcar productos a releer en la próxima búsqueda"""
+        with ProductLookupService._lock:
+            ProductLookupService._dirty.update(int(product_id) for product_id in product_ids)
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """Tamaño de los índices y contadores"""
+        cls = ProductLookupService
+        return {
+            "products": len(cls._records),
+            "barcodes": len(cls._barcodes),
+            "skus": len(cls._skus),
+            "codes": len(cls._codes),
+            "pending_products": len(cls._dirty),
+            "lookups": cls.lookups,
+            "misses": cls.misses,
+            "db_fallbacks": cls.db_fallbacks,
+            "full_reloads": cls.full_reloads,
+            "incremental_refreshes": cls.incremental_refreshes,
+        }
+
+
+def _on_products_changed(bus_event) -> None:
+    product_ids = bus_event.data.get("product_ids")
+    if product_ids:
+        ProductLookupService.mark_changed(product_ids)
+
+
+event_bus.subscribe([CATALOG_CHANGED, STOCK_CHANGED], _on_products_changed)
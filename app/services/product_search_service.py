@@ -0,0 +1,377 @@
+"""
+Búsqueda de productos por nombre, código y descripción sin distinguir tildes
+"""
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import func, literal, literal_column, or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.product import Product, ProductType
+from app.services.event_bus import event_bus, CATALOG_CHANGED
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Fracción mínima de trigramas de la búsqueda presentes en el producto para
+# aceptar un resultado con errores de tipeo ("hamburgesa" -> "hamburguesa")
+FUZZY_MIN_SIMILARITY = 0.5
+
+# Texto buscable en PostgreSQL; igual a la expresión del índice de
+# migrations/product_search.py para que el planificador lo use
+PG_SEARCH_TEXT = (
+    "pos_unaccent(lower(coalesce(name, '') || ' ' || coalesce(code, '') || ' ' || coalesce(description, '')))"
+)
+PG_NAME_TEXT = "pos_unaccent(lower(name))"
+
+
+def fold(value: Optional[str]) -> str:
+    """Minúsculas y sin tildes: "Piña al Jalapeño" -> "pina al jalapeno" """
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _trigrams(word: str) -> Set[str]:
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class _Entry:
+    """Un producto en el índice, con sus textos ya normalizados"""
+    __slots__ = ("id", "name", "name_words", "text", "keys", "codes",
+                 "is_active", "product_type", "category")
+
+    def __init__(self, row):
+        self.id = row.id
+        self.name = row.name or ""
+        self.name_words = _WORD.findall(fold(row.name))
+        self.text = " ".join(fold(value) for value in (row.name, row.code, row.description) if value)
+        self.keys: Set[str] = set()
+        for word in _WORD.findall(self.text):
+            # Prefijos cortos para escribir-y-buscar y trigramas para subcadenas
+            self.keys.add("^" + word[:1])
+            self.keys.add("^" + word[:2])
+            self.keys |= _trigrams(word)
+        self.codes = {fold(value).strip() for value in (row.code, row.barcode, row.sku) if value}
+        self.is_active = bool(row.is_active)
+        self.product_type = getattr(row.product_type, "value", row.product_type)
+        self.category = getattr(row.category, "value", row.category)
+
+    def score(self, term: str) -> int:
+        """Palabra exacta del nombre 4, prefijo 3, subcadena 2; solo en código o descripción 1"""
+        best = 0
+        for word in self.name_words:
+            if word == term:
+                return 4
+            if word.startswith(term):
+                best = 3
+            elif best < 2 and term in word:
+                best = 2
+        if best:
+            return best
+        return 1 if term in self.text else 0
+
+
+class ProductSearchIndex:
+    """Índice invertido de n-gramas del catálogo, en memoria"""
+
+    def __init__(self):
+        self.entries: Dict[int, _Entry] = {}
+        self.postings: Dict[str, Set[int]] = {}
+        self.codes: Dict[str, int] = {}
+
+    def add(self, row) -> None:
+        self.remove(row.id)
+        entry = _Entry(row)
+        self.entries[entry.id] = entry
+        for key in entry.keys:
+            self.postings.setdefault(key, set()).add(entry.id)
+        for code in entry.codes:
+            self.codes[code] = entry.id
+
+    def remove(self, product_id: int) -> None:
+        entry = self.entries.pop(product_id, None)
+        if entry is None:
+            return
+        for key in entry.keys:
+            ids = self.postings.get(key)
+            if ids is not None:
+                ids.discard(product_id)
+                if not ids:
+                    del self.postings[key]
+        for code in entry.codes:
+            if self.codes.get(code) == product_id:
+                del self.codes[code]
+
+    def _candidates(self, term: str) -> Set[int]:
+        """Productos que pueden contener `term` (se verifica después con `score`)"""
+        if len(term) < 3:
+            return self.postings.get("^" + term, set())
+        postings = sorted((self.postings.get(key, set()) for key in _trigrams(term)), key=len)
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            candidates &= ids
+            if not candidates:
+                break
+        return candidates
+
+    def _fuzzy(self, terms: List[str], accept) -> List[Tuple]:
+        """Productos que comparten la mayoría de los trigramas de la búsqueda"""
+        query_trigrams = set().union(*(_trigrams(term) for term in terms))
+        if not query_trigrams:
+            return []
+        hits: Dict[int, int] = {}
+        for key in query_trigrams:
+            for product_id in self.postings.get(key, ()):
+                hits[product_id] = hits.get(product_id, 0) + 1
+        results = []
+        for product_id, count in hits.items():
+            similarity = count / len(query_trigrams)
+            entry = self.entries[product_id]
+            if similarity >= FUZZY_MIN_SIMILARITY and accept(entry):
+                results.append((-similarity, len(entry.name), entry.name, product_id))
+        return results
+
+    def search(
+        self,
+        query: str,
+        limit: Optional[int] = 50,
+        active_only: bool = True,
+        product_type: Optional[str] = None,
+        category: Optional[str] = None
+    ) -> List[int]:
+        """IDs de productos ordenados por relevancia.
+
+        Un código, código de barras o SKU exacto devuelve solo ese producto.
+        Cada palabra de la búsqueda debe aparecer (como prefijo o subcadena);
+        si ninguna coincide se buscan nombres parecidos por trigramas.
+        """
+        def accept(entry: _Entry) -> bool:
+            return (
+                (entry.is_active or not active_only)
+                and (product_type is None or entry.product_type == product_type)
+                and (category is None or entry.category == category)
+            )
+
+        folded = fold(query).strip()
+        exact = self.codes.get(folded)
+        if exact is not None and accept(self.entries[exact]):
+            return [exact]
+
+        terms = _WORD.findall(folded)
+        if not terms:
+            return []
+
+        candidates: Optional[Set[int]] = None
+        for term in sorted(terms, key=len, reverse=True):
+            found = self._candidates(term)
+            candidates = set(found) if candidates is None else candidates & found
+            if not candidates:
+                break
+
+        results = []
+        for product_id in candidates or ():
+            entry = self.entries[product_id]
+            if not accept(entry):
+                continue
+            scores = [entry.score(term) for term in terms]
+            if all(scores):
+                results.append((-sum(scores), len(entry.name), entry.name, product_id))
+        if not results:
+            results = self._fuzzy(terms, accept)
+
+        results.sort()
+        return [result[-1] for result in results[:limit]]
+
+
+class ProductSearchService:
+    """Búsqueda de productos para meseros, caja e inventario.
+
+    Con el backend "memory" cada worker mantiene un `ProductSearchIndex` con
+    nombre, código y descripción sin tildes: una búsqueda no toca la BD. Los
+    productos modificados llegan por el aviso `catalog.changed` y se releen
+    solos en la siguiente búsqueda. Con "postgres" se consulta la BD usando
+    el índice de trigramas de migrations/product_search.py.
+    """
+
+    _lock = threading.Lock()
+    _index: Optional[ProductSearchIndex] = None
+    _dirty: Set[int] = set()
+    _loaded_at = 0.0
+    full_rebuilds = 0
+    incremental_refreshes = 0
+
+    @staticmethod
+    def _load_rows(db: Session, product_ids: Optional[Iterable[int]] = None):
+        query = db.query(
+            Product.id, Product.name, Product.code, Product.barcode, Product.sku, Product.description,
+            Product.is_active, Product.product_type, Product.category
+        )
+        if product_ids is not None:
+            query = query.filter(Product.id.in_(list(product_ids)))
+        return query.all()
+
+    @staticmethod
+    def _rebuild(db: Session) -> None:
+        cls = ProductSearchService
+        index = ProductSearchIndex()
+        for row in cls._load_rows(db):
+            index.add(row)
+        cls._index = index
+        cls._dirty = set()
+        cls._loaded_at = time.monotonic()
+        cls.full_rebuilds += 1
+
+    @staticmethod
+    def _refresh_dirty(db: Session) -> None:
+        """Releer solo los productos modificados"""
+        cls = ProductSearchService
+        dirty, cls._dirty = cls._dirty, set()
+        rows = cls._load_rows(db, dirty)
+        for row in rows:
+            cls._index.add(row)
+        for product_id in dirty - {row.id for row in rows}:
+            cls._index.remove(product_id)
+        cls.incremental_refreshes += 1
+
+    @staticmethod
+    def _is_fresh() -> bool:
+        cls = ProductSearchService
+        return (
+            cls._index is not None and not cls._dirty
+            and time.monotonic() - cls._loaded_at <= settings.product_search_refresh_seconds
+        )
+
+    @staticmethod
+    def _uses_postgres(db: Session) -> bool:
+        return settings.product_search_backend == "postgres" and db.get_bind().dialect.name == "postgresql"
+
+    @staticmethod
+    def search(
+        db: Session,
+        query: str,
+        limit: Optional[int] = 50,
+        active_only: bool = True,
+        product_type: Optional[str] = None,
+        category: Optional[str] = None
+    ) -> List[int]:
+        """IDs de productos que coinciden con `query`, del más al menos relevante"""
+        if ProductSearchService._uses_postgres(db):
+            return ProductSearchService._search_postgres(db, query, limit, active_only, product_type, category)
+
+        cls = ProductSearchService
+        with cls._lock:
+            expired = time.monotonic() - cls._loaded_at > settings.product_search_refresh_seconds
+            if cls._index is None or expired:
+                cls._rebuild(db)
+            elif cls._dirty:
+                cls._refresh_dirty(db)
+            return cls._index.search(query, limit, active_only, product_type, category)
+
+    @staticmethod
+    def peek_search(
+        query: str,
+        limit: Optional[int] = 50,
+        active_only: bool = True,
+        product_type: Optional[str] = None,
+        category: Optional[str] = None
+    ) -> Optional[List[int]]:
+        """Búsqueda sin tocar la BD ni esperar el lock.
+
+        Devuelve None si el índice en memoria no está al día (o si otro hilo
+        lo está actualizando) o si se usa el backend de PostgreSQL; el
+        llamador entonces usa `search`.
+        """
+        cls = ProductSearchService
+        if settings.product_search_backend == "postgres" or not cls._lock.acquire(blocking=False):
+            return None
+        try:
+            if not cls._is_fresh():
+                return None
+            return cls._index.search(query, limit, active_only, product_type, category)
+        finally:
+            cls._lock.release()
+
+    @staticmethod
+    def _search_postgres(
+        db: Session,
+        query: str,
+        limit: Optional[int],
+        active_only: bool,
+        product_type: Optional[str],
+        category: Optional[str]
+    ) -> List[int]:
+        """Búsqueda con pg_trgm sobre el texto sin tildes"""
+        base = db.query(Product.id)
+        if active_only:
+            base = base.filter(Product.is_active == True)
+        if product_type:
+            base = base.filter(Product.product_type == ProductType(product_type))
+        if category:
+            base = base.filter(Product.category == category)
+
+        # Los códigos son únicos e indexados: coincidencia exacta primero
+        code = query.strip()
+        if code:
+            exact = base.filter(or_(
+                Product.code.in_([code, code.upper()]),
+                Product.barcode == code,
+                Product.sku.in_([code, code.upper()])
+            )).first()
+            if exact is not None:
+                return [exact.id]
+
+        folded = fold(query).strip()
+        terms = _WORD.findall(folded)
+        if not terms:
+            return []
+
+        search_text = literal_column(PG_SEARCH_TEXT)
+        similarity = func.word_similarity(literal(folded), search_text)
+        name_prefix = literal_column(PG_NAME_TEXT).like(f"{_escape_like(terms[0])}%", escape="\\")
+        rows = base.filter(
+            *(search_text.like(f"%{_escape_like(term)}%", escape="\\") for term in terms)
+        ).order_by(name_prefix.desc(), similarity.desc(), Product.name).limit(limit).all()
+
+        if not rows:
+            # Errores de tipeo: similitud de trigramas (operador <% del índice)
+            rows = base.filter(
+                literal(folded).op("<%")(search_text)
+            ).order_by(similarity.desc(), Product.name).limit(limit).all()
+        return [row.id for row in rows]
+
+    @staticmethod
+    def mark_changed(product_ids: Iterable[int]) -> None:
+        """Marcar productos a releer en la próxima búsqueda"""
+        with ProductSearchService._lock:
+            ProductSearchService._dirty.update(int(product_id) for product_id in product_ids)
+
+    @staticmethod
+    def stats() -> Dict[str, object]:
+        """Tamaño del índice y contadores de recarga"""
+        cls = ProductSearchService
+        index = cls._index
+        return {
+            "backend": settings.product_search_backend,
+            "products": len(index.entries) if index else 0,
+            "keys": len(index.postings) if index else 0,
+            "pending_products": len(cls._dirty),
+            "full_rebuilds": cls.full_rebuilds,
+            "incremental_refreshes": cls.incremental_refreshes,
+        }
+
+
+def _on_catalog_changed(bus_event) -> None:
+    product_ids = bus_event.data.get("product_ids")
+    if product_ids:
+        ProductSearchService.mark_changed(product_ids)
+
+
+event_bus.subscribe(CATALOG_CHANGED, _on_catalog_changed)
@@ -14,6 +14,7 @@ from app.models.product import Product
 from app.models.user import User, UserRole
 from app.models.location import Table
 from app.models.inventory import InventoryMovement, MovementType
+from app.services.sales_rollup_service import SalesRollupService
 
 
 class ReportService:
@@ -27,45 +28,28 @@ class ReportService:
         group_by: str = "day",
         user_id: Optional[int] = None
     ) -> Dict[str, Any]:
-        """Reporte de ventas por período"""
+        """Reporte de ventas por período (desde los acumulados diarios)"""
         
-        # Construir query base
-        query = db.query(Sale).filter(
-            and_(
-                Sale.created_at >= datetime.combine(start_date, datetime.min.time()),
-                Sale.created_at <= datetime.combine(end_date, datetime.max.time()),
-                Sale.status == SaleStatus.COMPLETED
-            )
+        totals = SalesRollupService.get_totals(
+            db, start_date, end_date, dimensions=("users",), user_id=user_id
         )
         
-        # Filtrar por usuario si se especifica
-        if user_id:
-            query = query.filter(Sale.user_id == user_id)
-        
         # Agrupar por período
-        if group_by == "day":
-            sales_data = query.with_entities(
-                func.date(Sale.created_at).label('date'),
-                func.count(Sale.id).label('total_sales'),
-                func.sum(Sale.total).label('total_revenue'),
-                func.avg(Sale.total).label('avg_sale')
-            ).group_by(func.date(Sale.created_at)).order_by(asc('date')).all()
-        elif group_by == "hour":
-            sales_data = query.with_entities(
-                func.extract('hour', Sale.created_at).label('hour'),
-                func.count(Sale.id).label('total_sales'),
-                func.sum(Sale.total).label('total_revenue')
-            ).group_by(func.extract('hour', Sale.created_at)).order_by(asc('hour')).all()
-        else:  # month
-            sales_data = query.with_entities(
-                func.date_trunc('month', Sale.created_at).label('month'),
-                func.count(Sale.id).label('total_sales'),
-                func.sum(Sale.total).label('total_revenue')
-            ).group_by(func.date_trunc('month', Sale.created_at)).order_by(asc('month')).all()
+        periods: Dict[Any, List] = {}
+        for (day, hour, _), (sale_count, revenue) in totals.users.items():
+            if group_by == "day":
+                period = day
+            elif group_by == "hour":
+                period = hour
+            else:  # month
+                period = day.replace(day=1)
+            current = periods.setdefault(period, [0, Decimal("0")])
+            current[0] += sale_count
+            current[1] += revenue
         
         # Estadísticas generales
-        total_sales = query.count()
-        total_revenue = query.with_entities(func.sum(Sale.total)).scalar() or 0
+        total_sales = sum(sale_count for sale_count, _ in periods.values())
+        total_revenue = sum((revenue for _, revenue in periods.values()), Decimal("0"))
         avg_sale = total_revenue / total_sales if total_sales > 0 else 0
         
         return {
@@ -81,12 +65,12 @@ class ReportService:
             },
             "data": [
                 {
-                    "period": str(item.date) if group_by == "day" else str(item.hour) if group_by == "hour" else str(item.month),
-                    "sales_count": item.total_sales,
-                    "revenue": float(item.total_revenue),
-                    "avg_sale": float(item.avg_sale) if hasattr(item, 'avg_sale') else 0
+                    "period": str(period),
+                    "sales_count": sale_count,
+                    "revenue": float(revenue),
+                    "avg_sale": float(revenue / sale_count) if sale_count > 0 else 0
                 }
-                for item in sales_data
+                for period, (sale_count, revenue) in sorted(periods.items())
             ]
         }
     
@@ -98,41 +82,36 @@ class ReportService:
         limit: int = 10,
         by_quantity: bool = True
     ) -> List[Dict[str, Any]]:
-        """Reporte de productos más vendidos"""
+        """Reporte de productos más vendidos (desde los acumulados diarios)"""
         
-        # Query base para items vendidos
-        query = db.query(
-            Product.name,
-            Product.category,
-            func.sum(SaleItem.quantity).label('total_quantity'),
-            func.sum(SaleItem.total_price).label('total_revenue'),
-            func.count(SaleItem.id).label('sale_count')
-        ).join(SaleItem).join(Sale).filter(
-            and_(
-                Sale.created_at >= datetime.combine(start_date, datetime.min.time()),
-                Sale.created_at <= datetime.combine(end_date, datetime.max.time()),
-                Sale.status == SaleStatus.COMPLETED
-            )
-        ).group_by(Product.id, Product.name, Product.category)
+        totals = SalesRollupService.get_totals(db, start_date, end_date, dimensions=("products",))
         
-        # Ordenar por cantidad o ingresos
-        if by_quantity:
-            query = query.order_by(desc('total_quantity'))
-        else:
-            query = query.order_by(desc('total_revenue'))
+        # Sumar las horas y días de cada producto
+        by_product: Dict[int, List] = {}
+        for (_, _, product_id), (quantity, revenue, line_count) in totals.products.items():
+            current = by_product.setdefault(product_id, [0, Decimal("0"), 0])
+            current[0] += quantity
+            current[1] += revenue
+            current[2] += line_count
         
-        products = query.limit(limit).all()
+        # Ordenar por cantidad o ingresos
+        sort_index = 0 if by_quantity else 1
+        top = sorted(by_product.items(), key=lambda entry: entry[1][sort_index], reverse=True)[:limit]
+        products = {
+            product.id: product
+            for product in db.query(Product).filter(Product.id.in_([product_id for product_id, _ in top])).all()
+        }
         
         return [
             {
-                "product_name": product.name,
-                "category": product.category,
-                "total_quantity": int(product.total_quantity),
-                "total_revenue": float(product.total_revenue),
-                "sale_count": product.sale_count,
-                "avg_price": float(product.total_revenue / product.total_quantity) if product.total_quantity > 0 else 0
+                "product_name": products[product_id].name if product_id in products else None,
+                "category": products[product_id].category if product_id in products else None,
+                "total_quantity": int(quantity),
+                "total_revenue": float(revenue),
+                "sale_count": line_count,
+                "avg_price": float(revenue / quantity) if quantity > 0 else 0
             }
-            for product in products
+            for product_id, (quantity, revenue, line_count) in top
         ]
     
     @staticmethod
@@ -0,0 +1,283 @@
+"""
+Servicio de acumulados diarios de ventas para reportes
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import and_, delete, event, insert, inspect, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.dates import day_range
+from app.models.sale import Sale, SaleItem, PaymentMethod, SaleStatus
+from app.models.sales_rollup import SalesProductRollup, SalesUserRollup, SalesPaymentRollup
+
+# Solo las ventas completadas cuentan en los reportes
+COUNTED_STATUS = SaleStatus.COMPLETADA.value
+
+# Dimensión -> (modelo, columnas clave, columnas acumuladas)
+ROLLUPS = {
+    "products": (SalesProductRollup, ("day", "hour", "product_id"), ("quantity", "revenue", "line_count")),
+    "users": (SalesUserRollup, ("day", "hour", "user_id"), ("sale_count", "revenue")),
+    "payments": (SalesPaymentRollup, ("day", "payment_type"), ("payment_count", "amount")),
+}
+
+# Claves en session.info: ventas cuyo aporte cambió (id -> +1/-1) y aportes ya calculados
+_PENDING_KEY = "sales_rollup_pending"
+_DELTAS_KEY = "sales_rollup_deltas"
+
+
+def _status_value(status) -> Optional[str]:
+    return getattr(status, "value", status)
+
+
+def _bucket(created_at: datetime) -> Tuple[date, int]:
+    """Día y hora local de una venta"""
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone()
+    return created_at.date(), created_at.hour
+
+
+class SalesTotals:
+    """Acumulados por dimensión: clave -> [valores]. Sirve como delta a aplicar
+    y como resultado de lectura para los reportes."""
+
+    def __init__(self):
+        self.data: Dict[str, Dict[tuple, list]] = {name: {} for name in ROLLUPS}
+
+    def add(self, name: str, key: tuple, values: Iterable, sign: int = 1) -> None:
+        current = self.data[name].get(key)
+        if current is None:
+            self.data[name][key] = [value * sign for value in values]
+        else:
+            for index, value in enumerate(values):
+                current[index] += value * sign
+
+    def merge(self, other: "SalesTotals") -> None:
+        for name, rows in other.data.items():
+            for key, values in rows.items():
+                self.add(name, key, values)
+
+    def __bool__(self) -> bool:
+        return any(self.data.values())
+
+    @property
+    def products(self) -> Dict[tuple, list]:
+        return self.data["products"]
+
+    @property
+    def users(self) -> Dict[tuple, list]:
+        return self.data["users"]
+
+    @property
+    def payments(self) -> Dict[tuple, list]:
+        return self.data["payments"]
+
+
+class SalesRollupService:
+    """Mantiene y lee los acumulados `sales_rollup_*`.
+
+    Cada venta que pasa a completada (o deja de estarlo, o se elimina) suma o
+    resta su aporte en la misma transacción, con `UPDATE ... SET x = x + delta`
+    por fila afectada. Los reportes leen los acumulados para los días
+    anteriores a hoy y calculan hoy desde las ventas, que siguen cambiando.
+    """
+
+    @staticmethod
+    def collect(conn: Connection, sale_condition, sign: int = 1,
+                totals: Optional[SalesTotals] = None) -> SalesTotals:
+        """Aporte de las ventas que cumplen `sale_condition`, multiplicado por `sign`"""
+        totals = totals if totals is not None else SalesTotals()
+        buckets = {}
+        for sale in conn.execute(
+            select(Sale.id, Sale.created_at, Sale.user_id, Sale.total).where(sale_condition)
+        ):
+            day, hour = buckets[sale.id] = _bucket(sale.created_at)
+            totals.add("users", (day, hour, sale.user_id), (1, sale.total or Decimal("0")), sign)
+        if not buckets:
+            return totals
+
+        for item in conn.execute(
+            select(SaleItem.sale_id, SaleItem.product_id, SaleItem.quantity, SaleItem.total)
+            .join(Sale, Sale.id == SaleItem.sale_id).where(sale_condition)
+        ):
+            day, hour = buckets[item.sale_id]
+            totals.add("products", (day, hour, item.product_id),
+                       (item.quantity or 0, item.total or Decimal("0"), 1), sign)
+
+        for payment in conn.execute(
+            select(PaymentMethod.sale_id, PaymentMethod.payment_type, PaymentMethod.amount)
+            .join(Sale, Sale.id == PaymentMethod.sale_id).where(sale_condition)
+        ):
+            day, _ = buckets[payment.sale_id]
+            totals.add("payments", (day, payment.payment_type),
+                       (1, payment.amount or Decimal("0")), sign)
+        return totals
+
+    @staticmethod
+    def apply(conn: Connection, totals: SalesTotals) -> None:
+        """Sumar un delta a las tablas de acumulados"""
+        for name, rows in totals.data.items():
+            model, key_columns, value_columns = ROLLUPS[name]
+            table = model.__table__
+            for key, values in rows.items():
+                where = and_(*(table.c[column] == value for column, value in zip(key_columns, key)))
+                increment = update(table).where(where).values({
+                    column: table.c[column] + value for column, value in zip(value_columns, values)
+                })
+                if conn.execute(increment).rowcount == 0:
+                    try:
+                        with conn.begin_nested():
+                            conn.execute(insert(table).values(
+                                {**dict(zip(key_columns, key)), **dict(zip(value_columns, values))}
+                            ))
+                    except IntegrityError:
+                        # Otra transacción creó la fila al mismo tiempo
+                        conn.execute(increment)
+                if values[0] < 0:
+                    # Filas que quedaron sin ventas por cancelaciones
+                    conn.execute(delete(table).where(where, table.c[value_columns[0]] <= 0))
+
+    @staticmethod
+    def rebuild(db: Session, start_date: date, end_date: date) -> int:
+        """Recalcular los acumulados de un rango de días desde las ventas.
+
+        Procesa y confirma un día a la vez. Devuelve las ventas contadas.
+        """
+        counted = 0
+        day = start_date
+        while day <= end_date:
+            start, end = day_range(day)
+            conn = db.connection()
+            totals = SalesRollupService.collect(conn, and_(
+                Sale.status == COUNTED_STATUS,
+                Sale.created_at >= start,
+                Sale.created_at < end
+            ))
+            for name, (model, key_columns, value_columns) in ROLLUPS.items():
+                table = model.__table__
+                conn.execute(delete(table).where(table.c.day == day))
+                rows = [
+                    {**dict(zip(key_columns, key)), **dict(zip(value_columns, values))}
+                    for key, values in totals.data[name].items()
+                ]
+                if rows:
+                    conn.execute(insert(table), rows)
+            db.commit()
+            counted += sum(values[0] for values in totals.users.values())
+            day += timedelta(days=1)
+        return counted
+
+    @staticmethod
+    def get_totals(
+        db: Session,
+        start_date: date,
+        end_date: date,
+        dimensions: Iterable[str] = tuple(ROLLUPS),
+        user_id: Optional[int] = None
+    ) -> SalesTotals:
+        """Acumulados de `start_date` a `end_date` (ambos incluidos).
+
+        Los días anteriores a hoy salen de las tablas de acumulados; hoy se
+        calcula desde las ventas. `user_id` filtra solo la dimensión "users".
+        """
+        totals = SalesTotals()
+        today = date.today()
+        last_rollup_day = min(end_date, today - timedelta(days=1))
+
+        if start_date <= last_rollup_day:
+            for name in dimensions:
+                model, key_columns, value_columns = ROLLUPS[name]
+                query = db.query(
+                    *(getattr(model, column) for column in key_columns + value_columns)
+                ).filter(model.day >= start_date, model.day <= last_rollup_day)
+                if user_id is not None and name == "users":
+                    query = query.filter(model.user_id == user_id)
+                for row in query:
+                    totals.add(name, tuple(row[:len(key_columns)]), row[len(key_columns):])
+
+        if start_date <= today <= end_date:
+            start, end = day_range(today)
+            live = SalesRollupService.collect(db.connection(), and_(
+                Sale.status == COUNTED_STATUS,
+                Sale.created_at >= start,
+                Sale.created_at < end
+            ))
+            for name in set(ROLLUPS) - set(dimensions):
+                live.data[name].clear()
+            if user_id is not None:
+                live.data["users"] = {key: values for key, values in live.users.items() if key[2] == user_id}
+            totals.merge(live)
+        return totals
+
+
+def _counted(status) -> bool:
+    return _status_value(status) == COUNTED_STATUS
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_deleted_sales(session: Session, flush_context, instances) -> None:
+    """Restar el aporte de ventas completadas que se eliminan, antes de que se
+    borren sus items"""
+    for obj in session.deleted:
+        if not isinstance(obj, Sale):
+            continue
+        history = inspect(obj).attrs.status.history
+        if history.deleted or history.unchanged:
+            committed = (history.deleted or history.unchanged)[0]
+        else:
+            # Expirado (p. ej. tras un commit anterior): leer el valor de la BD
+            committed = obj.status
+        sign = session.info.setdefault(_PENDING_KEY, {}).pop(obj.id, 0) - (1 if _counted(committed) else 0)
+        if sign:
+            deltas = session.info.setdefault(_DELTAS_KEY, SalesTotals())
+            SalesRollupService.collect(session.connection(), Sale.id == obj.id, sign, deltas)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_sale_status(session: Session, flush_context) -> None:
+    """Anotar las ventas que empiezan o dejan de contar en los reportes"""
+    changes: Dict[int, int] = {}
+    for obj in session.new:
+        if isinstance(obj, Sale) and _counted(obj.status):
+            changes[obj.id] = 1
+    for obj in session.dirty:
+        if isinstance(obj, Sale):
+            history = inspect(obj).attrs.status.history
+            if history.added:
+                change = _counted(history.added[0]) - _counted((history.deleted or [None])[0])
+                if change:
+                    changes[obj.id] = change
+    if changes:
+        pending = session.info.setdefault(_PENDING_KEY, {})
+        for sale_id, change in changes.items():
+            pending[sale_id] = pending.get(sale_id, 0) + change
+
+
+@event.listens_for(Session, "before_commit")
+def _apply_pending(session: Session) -> None:
+    """Aplicar los cambios a los acumulados en la misma transacción de la venta"""
+    # El flush de commit corre después de este evento: adelantarlo para anotar
+    # los últimos cambios con sus items (sales.create_sale agrega los items
+    # después de un primer flush de la venta)
+    session.flush()
+    if not session.info.get(_PENDING_KEY) and not session.info.get(_DELTAS_KEY):
+        return
+    pending: Dict[int, int] = session.info.pop(_PENDING_KEY, {})
+    deltas: SalesTotals = session.info.pop(_DELTAS_KEY, None) or SalesTotals()
+    conn = session.connection()
+    for sign in (1, -1):
+        sale_ids: List[int] = [sale_id for sale_id, change in pending.items() if change == sign]
+        if sale_ids:
+            SalesRollupService.collect(conn, Sale.id.in_(sale_ids), sign, deltas)
+    if deltas:
+        SalesRollupService.apply(conn, deltas)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending(session: Session, transaction) -> None:
+    """Descartar lo anotado si la transacción terminó sin confirmar"""
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+        session.info.pop(_DELTAS_KEY, None)
@@ -1,25 +1,145 @@
 """
 Servicio para manejo de configuraciones del sistema
 """
-from typing import Optional, Dict, Any
+import threading
+import time
+from types import MappingProxyType
+from typing import Optional, Dict, Any, Mapping
+from sqlalchemy import Integer, Text, cast
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.models.settings import SystemSettings, DEFAULT_SETTINGS
+from app.config import settings as app_settings
+from app.models.settings import SystemSettings, DEFAULT_SETTINGS, SETTINGS_VERSION_KEY
+
+
+class SettingsSnapshot:
+    """Copia inmutable de la tabla system_settings en un momento dado"""
+    
+    __slots__ = ("values", "version", "checked_at")
+    
+    def __init__(self, values: Mapping[str, str], version: int):
+        self.values = MappingProxyType(dict(values))
+        self.version = version
+        self.checked_at = time.monotonic()
 
 
 class SettingsService:
     """Servicio para manejo de configuraciones"""
     
+    # Snapshot compartido por el worker; se reemplaza completo, nunca se muta
+    _snapshot: Optional[SettingsSnapshot] = None
+    _reload_lock = threading.Lock()
+    
     @staticmethod
-    def get_setting(db: Session, key: str, default: str = None) -> str:
-        """Obtener una configuración específica"""
-        setting = db.query(SystemSettings).filter(
-            SystemSettings.setting_key == key,
+    def _read_version(db: Session) -> int:
+        """Leer el contador de versión (una fila por índice único)"""
+        value = db.query(SystemSettings.setting_value).filter(
+            SystemSettings.setting_key == SETTINGS_VERSION_KEY
+        ).scalar()
+        try:
+            return int(value) if value is not None else 0
+        except ValueError:
+            return 0
+    
+    @staticmethod
+    def _load_snapshot(db: Session) -> SettingsSnapshot:
+        """Cargar toda la tabla en una sola consulta y publicar el snapshot"""
+        rows = db.query(SystemSettings.setting_key, SystemSettings.setting_value).filter(
             SystemSettings.is_active == True
-        ).first()
+        ).all()
         
-        if setting:
-            return setting.setting_value
-        return default
+        values = {}
+        version = 0
+        for key, value in rows:
+            if key == SETTINGS_VERSION_KEY:
+                try:
+                    version = int(value)
+                except (TypeError, ValueError):
+                    version = 0
+            else:
+                values[key] = value
+        
+        snapshot = SettingsSnapshot(values, version)
+        SettingsService._snapshot = snapshot
+        return snapshot
+    
+    @staticmethod
+    def get_snapshot(db: Session) -> SettingsSnapshot:
+        """Obtener el snapshot vigente, verificando la versión como máximo cada N segundos"""
+        snapshot = SettingsService._snapshot
+        if snapshot is None:
+            with SettingsService._reload_lock:
+                snapshot = SettingsService._snapshot
+                if snapshot is None:
+                    snapshot = SettingsService._load_snapshot(db)
+            return snapshot
+        
+        if time.monotonic() - snapshot.checked_at < app_settings.business_settings_check_seconds:
+            return snapshot
+        
+        # Otro worker pudo haber escrito: comparar solo el contador de versión
+        if SettingsService._read_version(db) == snapshot.version:
+            snapshot.checked_at = time.monotonic()
+            return snapshot
+        
+        with SettingsService._reload_lock:
+            return SettingsService._load_snapshot(db)
+    
+    @staticmethod
+    def peek_snapshot() -> Optional[SettingsSnapshot]:
+        """Snapshot vigente sin tocar la BD, o None si toca verificar la versión"""
+        snapshot = SettingsService._snapshot
+        if snapshot is None:
+            return None
+        if time.monotonic() - snapshot.checked_at < app_settings.business_settings_check_seconds:
+            return snapshot
+        return None
+    
+    @staticmethod
+    def get_settings_version(db: Session) -> int:
+        """Versión del snapshot vigente en este worker"""
+        return SettingsService.get_snapshot(db).version
+    
+    @staticmethod
+    def invalidate_cache() -> None:
+        """Forzar la recarga en la próxima lectura"""
+        SettingsService._snapshot = None
+    
+    @staticmethod
+    def bump_version(db: Session) -> None:
+        """Incrementar el contador de versión dentro de la transacción actual.
+        
+        Quien escriba system_settings sin pasar por `set_setting` debe llamarlo
+        antes del commit; si no, los workers siguen con el snapshot anterior.
+        """
+        def increment() -> int:
+            return db.query(SystemSettings).filter(
+                SystemSettings.setting_key == SETTINGS_VERSION_KEY
+            ).update(
+                {SystemSettings.setting_value: cast(cast(SystemSettings.setting_value, Integer) + 1, Text)},
+                synchronize_session=False
+            )
+        
+        if increment():
+            return
+        
+        # Primera versión: la fila se crea en un savepoint para no perder la transacción
+        db.flush()
+        try:
+            with db.begin_nested():
+                db.add(SystemSettings(
+                    setting_key=SETTINGS_VERSION_KEY,
+                    setting_value="1",
+                    description="Contador de versión de configuraciones (uso interno)"
+                ))
+        except IntegrityError:
+            # Otro worker creó la fila al mismo tiempo
+            increment()
+    
+    @staticmethod
+    def get_setting(db: Session, key: str, default: str = None) -> str:
+        """Obtener una configuración específica"""
+        return SettingsService.get_snapshot(db).values.get(key, default)
     
     @staticmethod
     def set_setting(db: Session, key: str, value: str, description: str = None) -> SystemSettings:
@@ -40,40 +160,43 @@ class SettingsService:
             )
             db.add(setting)
         
+        SettingsService.bump_version(db)
         db.commit()
         db.refresh(setting)
+        
+        with SettingsService._reload_lock:
+            SettingsService._load_snapshot(db)
         return setting
     
     @staticmethod
     def get_all_settings(db: Session) -> Dict[str, str]:
         """Obtener todas las configuraciones como diccionario"""
-        settings = db.query(SystemSettings).filter(
-            SystemSettings.is_active == True
-        ).all()
-        
-        result = {}
-        for setting in settings:
-            result[setting.setting_key] = setting.setting_value
-        
-        return result
+        return dict(SettingsService.get_snapshot(db).values)
     
     @staticmethod
     def initialize_default_settings(db: Session) -> None:
         """Inicializar configuraciones por defecto"""
-        for key, value in DEFAULT_SETTINGS.items():
-            existing = db.query(SystemSettings).filter(
-                SystemSettings.setting_key == key
-            ).first()
-            
-            if not existing:
-                setting = SystemSettings(
-                    setting_key=key,
-                    setting_value=value,
-                    description=f"Configuración por defecto: {key}"
-                )
-                db.add(setting)
+        existing_keys = {
+            key for (key,) in db.query(SystemSettings.setting_key).filter(
+                SystemSettings.setting_key.in_(list(DEFAULT_SETTINGS.keys()))
+            ).all()
+        }
         
+        missing = [key for key in DEFAULT_SETTINGS if key not in existing_keys]
+        for key in missing:
+            setting = SystemSettings(
+                setting_key=key,
+                setting_value=DEFAULT_SETTINGS[key],
+                description=f"Configuración por defecto: {key}"
+            )
+            db.add(setting)
+        
+        if missing:
+            SettingsService.bump_version(db)
         db.commit()
+        
+        with SettingsService._reload_lock:
+            SettingsService._load_snapshot(db)
     
     @staticmethod
     def get_cash_register_password(db: Session) -> str:
@@ -97,19 +220,20 @@ class SettingsService:
         return password == stored_password
     
     @staticmethod
-    def get_business_info(db: Session) -> Dict[str, str]:
-        """Obtener información del negocio"""
+    def get_business_info(db: Session, snapshot: Optional[SettingsSnapshot] = None) -> Dict[str, str]:
+        """Obtener información del negocio (de `snapshot` si ya se tiene uno)"""
+        values = (snapshot or SettingsService.get_snapshot(db)).values
         return {
-            "name": SettingsService.get_setting(db, "business_name", "Mi Restaurante"),
-            "address": SettingsService.get_setting(db, "business_address", ""),
-            "phone": SettingsService.get_setting(db, "business_phone", ""),
-            "email": SettingsService.get_setting(db, "business_email", ""),
-            "currency": SettingsService.get_setting(db, "currency", "COP"),
-            "tax_rate": SettingsService.get_setting(db, "tax_rate", "19.0"),
+            "name": values.get("business_name", "Mi Restaurante"),
+            "address": values.get("business_address", ""),
+            "phone": values.get("business_phone", ""),
+            "email": values.get("business_email", ""),
+            "currency": values.get("currency", "COP"),
+            "tax_rate": values.get("tax_rate", "19.0"),
         }
     
     @staticmethod
-    def require_cash_register(db: Session) -> bool:
+    def require_cash_register(db: Session, snapshot: Optional[SettingsSnapshot] = None) -> bool:
         """Verificar si se requiere caja abierta para ventas"""
-        value = SettingsService.get_setting(db, "require_cash_register", "true")
+        value = (snapshot or SettingsService.get_snapshot(db)).values.get("require_cash_register", "true")
         return value.lower() == "true"
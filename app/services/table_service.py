@@ -1,18 +1,113 @@
 """
 Servicio para el manejo de mesas del restaurante
 """
+import threading
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy import and_, func, event
 
+from app.cache import TTLCache
+from app.config import settings
 from app.models.location import Table, TableStatus
-from app.models.order import Order, OrderStatus
+from app.models.order import (
+    Order, OrderStatus, ORDER_EVENT_CREATED, ORDER_EVENT_STARTED, ORDER_EVENT_COMPLETED,
+    ORDER_EVENT_STATUS_CHANGED, ORDER_EVENT_DELETED
+)
+from app.models.user import User
+from app.services.event_bus import event_bus, ORDER_TOPIC, TABLE_CHANGED
+
+# Pedidos que ocupan una mesa en el plano del salón
+FLOOR_PLAN_ORDER_STATUSES = [OrderStatus.PENDING, OrderStatus.PREPARING, OrderStatus.READY, OrderStatus.SERVED]
+FLOOR_PLAN_KEY = "floor_plan"
+
+floor_plan_cache = TTLCache(max_size=1, ttl_seconds=settings.floor_plan_cache_ttl_seconds, name="floor_plan")
+_floor_plan_lock = threading.Lock()
+# Aumenta con cada invalidación: un plano leído antes no se guarda
+_floor_plan_generation = 0
+
+
+def floor_plan_generation() -> int:
+    """Generación actual del plano; tomarla antes de leerlo de la BD"""
+    return _floor_plan_generation
+
+
+def store_floor_plan(generation: int, floor_plan: List[Dict[str, Any]]) -> None:
+    """Guardar el plano salvo que haya cambiado mientras se leía"""
+    if generation == _floor_plan_generation:
+        floor_plan_cache.set(FLOOR_PLAN_KEY, floor_plan)
 
 
 class TableService:
     """Servicio para manejo de mesas"""
     
+    @staticmethod
+    def _load_floor_plan(db: Session) -> List[Dict[str, Any]]:
+        """Construir el plano del salón con una sola consulta.
+
+        Un ROW_NUMBER() por mesa elige su pedido activo más antiguo; funciona
+        igual en PostgreSQL y SQLite (a diferencia de DISTINCT ON).
+        """
+        active_orders = db.query(
+            Order.table_id.label("table_id"),
+            Order.order_number.label("order_number"),
+            Order.created_at.label("created_at"),
+            Order.waiter_id.label("waiter_id"),
+            func.row_number().over(
+                partition_by=Order.table_id,
+                order_by=(Order.created_at.asc(), Order.id.asc())
+            ).label("position")
+        ).filter(
+            Order.table_id.isnot(None),
+            Order.status.in_(FLOOR_PLAN_ORDER_STATUSES)
+        ).subquery()
+        
+        rows = db.query(
+            Table.id,
+            Table.table_number,
+            Table.status,
+            active_orders.c.order_number,
+            active_orders.c.created_at,
+            User.full_name
+        ).outerjoin(
+            active_orders,
+            and_(active_orders.c.table_id == Table.id, active_orders.c.position == 1)
+        ).outerjoin(
+            User, User.id == active_orders.c.waiter_id
+        ).order_by(Table.id).all()
+        
+        return [
+            {
+                "id": row.id,
+                "table_number": row.table_number,
+                "status": getattr(row.status, "value", row.status),
+                "current_order": row.order_number,
+                "waiter_name": row.full_name,
+                "created_at": row.created_at.isoformat() if row.created_at else None
+            }
+            for row in rows
+        ]
+    
+    @staticmethod
+    def get_floor_plan(db: Session) -> List[Dict[str, Any]]:
+        """Plano del salón (mesas con su pedido activo) desde caché.
+
+        Se invalida con los eventos de pedidos y mesas del bus; el TTL acota
+        lo que puede durar un dato obsoleto si se pierde un aviso.
+        """
+        floor_plan = floor_plan_cache.get(FLOOR_PLAN_KEY)
+        if floor_plan is not None:
+            return floor_plan
+        
+        # Una sola consulta aunque varias tablets refresquen a la vez
+        with _floor_plan_lock:
+            floor_plan = floor_plan_cache.get(FLOOR_PLAN_KEY)
+            if floor_plan is None:
+                generation = floor_plan_generation()
+                floor_plan = TableService._load_floor_plan(db)
+                store_floor_plan(generation, floor_plan)
+        return floor_plan
+    
     @staticmethod
     def get_all_tables(db: Session) -> List[Table]:
         """Obtener todas las mesas activas"""
@@ -173,3 +268,29 @@ class TableService:
                 created_tables.append(table)
         
         return created_tables
+
+
+def _invalidate_floor_plan(bus_event) -> None:
+    global _floor_plan_generation
+    _floor_plan_generation += 1
+    floor_plan_cache.invalidate(FLOOR_PLAN_KEY)
+
+
+# Cambios que alteran el plano: estado de pedidos y de mesas (no notas ni items)
+event_bus.subscribe(
+    [f"{ORDER_TOPIC}{event_type}" for event_type in (
+        ORDER_EVENT_CREATED, ORDER_EVENT_STARTED, ORDER_EVENT_COMPLETED,
+        ORDER_EVENT_STATUS_CHANGED, ORDER_EVENT_DELETED
+    )] + [TABLE_CHANGED],
+    _invalidate_floor_plan
+)
+
+
+@event.listens_for(Table, "after_insert")
+@event.listens_for(Table, "after_update")
+@event.listens_for(Table, "after_delete")
+def _publish_table_changed(mapper, connection, target: Table) -> None:
+    """Publicar cambios de mesas al confirmar la transacción"""
+    session = object_session(target)
+    if session is not None:
+        event_bus.publish_after_commit(session, TABLE_CHANGED, {"table_id": target.id})
@@ -0,0 +1,19 @@
+"""
+Utilidades para respuestas Server-Sent Events
+"""
+import json
+from typing import Any, Optional
+from fastapi.encoders import jsonable_encoder
+
+# Cabeceras para que proxies (nginx) no almacenen ni retengan el stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def format_sse(data: Any, event_name: str, event_id: Optional[int] = None) -> str:
+    """Formatear un mensaje Server-Sent Events"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_name}")
+    lines.append(f"data: {json.dumps(jsonable_encoder(data))}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,39 @@
+"""
+Medición de tiempos por etapa y exposición vía cabecera Server-Timing
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class StageTimer:
+    """Acumula la duración de cada etapa de una petición.
+
+    Las etapas se reportan en la cabecera estándar `Server-Timing`, que los
+    navegadores muestran en la pestaña de red y que los scripts de benchmark
+    pueden leer para calcular percentiles por etapa.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Medir el bloque `with` y sumarlo a la etapa `name` (en ms)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def total_ms(self) -> float:
+        """Tiempo transcurrido desde la creación del medidor"""
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def header_value(self) -> str:
+        """Valor para la cabecera Server-Timing, incluyendo el total"""
+        metrics = [f"{name};dur={duration:.2f}" for name, duration in self.stages.items()]
+        metrics.append(f"total;dur={self.total_ms():.2f}")
+        return ", ".join(metrics)
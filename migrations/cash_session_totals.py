@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Migración: agrega los totales acumulados a cash_sessions y los calcula desde cash_movements
+"""
+import sys
+import os
+
+# Agregar el directorio raíz del proyecto al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from app.database import engine, SessionLocal
+from app.services.cash_service import CashService
+
+NEW_COLUMNS = {
+    "sales_total": "NUMERIC(12, 2) NOT NULL DEFAULT 0",
+    "expenses_total": "NUMERIC(12, 2) NOT NULL DEFAULT 0",
+    "refunds_total": "NUMERIC(12, 2) NOT NULL DEFAULT 0",
+    "withdrawals_total": "NUMERIC(12, 2) NOT NULL DEFAULT 0",
+    "deposits_total": "NUMERIC(12, 2) NOT NULL DEFAULT 0",
+    "movements_count": "INTEGER NOT NULL DEFAULT 0",
+}
+
+
+def upgrade():
+    """Agregar columnas faltantes y reconstruir los totales"""
+    print("🔧 Actualizando tabla cash_sessions...")
+    
+    existing = {column["name"] for column in inspect(engine).get_columns("cash_sessions")}
+    with engine.begin() as conn:
+        for name, definition in NEW_COLUMNS.items():
+            if name not in existing:
+                print(f"➕ Agregando columna '{name}'...")
+                conn.execute(text(f"ALTER TABLE cash_sessions ADD COLUMN {name} {definition}"))
+    
+    print("🧮 Calculando totales desde cash_movements...")
+    db = SessionLocal()
+    try:
+        drifts = CashService.reconcile_session_totals(db, fix=True)
+        print(f"✅ Sesiones actualizadas: {len(drifts)}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    upgrade()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Migración: crea la tabla number_sequences e inicializa los contadores del día
+con los números ya emitidos, para no repetirlos al cambiar de esquema
+"""
+import sys
+import os
+from datetime import date
+
+# Agregar el directorio raíz del proyecto al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine, SessionLocal
+from app.models.numbering import NumberSequence
+from app.models.order import Order
+from app.models.sale import Sale
+from app.models.cash_register import CashRegister, CashSession
+from app.services.numbering_service import NumberingService, SALE_SCOPE, ORDER_SCOPE
+
+
+def max_suffix(db, column, prefix: str) -> int:
+    """Mayor sufijo numérico entre los números que empiezan con `prefix`"""
+    values = db.query(column).filter(column.like(f"{prefix}%")).all()
+    suffixes = [int(value[len(prefix):]) for (value,) in values if value[len(prefix):].isdigit()]
+    return max(suffixes, default=0)
+
+
+def upgrade():
+    """Crear tabla y sembrar contadores de hoy"""
+    print("🔧 Creando tabla number_sequences...")
+    NumberSequence.__table__.create(bind=engine, checkfirst=True)
+    
+    today = date.today()
+    stamp = today.strftime('%Y%m%d')
+    
+    db = SessionLocal()
+    try:
+        counters = {
+            SALE_SCOPE: max_suffix(db, Sale.sale_number, f"V{stamp}-"),
+            ORDER_SCOPE: max_suffix(db, Order.order_number, f"P{stamp}-"),
+        }
+        for (register_id,) in db.query(CashRegister.id).all():
+            scope = NumberingService.cash_session_scope(register_id)
+            counters[scope] = max_suffix(db, CashSession.session_number, f"S{stamp}-{register_id:02d}-")
+        
+        for scope, last_value in counters.items():
+            sequence = db.query(NumberSequence).filter(
+                NumberSequence.scope == scope,
+                NumberSequence.day == today
+            ).first()
+            if sequence is None:
+                db.add(NumberSequence(scope=scope, day=today, last_value=last_value))
+            elif sequence.last_value < last_value:
+                sequence.last_value = last_value
+            print(f"   - {scope}: {last_value}")
+        
+        db.commit()
+        print("✅ Contadores inicializados")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    upgrade()
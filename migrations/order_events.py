@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Migración: crea la tabla order_events (stream de cocina) y la columna orders.kitchen_notes
+"""
+import sys
+import os
+
+# Agregar el directorio raíz del proyecto al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from app.database import engine
+from app.models.order import OrderEvent
+
+
+def upgrade():
+    """Crear tabla de eventos y columna de notas de cocina"""
+    print("🔧 Creando tabla order_events...")
+    OrderEvent.__table__.create(bind=engine, checkfirst=True)
+    
+    columns = {column["name"] for column in inspect(engine).get_columns("orders")}
+    if "kitchen_notes" not in columns:
+        print("➕ Agregando columna 'kitchen_notes' a orders...")
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE orders ADD COLUMN kitchen_notes TEXT"))
+    
+    print("✅ Migración completada")
+
+
+if __name__ == "__main__":
+    upgrade()
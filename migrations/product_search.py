@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Migración: índice de trigramas sin tildes para la búsqueda de productos en
+PostgreSQL (product_search_backend = "postgres")
+"""
+import sys
+import os
+
+# Agregar el directorio raíz del proyecto al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine
+from app.services.product_search_service import PG_SEARCH_TEXT, PG_NAME_TEXT
+
+
+def upgrade():
+    """Crear las extensiones pg_trgm y unaccent, la función pos_unaccent y los índices GIN"""
+    if engine.dialect.name != "postgresql":
+        print("ℹ️  La base no es PostgreSQL: la búsqueda usa el índice en memoria, no hay nada que migrar")
+        return
+
+    with engine.begin() as conn:
+        print("➕ Habilitando extensiones pg_trgm y unaccent...")
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+
+        # unaccent() no es IMMUTABLE y no se puede usar en un índice; con el
+        # diccionario fijo el resultado solo depende del texto
+        print("➕ Creando función pos_unaccent...")
+        conn.execute(text(
+            "CREATE OR REPLACE FUNCTION pos_unaccent(text) RETURNS text "
+            "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS "
+            "$$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+        ))
+
+    # CONCURRENTLY no bloquea escrituras, pero no puede correr dentro de una transacción
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for name, expression in (
+            ("idx_product_search_trgm", PG_SEARCH_TEXT),
+            ("idx_product_name_search_trgm", PG_NAME_TEXT),
+        ):
+            print(f"➕ Creando índice {name}...")
+            conn.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                f"ON products USING gin (({expression}) gin_trgm_ops)"
+            ))
+        conn.execute(text("ANALYZE products"))
+
+    print("✅ Migración completada")
+    print("   Configure PRODUCT_SEARCH_BACKEND=postgres para usar el índice")
+
+
+if __name__ == "__main__":
+    upgrade()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Migración: índices por fecha y compuestos para los filtros frecuentes de
+pedidos, ventas, caja, inventario y productos
+"""
+import sys
+import os
+
+# Agregar el directorio raíz del proyecto al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from app.database import engine
+from app.models.order import Order
+from app.models.sale import Sale
+from app.models.cash_register import CashSession, CashMovement
+from app.models.inventory import InventoryMovement
+from app.models.product import Product
+
+MODELS = [Order, Sale, CashSession, CashMovement, InventoryMovement, Product]
+
+
+def upgrade():
+    """Crear la columna sales.created_at y los índices declarados en los modelos que aún no existan"""
+    is_postgres = engine.dialect.name == "postgresql"
+    inspector = inspect(engine)
+    
+    # Las consultas de ventas filtran por sales.created_at, que faltaba en el modelo.
+    # Se agrega sin DEFAULT: en PostgreSQL un DEFAULT now() le pondría la fecha de
+    # la migración a todas las ventas existentes
+    sale_columns = {column["name"] for column in inspector.get_columns("sales")}
+    if "created_at" not in sale_columns:
+        print("➕ Agregando columna 'created_at' a sales...")
+        column_type = "TIMESTAMP WITH TIME ZONE" if is_postgres else "DATETIME"
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE sales ADD COLUMN created_at {column_type}"))
+        inspector = inspect(engine)
+    
+    with engine.begin() as conn:
+        # Fecha de las ventas existentes: su primer item o, si no tiene, su primer pago
+        pending = conn.execute(text(
+            "UPDATE sales SET created_at = COALESCE("
+            "(SELECT MIN(sale_items.created_at) FROM sale_items WHERE sale_items.sale_id = sales.id), "
+            "(SELECT MIN(payment_methods.created_at) FROM payment_methods WHERE payment_methods.sale_id = sales.id)"
+            ") WHERE created_at IS NULL"
+        )).rowcount
+        missing = conn.execute(text("SELECT COUNT(*) FROM sales WHERE created_at IS NULL")).scalar()
+        if pending > missing:
+            print(f"🔄 Fecha de {pending - missing} ventas existentes tomada de sus items o pagos")
+        if missing:
+            print(f"⚠️  {missing} ventas sin items ni pagos quedan sin fecha (no aparecen en los reportes)")
+        
+        # Las ventas nuevas sí llevan la fecha del momento
+        if is_postgres:
+            conn.execute(text("ALTER TABLE sales ALTER COLUMN created_at SET DEFAULT now()"))
+        else:
+            # SQLite no permite cambiar el DEFAULT de una columna existente
+            conn.execute(text(
+                "CREATE TRIGGER IF NOT EXISTS sales_created_at_default AFTER INSERT ON sales "
+                "WHEN NEW.created_at IS NULL BEGIN "
+                "UPDATE sales SET created_at = CURRENT_TIMESTAMP WHERE id = NEW.id; END"
+            ))
+    
+    # CONCURRENTLY no bloquea escrituras en PostgreSQL, pero no puede correr
+    # dentro de una transacción
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for model in MODELS:
+            table = model.__table__
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                # Solo los índices de __table_args__; los de columna ya los creó create_all
+                if not index.name.startswith("idx_") or index.name in existing:
+                    continue
+                columns = ", ".join(column.name for column in index.columns)
+                concurrently = "CONCURRENTLY " if is_postgres else ""
+                print(f"➕ Creando índice {index.name} ({table.name}: {columns})...")
+                conn.execute(text(
+                    f"CREATE INDEX {concurrently}IF NOT EXISTS {index.name} ON {table.name} ({columns})"
+                ))
+    
+            # Actualizar estadísticas para que el planificador use los índices
+            conn.execute(text(f"ANALYZE {table.name}"))
+    
+    print("✅ Migración completada")
+
+
+if __name__ == "__main__":
+    upgrade()
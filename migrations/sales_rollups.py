@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Migración: crea las tablas de acumulados diarios de ventas (sales_rollup_*) y
+las llena con el histórico, hoy incluido
+
+Correrla con la aplicación detenida: desde que arranca con el nuevo código,
+cada venta completada o cancelada actualiza los acumulados.
+"""
+import sys
+import os
+from datetime import date
+
+# Agregar el directorio raíz del proyecto al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+from app.database import engine, SessionLocal
+from app.models.sale import Sale
+from app.models.sales_rollup import SalesProductRollup, SalesUserRollup, SalesPaymentRollup
+from app.services.sales_rollup_service import SalesRollupService
+
+
+def upgrade():
+    """Crear tablas y recalcular todo el histórico"""
+    print("🔧 Creando tablas de acumulados de ventas...")
+    for model in (SalesProductRollup, SalesUserRollup, SalesPaymentRollup):
+        model.__table__.create(bind=engine, checkfirst=True)
+    
+    db = SessionLocal()
+    try:
+        first_sale = db.query(func.min(Sale.created_at)).scalar()
+        if first_sale is None:
+            print("✅ Tablas creadas (no hay ventas que acumular)")
+            return
+        counted = SalesRollupService.rebuild(db, first_sale.date(), date.today())
+        print(f"✅ Acumulados calculados desde {first_sale.date()}: {counted} ventas completadas")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    upgrade()
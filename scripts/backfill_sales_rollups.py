@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Script para recalcular los acumulados diarios de ventas (sales_rollup_*) desde
+las ventas registradas
+
+Recalcula cada día por completo, así que se puede repetir sin duplicar. Los
+acumulados se mantienen solos al completar o cancelar ventas; este script es
+para cargar el histórico o corregir un rango. Hoy sigue recibiendo ventas:
+recalcularlo con la aplicación en marcha puede perder las que entren durante
+el recálculo.
+"""
+import argparse
+import sys
+import os
+from datetime import date, timedelta
+
+# Agregar el directorio raíz del proyecto al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+from app.database import engine, SessionLocal
+from app.models.sale import Sale
+from app.models.sales_rollup import SalesProductRollup, SalesUserRollup, SalesPaymentRollup
+from app.services.sales_rollup_service import SalesRollupService
+
+
+def backfill(start_date: date = None, end_date: date = None) -> int:
+    """Recalcular los acumulados de `start_date` a `end_date` (por defecto, todo el histórico hasta ayer)"""
+    print("=" * 60)
+    print("📊 RECÁLCULO DE ACUMULADOS DE VENTAS")
+    print("=" * 60)
+    
+    for model in (SalesProductRollup, SalesUserRollup, SalesPaymentRollup):
+        model.__table__.create(bind=engine, checkfirst=True)
+    
+    db = SessionLocal()
+    try:
+        if start_date is None:
+            first_sale = db.query(func.min(Sale.created_at)).scalar()
+            if first_sale is None:
+                print("ℹ️ No hay ventas registradas")
+                return 0
+            start_date = first_sale.date()
+        end_date = end_date or date.today() - timedelta(days=1)
+        
+        if start_date > end_date:
+            print("ℹ️ No hay días para recalcular")
+            return 0
+        
+        print(f"📅 Días: {start_date} a {end_date}")
+        counted = SalesRollupService.rebuild(db, start_date, end_date)
+        print(f"✅ Acumulados recalculados: {(end_date - start_date).days + 1} días, {counted} ventas completadas")
+        return 0
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcular acumulados diarios de ventas")
+    parser.add_argument("--start", type=date.fromisoformat, default=None,
+                        help="Primer día (YYYY-MM-DD); por defecto el de la primera venta")
+    parser.add_argument("--end", type=date.fromisoformat, default=None,
+                        help="Último día (YYYY-MM-DD); por defecto ayer")
+    args = parser.parse_args()
+    sys.exit(backfill(args.start, args.end))
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Benchmark del middleware de autenticación: la pila anterior de dos
+BaseHTTPMiddleware (AuthMiddleware + SessionTimeoutMiddleware) contra el
+AuthMiddleware ASGI puro
+
+Las peticiones se envían directo a la aplicación ASGI (sin red ni servidor)
+sobre un endpoint trivial, de modo que la diferencia medida es el costo del
+middleware. Se reporta peticiones por segundo para un estático, una página HTML
+con cookie válida y una ruta de API.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Request, status
+from fastapi.responses import RedirectResponse
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.responses import PlainTextResponse, Response
+
+from app.auth.security import create_access_token, verify_token
+from app.config import settings
+from app.middleware import AuthMiddleware
+
+
+class LegacyAuthMiddleware(BaseHTTPMiddleware):
+    """Copia del AuthMiddleware anterior (lista de prefijos recorrida con startswith)"""
+
+    def __init__(self, app):
+        super().__init__(app)
+        # Sin "/" en la lista: como prefijo excluía todas las rutas y el
+        # middleware no verificaba nada
+        self.exclude_paths = [
+            "/login", "/api/v1/auth/login", "/api/v1/auth/login-json",
+            "/api/v1/settings/", "/api/v1/settings/business-info",
+            "/api/v1/settings/cash-register-config", "/api/v1/products/",
+            "/api/v1/products/categories", "/api/v1/products/subcategories",
+            "/api/v1/caja-ventas/estado", "/api/v1/caja-ventas/movimientos",
+            "/static", "/uploads", "/health", "/docs", "/redoc", "/openapi.json"
+        ]
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        if any(request.url.path.startswith(path) for path in self.exclude_paths):
+            return await call_next(request)
+        if request.url.path.startswith("/api/"):
+            return await call_next(request)
+        token = self._extract_token(request)
+        if not token or not verify_token(token):
+            return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
+        return await call_next(request)
+
+    def _extract_token(self, request: Request) -> Optional[str]:
+        token = request.cookies.get("auth_token")
+        if token:
+            return token
+        auth_header = request.headers.get("authorization")
+        if auth_header and auth_header.startswith("Bearer "):
+            return auth_header.split(" ")[1]
+        return None
+
+
+class LegacySessionTimeoutMiddleware(BaseHTTPMiddleware):
+    """Copia del SessionTimeoutMiddleware anterior (segunda decodificación del token)"""
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        if not request.url.path.startswith("/api/"):
+            token = request.cookies.get("auth_token")
+            if token and self._is_token_expired_by_inactivity(token):
+                response = RedirectResponse(url="/login?reason=timeout", status_code=status.HTTP_302_FOUND)
+                response.delete_cookie("auth_token")
+                return response
+        return await call_next(request)
+
+    def _is_token_expired_by_inactivity(self, token: str) -> bool:
+        try:
+            from jose import jwt
+            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+            exp_timestamp = payload.get("exp")
+            return not exp_timestamp or time.time() > exp_timestamp
+        except Exception:
+            return True
+
+
+async def endpoint(scope, receive, send):
+    """Aplicación final trivial: el tiempo medido es el del middleware"""
+    await PlainTextResponse("ok")(scope, receive, send)
+
+
+def build_scope(path: str, cookie: Optional[str]) -> dict:
+    headers = [(b"host", b"localhost")]
+    if cookie:
+        headers.append((b"cookie", f"auth_token={cookie}".encode()))
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 8000),
+    }
+
+
+async def run(app, path: str, cookie: Optional[str], requests: int) -> tuple:
+    """Enviar `requests` peticiones secuenciales; devuelve (req/s, último status)"""
+    last_status = None
+
+    async def request_once():
+        # Como un servidor real: primero el cuerpo de la petición y, una vez
+        # enviada la respuesta completa, la desconexión del cliente
+        nonlocal last_status
+        finished = asyncio.Event()
+        body_sent = False
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal last_status
+            if message["type"] == "http.response.start":
+                last_status = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished.set()
+
+        await app(build_scope(path, cookie), receive, send)
+
+    # Calentamiento
+    for _ in range(min(200, requests)):
+        await request_once()
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await request_once()
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, last_status
+
+
+async def main_async(requests: int):
+    token = create_access_token(data={"sub": "admin"})
+    legacy = LegacyAuthMiddleware(LegacySessionTimeoutMiddleware(endpoint))
+    current = AuthMiddleware(endpoint)
+
+    cases = [
+        ("Estático /static/css/app.css", "/static/css/app.css", token),
+        ("Página HTML con cookie válida", "/dashboard", token),
+        ("API /api/v1/orders/", "/api/v1/orders/", token),
+    ]
+
+    for label, path, cookie in cases:
+        legacy_rps, legacy_status = await run(legacy, path, cookie, requests)
+        current_rps, current_status = await run(current, path, cookie, requests)
+        print(f"📊 {label}")
+        print(f"  BaseHTTPMiddleware x2: {legacy_rps:10.0f} req/s (status {legacy_status})")
+        print(f"  ASGI puro:             {current_rps:10.0f} req/s (status {current_status})")
+        print(f"  🚀 {current_rps / legacy_rps:.1f}x")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del middleware de autenticación")
+    parser.add_argument("--requests", type=int, default=5000, help="Peticiones por caso y variante")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("⏱️ BENCHMARK MIDDLEWARE DE AUTENTICACIÓN")
+    print("=" * 60)
+    asyncio.run(main_async(args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark de registrar-venta: envía tickets de N líneas y reporta percentiles por etapa
+
+Lee la cabecera Server-Timing de cada respuesta. Requiere el servidor corriendo
+y una caja abierta; las ventas quedan registradas en la sesión activa.
+"""
+import argparse
+import statistics
+import time
+import requests
+
+# Configuración
+BASE_URL = "http://localhost:8000"
+LOGIN_URL = f"{BASE_URL}/api/v1/auth/login"
+PRODUCTS_URL = f"{BASE_URL}/api/v1/products/"
+VENTA_URL = f"{BASE_URL}/api/v1/caja-ventas/registrar-venta"
+
+
+def parse_server_timing(value: str) -> dict:
+    """Convertir 'etapa;dur=1.23, otra;dur=4.5' en {'etapa': 1.23, 'otra': 4.5}"""
+    stages = {}
+    for metric in filter(None, (part.strip() for part in (value or "").split(","))):
+        name, _, params = metric.partition(";")
+        for param in params.split(";"):
+            key, _, number = param.partition("=")
+            if key.strip() == "dur":
+                stages[name.strip()] = float(number)
+    return stages
+
+
+def percentile(values: list, pct: float) -> float:
+    """Percentil por rango más cercano"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def benchmark(lines: int, requests_count: int, username: str, password: str):
+    """Ejecutar el benchmark"""
+    print("=" * 60)
+    print(f"⏱️ BENCHMARK REGISTRAR VENTA ({lines} líneas x {requests_count} tickets)")
+    print("=" * 60)
+    
+    response = requests.post(LOGIN_URL, data={"username": username, "password": password})
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    
+    products = requests.get(PRODUCTS_URL, headers=headers).json()
+    if not products:
+        print("❌ No hay productos para armar los tickets")
+        return
+    
+    items = [
+        {"product_id": products[i % len(products)]["id"], "quantity": 1, "price": 1000}
+        for i in range(lines)
+    ]
+    
+    samples = {}
+    errors = 0
+    for _ in range(requests_count):
+        start = time.perf_counter()
+        response = requests.post(
+            VENTA_URL,
+            json={"items": items, "payment_method": "efectivo", "notes": "benchmark"},
+            headers=headers
+        )
+        wall = (time.perf_counter() - start) * 1000
+        if response.status_code != 200:
+            errors += 1
+            continue
+        stages = parse_server_timing(response.headers.get("Server-Timing"))
+        stages["wall"] = wall
+        for name, duration in stages.items():
+            samples.setdefault(name, []).append(duration)
+    
+    if errors:
+        print(f"⚠️ {errors} peticiones fallaron")
+    
+    print(f"\n{'etapa':<12}{'p50':>10}{'p95':>10}{'p99':>10}{'media':>10}")
+    for name, values in samples.items():
+        print(
+            f"{name:<12}{percentile(values, 50):>10.2f}{percentile(values, 95):>10.2f}"
+            f"{percentile(values, 99):>10.2f}{statistics.mean(values):>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de registrar-venta")
+    parser.add_argument("--lines", type=int, default=30, help="Líneas por ticket")
+    parser.add_argument("--requests", type=int, default=200, help="Cantidad de tickets")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+    benchmark(args.lines, args.requests, args.username, args.password)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark del resumen de pedidos del día: seis consultas con func.date()
+contra una sola agregación condicional sobre un rango de fechas
+
+Usa una base de datos propia (por defecto un SQLite local) y la llena con un
+año de pedidos la primera vez. No ejecutar contra la base de producción.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import and_, create_engine, func, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import *  # noqa: F401,F403 - registrar todas las tablas
+from app.models.order import Order, OrderStatus
+from app.models.user import User, UserRole
+from app.services.order_service import OrderService, orders_summary_cache
+
+
+def legacy_orders_summary(db) -> dict:
+    """Implementación anterior: seis consultas con func.date(created_at)"""
+    today = datetime.now().date()
+    total_orders = db.query(Order).filter(func.date(Order.created_at) == today).count()
+    pending_orders = db.query(Order).filter(and_(
+        func.date(Order.created_at) == today,
+        Order.status.in_([OrderStatus.PENDING, OrderStatus.PREPARING])
+    )).count()
+    ready_orders = db.query(Order).filter(and_(
+        func.date(Order.created_at) == today, Order.status == OrderStatus.READY
+    )).count()
+    served_orders = db.query(Order).filter(and_(
+        func.date(Order.created_at) == today, Order.status == OrderStatus.SERVED
+    )).count()
+    paid_orders = db.query(Order).filter(and_(
+        func.date(Order.created_at) == today, Order.status == OrderStatus.PAID
+    )).count()
+    total_revenue = db.query(func.sum(Order.final_amount)).filter(and_(
+        func.date(Order.created_at) == today, Order.status == OrderStatus.PAID
+    )).scalar() or Decimal('0.00')
+    return {
+        "total_orders": total_orders,
+        "pending_orders": pending_orders,
+        "ready_orders": ready_orders,
+        "served_orders": served_orders,
+        "paid_orders": paid_orders,
+        "total_revenue": float(total_revenue)
+    }
+
+
+def seed_orders(db, days: int, orders_per_day: int):
+    """Crear un año (o `days` días) de pedidos terminando hoy"""
+    waiter = db.query(User).filter(User.username == "benchmark_mesero").first()
+    if not waiter:
+        waiter = User(
+            username="benchmark_mesero",
+            email="benchmark_mesero@example.com",
+            full_name="Mesero Benchmark",
+            hashed_password="x",
+            role=UserRole.MESERO
+        )
+        db.add(waiter)
+        db.commit()
+
+    statuses = list(OrderStatus)
+    today = date.today()
+    rows = []
+    for offset in range(days):
+        day = today - timedelta(days=offset)
+        for number in range(orders_per_day):
+            created_at = datetime.combine(day, datetime.min.time()) + timedelta(
+                seconds=random.randint(8 * 3600, 23 * 3600)
+            )
+            rows.append({
+                "order_number": f"B{day.strftime('%Y%m%d')}-{number:04d}",
+                "waiter_id": waiter.id,
+                "status": random.choice(statuses),
+                "final_amount": Decimal(random.randint(5000, 80000)),
+                "created_at": created_at
+            })
+        if len(rows) >= 5000:
+            db.execute(insert(Order), rows)
+            rows = []
+    if rows:
+        db.execute(insert(Order), rows)
+    db.commit()
+
+
+def timed(label: str, function, iterations: int) -> float:
+    """Ejecutar `function` varias veces y mostrar percentiles en ms"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p95 = samples[max(0, int(round(0.95 * len(samples))) - 1)]
+    print(f"  {label:<32} media={statistics.mean(samples):8.3f} ms  p50={statistics.median(samples):8.3f} ms  p95={p95:8.3f} ms")
+    return statistics.mean(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del resumen de pedidos del día")
+    parser.add_argument("--database-url", default="sqlite:///./benchmark_pedidos.db",
+                        help="Base de datos de pruebas (se crean las tablas si no existen)")
+    parser.add_argument("--days", type=int, default=365, help="Días de pedidos a generar")
+    parser.add_argument("--orders-per-day", type=int, default=150, help="Pedidos por día")
+    parser.add_argument("--iterations", type=int, default=50, help="Repeticiones por variante")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("⏱️ BENCHMARK RESUMEN DE PEDIDOS DEL DÍA")
+    print("=" * 60)
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    try:
+        existing = db.query(func.count(Order.id)).scalar()
+        if existing == 0:
+            print(f"📦 Generando {args.days * args.orders_per_day} pedidos ({args.days} días)...")
+            seed_orders(db, args.days, args.orders_per_day)
+        total = db.query(func.count(Order.id)).scalar()
+        print(f"📊 Pedidos en la base: {total}")
+
+        legacy = legacy_orders_summary(db)
+        current = OrderService.compute_orders_summary(db)
+        if legacy != current:
+            print(f"❌ Los resultados no coinciden:\n  anterior: {legacy}\n  nuevo:    {current}")
+            return
+        print(f"✅ Resultados idénticos: {current}")
+
+        print()
+        legacy_ms = timed("6 consultas con func.date()", lambda: legacy_orders_summary(db), args.iterations)
+        single_ms = timed("1 consulta con FILTER", lambda: OrderService.compute_orders_summary(db), args.iterations)
+        orders_summary_cache.clear()
+        cached_ms = timed("caché compartida (TTL)", lambda: OrderService.get_orders_summary(db), args.iterations)
+
+        print()
+        print(f"🚀 Consulta única: {legacy_ms / single_ms:.1f}x más rápida")
+        print(f"🚀 Con caché:      {legacy_ms / cached_ms:.1f}x más rápida")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,7 @@ from app.models.order import Order, OrderItem, OrderStatus, OrderPriority
 from app.models.inventory import InventoryMovement, MovementType
 from app.models.recipe import Recipe, RecipeItem
 from app.models.settings import SystemSettings
+from app.services.settings_service import SettingsService
 from app.auth.security import get_password_hash
 
 def create_users():
@@ -513,23 +514,24 @@ def create_system_settings():
     
     existing_settings = db.query(SystemSettings).first()
     if not existing_settings:
-        settings = SystemSettings(
-            company_name="Restaurante El Buen Sabor",
-            currency="COP",
-            timezone="America/Bogota",
-            primary_color="#667eea",
-            secondary_color="#764ba2",
-            accent_color="#28a745",
-            sidebar_color="#667eea",
-            app_title="Sistema POS - El Buen Sabor",
-            app_subtitle="Punto de Venta",
-            print_header="Restaurante El Buen Sabor\nCalle 15 #23-45\nTel: 3001234567",
-            print_footer="Gracias por su visita\n¡Vuelva pronto!",
-            enable_notifications=True,
-            low_stock_threshold=10
-        )
-        db.add(settings)
-        db.commit()
+        # set_setting actualiza la versión del snapshot que usa el servidor
+        for key, value in {
+            "business_name": "Restaurante El Buen Sabor",
+            "business_address": "Calle 15 #23-45",
+            "business_phone": "3001234567",
+            "currency": "COP",
+            "timezone": "America/Bogota",
+            "primary_color": "#667eea",
+            "secondary_color": "#764ba2",
+            "accent_color": "#28a745",
+            "sidebar_color": "#667eea",
+            "app_title": "Sistema POS - El Buen Sabor",
+            "app_subtitle": "Punto de Venta",
+            "receipt_footer": "Gracias por su visita\n¡Vuelva pronto!",
+            "enable_notifications": "true",
+            "low_stock_threshold": "10",
+        }.items():
+            SettingsService.set_setting(db, key, value)
         print("✅ Configuraciones del sistema creadas")
     else:
         print("ℹ️  Configuraciones del sistema ya existen")
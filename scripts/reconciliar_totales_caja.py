@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Script para reconciliar los totales acumulados de las sesiones de caja con sus movimientos
+"""
+import argparse
+import sys
+import os
+
+# Agregar el directorio raíz del proyecto al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.services.cash_service import CashService
+
+
+def reconciliar(session_id: int = None, fix: bool = False) -> int:
+    """Comparar totales de cada sesión contra el libro de movimientos"""
+    print("=" * 60)
+    print("🧮 RECONCILIACIÓN DE TOTALES DE CAJA")
+    print("=" * 60)
+    
+    db = SessionLocal()
+    try:
+        drifts = CashService.reconcile_session_totals(db, session_id=session_id, fix=fix)
+        
+        if not drifts:
+            print("✅ Todos los totales coinciden con los movimientos")
+            return 0
+        
+        for drift in drifts:
+            print(f"\n⚠️ Sesión {drift['session_number']} (ID: {drift['session_id']})")
+            for column, values in drift["differences"].items():
+                print(f"   - {column}: guardado={values['stored']} libro={values['ledger']}")
+        
+        if fix:
+            print(f"\n✅ Totales corregidos en {len(drifts)} sesiones")
+            return 0
+        
+        print(f"\n❌ {len(drifts)} sesiones con diferencias (use --fix para corregir)")
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconciliar totales de sesiones de caja")
+    parser.add_argument("--session-id", type=int, default=None, help="Solo esta sesión")
+    parser.add_argument("--fix", action="store_true", help="Reescribir los totales desde el libro")
+    args = parser.parse_args()
+    sys.exit(reconciliar(args.session_id, args.fix))
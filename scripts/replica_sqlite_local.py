@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Réplica de lectura local con SQLite para probar el enrutamiento de reportes
+
+Copia la base primaria a otro archivo con la API de respaldo de SQLite y anota
+el momento de la copia en `PRAGMA user_version`, que la aplicación usa como
+retraso de la réplica. Con `--interval` repite la copia, simulando una réplica
+que va N segundos atrás.
+
+    python scripts/replica_sqlite_local.py --primary ./restaurante_pos.db --replica ./replica.db --interval 10
+    DATABASE_REPLICA_URL=sqlite:///./replica.db uvicorn app.main:app
+
+Los reportes responden con `X-Data-Source: replica` o `primary`; la cabecera
+`X-Max-Staleness: 0` obliga a leer de la primaria.
+
+Con PostgreSQL se usa una réplica real (streaming replication) y el retraso se
+mide con pg_last_xact_replay_timestamp().
+"""
+import argparse
+import sqlite3
+import time
+
+
+def sync_replica(primary_path: str, replica_path: str) -> None:
+    """Copiar la primaria completa y marcar la hora de la copia"""
+    source = sqlite3.connect(primary_path)
+    target = sqlite3.connect(replica_path)
+    try:
+        source.backup(target)
+        target.execute(f"PRAGMA user_version = {int(time.time())}")
+        target.commit()
+    finally:
+        target.close()
+        source.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Réplica SQLite local para pruebas")
+    parser.add_argument("--primary", default="./restaurante_pos.db", help="Archivo SQLite primario")
+    parser.add_argument("--replica", default="./restaurante_pos_replica.db", help="Archivo de la réplica")
+    parser.add_argument("--interval", type=float, default=0,
+                        help="Segundos entre copias (0 = copiar una sola vez)")
+    args = parser.parse_args()
+
+    while True:
+        sync_replica(args.primary, args.replica)
+        print(f"✅ Réplica actualizada: {args.replica} ({time.strftime('%H:%M:%S')})")
+        if args.interval <= 0:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.database import get_db
 from app.models.settings import SystemSettings
 from app.services.cash_service import CashService
+from app.services.settings_service import SettingsService
 from app.models.user import User
 
 def setup_cash_register():
@@ -74,6 +75,10 @@ def setup_cash_register():
         else:
             print(f"✅ Requerimiento de caja ya existe: {existing_require.setting_value}")
         
+        # Avisar al servidor en ejecución que las configuraciones cambiaron
+        # (CashService puede confirmar la transacción en el paso siguiente)
+        SettingsService.bump_version(db)
+        
         # 4. Crear caja principal
         print("\n4️⃣ Creando caja principal...")
         cash_register = CashService.get_main_cash_register(db)
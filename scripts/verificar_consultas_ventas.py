@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Verificación de consultas del listado de ventas: cuenta las sentencias que
+emite GET /sales/ con páginas de distinto tamaño y falla si el número cambia.
+
+El listado debe costar lo mismo con 1 venta que con 100 (ventas con el
+cliente y después todos los items de la página); si vuelve a consultar por
+cada venta, su cliente o sus items, el conteo crece con la página. Usa una
+base de datos propia (por defecto un SQLite local) que llena la primera vez.
+Sale con código 1 si los conteos difieren, para poder usarlo en CI.
+"""
+import argparse
+import os
+import sys
+from decimal import Decimal
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, func, insert
+from sqlalchemy.orm import sessionmaker
+from pydantic import TypeAdapter
+
+from app.database import Base
+from app.models import *  # noqa: F401,F403 - registrar todas las tablas
+from app.models.user import User, UserRole
+from app.models.customer import Customer
+from app.models.product import Product, ProductType
+from app.models.sale import Sale, SaleItem, SaleStatus
+from app.schemas.sale import SaleWithDetails
+from app.routers import sales
+
+PAGE_SIZES = [1, 10, 100]
+ITEMS_PER_SALE = 3
+
+# Serializar como la respuesta del endpoint: las cargas perezosas también cuentan
+_SALE_LIST = TypeAdapter(List[SaleWithDetails])
+
+
+def seed(db, rows: int):
+    """Crear `rows` ventas con items; la mitad con cliente"""
+    user = User(username="consultas_admin", email="consultas_admin@example.com", full_name="Consultas",
+                hashed_password="x", role=UserRole.ADMIN)
+    customer = Customer(document_type="CC", document_number="CONSULTAS001", first_name="Cliente",
+                        last_name="Consultas")
+    products = [Product(name=f"Producto consultas {i}", price=Decimal(1000), product_type=ProductType.SALES)
+                for i in range(ITEMS_PER_SALE)]
+    db.add_all([user, customer, *products])
+    db.commit()
+
+    db.execute(insert(Sale), [{
+        "sale_number": f"CV{i:08d}",
+        "user_id": user.id,
+        "customer_id": customer.id if i % 2 else None,
+        "total": Decimal(ITEMS_PER_SALE * 1000),
+        "status": SaleStatus.COMPLETADA.value
+    } for i in range(rows)])
+    sale_ids = [sale_id for (sale_id,) in db.query(Sale.id).all()]
+    db.execute(insert(SaleItem), [{
+        "sale_id": sale_id,
+        "product_id": product.id,
+        "quantity": 1,
+        "unit_price": Decimal(1000),
+        "total": Decimal(1000)
+    } for sale_id in sale_ids for product in products])
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verificar que el listado de ventas no consulte por cada venta")
+    parser.add_argument("--database-url", default="sqlite:///./verificar_consultas_ventas.db",
+                        help="Base de datos de pruebas (se crean las tablas si no existen)")
+    parser.add_argument("--rows", type=int, default=max(PAGE_SIZES), help="Ventas a generar")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🔍 VERIFICACIÓN DE CONSULTAS DEL LISTADO DE VENTAS")
+    print("=" * 60)
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    if db.query(func.count(Sale.id)).scalar() < max(PAGE_SIZES):
+        print(f"📦 Generando {args.rows} ventas con {ITEMS_PER_SALE} items...")
+        seed(db, max(args.rows, max(PAGE_SIZES)))
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    counts = {}
+    for limit in PAGE_SIZES:
+        db.expunge_all()
+        statements.clear()
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            page = _SALE_LIST.validate_python(
+                sales.get_sales(skip=0, limit=limit, cursor=None, db=db, current_user=None),
+                from_attributes=True
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        db.rollback()
+
+        if len(page) != limit or any(len(sale.items) != ITEMS_PER_SALE for sale in page):
+            print(f"❌ Página de {limit}: se esperaban {limit} ventas con {ITEMS_PER_SALE} items cada una")
+            sys.exit(1)
+        counts[limit] = len(statements)
+        print(f"   Página de {limit:>3} ventas: {len(statements)} consultas")
+
+    db.close()
+    print()
+    if len(set(counts.values())) > 1:
+        print("❌ El número de consultas depende del tamaño de la página")
+        sys.exit(1)
+    print(f"✅ El listado usa {counts[PAGE_SIZES[0]]} consultas con cualquier tamaño de página")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Verificación de los eventos diferidos del bus (`publish_after_commit`): se
+publican al confirmar la transacción principal y se descartan si se revierte,
+también cuando en medio se revierte un savepoint (`begin_nested`).
+
+Usa una base SQLite en memoria propia. Sale con código 1 si algún caso falla,
+para poder usarlo en CI.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.services.event_bus import event_bus
+
+TOPIC = "verificacion.eventos"
+
+
+def main():
+    print("=" * 60)
+    print("🔍 VERIFICACIÓN DE EVENTOS DIFERIDOS DEL BUS")
+    print("=" * 60)
+
+    engine = create_engine("sqlite://")
+
+    # pysqlite no emite BEGIN ni SAVEPOINT por sí solo
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    Session = sessionmaker(bind=engine)
+    received = []
+    unsubscribe = event_bus.subscribe(TOPIC, lambda bus_event: received.append(bus_event.data["case"]))
+
+    def commit(db):
+        db.connection()
+        event_bus.publish_after_commit(db, TOPIC, {"case": "commit"})
+        db.commit()
+
+    def rollback(db):
+        db.connection()
+        event_bus.publish_after_commit(db, TOPIC, {"case": "rollback"})
+        db.rollback()
+
+    def savepoint_then_commit(db):
+        db.connection()
+        event_bus.publish_after_commit(db, TOPIC, {"case": "savepoint_then_commit"})
+        db.begin_nested().rollback()
+        db.commit()
+
+    def savepoint_then_rollback(db):
+        db.connection()
+        event_bus.publish_after_commit(db, TOPIC, {"case": "savepoint_then_rollback"})
+        db.begin_nested().rollback()
+        db.rollback()
+
+    checks = [
+        ("Commit publica", commit, ["commit"]),
+        ("Rollback descarta", rollback, []),
+        ("Savepoint revertido y commit publica", savepoint_then_commit, ["savepoint_then_commit"]),
+        ("Savepoint revertido y rollback descarta", savepoint_then_rollback, []),
+    ]
+
+    failures = 0
+    try:
+        for label, run, expected in checks:
+            received.clear()
+            db = Session()
+            try:
+                run(db)
+            finally:
+                db.close()
+            if received == expected:
+                print(f"✅ {label}")
+            else:
+                failures += 1
+                print(f"❌ {label}: se esperaba {expected}, se recibió {received}")
+    finally:
+        unsubscribe()
+
+    print()
+    if failures:
+        print(f"❌ {failures} caso(s) con eventos perdidos o de más")
+        sys.exit(1)
+    print("✅ Los eventos diferidos se publican solo al confirmar")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Verificación de planes de consulta: ejecuta los endpoints y servicios más
+consultados sobre tablas grandes de prueba, pide EXPLAIN de cada SELECT que
+emiten y falla si alguno recorre completa una tabla grande.
+
+Usa una base de datos propia (por defecto un SQLite local) que llena la primera
+vez. Con PostgreSQL se usa EXPLAIN (FORMAT JSON) y se buscan nodos "Seq Scan";
+con SQLite, EXPLAIN QUERY PLAN y pasos "SCAN". Sale con código 1 si hay
+recorridos completos, para poder usarlo en CI.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, func, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import *  # noqa: F401,F403 - registrar todas las tablas
+from app.models.user import User, UserRole
+from app.models.product import Product, ProductType
+from app.models.order import Order, OrderStatus
+from app.models.sale import Sale, SaleStatus
+from app.models.cash_register import CashRegister, CashSession, CashMovement, CashStatus, MovementType
+from app.models.inventory import InventoryMovement
+from app.services.cash_service import CashService
+from app.services.order_service import OrderService
+from app.services.inventory_service import InventoryService
+from app.routers import caja_ventas, sales, inventory
+
+# Tablas que crecen con el uso; en ellas un recorrido completo es un error
+LARGE_TABLES = ["orders", "sales", "cash_sessions", "cash_movements", "inventory_movements"]
+SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+
+
+def seed(db, rows: int, days: int):
+    """Llenar las tablas grandes con `rows` filas repartidas en `days` días"""
+    user = User(username="planes_admin", email="planes_admin@example.com", full_name="Planes",
+                hashed_password="x", role=UserRole.ADMIN)
+    register = CashRegister(register_number="PLAN001", name="Caja Planes")
+    product = Product(name="Insumo planes", price=0, product_type=ProductType.INVENTORY)
+    db.add_all([user, register, product])
+    db.commit()
+
+    now = datetime.now()
+    today = date.today()
+
+    def moment(i: int) -> datetime:
+        return now - timedelta(days=i % days, minutes=i % 600)
+
+    sessions = [{
+        "cash_register_id": register.id,
+        "user_id": user.id,
+        "session_number": f"PLAN-{day:04d}",
+        "opening_amount": Decimal("0"),
+        "opened_at": datetime.combine(today - timedelta(days=day), datetime.min.time()) + timedelta(hours=8),
+        "status": CashStatus.OPEN.value if day == 0 else CashStatus.CLOSED.value
+    } for day in range(days)]
+    db.execute(insert(CashSession), sessions)
+    session_ids = [session_id for (session_id,) in db.query(CashSession.id).order_by(CashSession.id).all()]
+
+    movement_types = [movement_type.value for movement_type in MovementType]
+    order_statuses = list(OrderStatus)
+    sale_statuses = [sale_status.value for sale_status in SaleStatus]
+
+    for start in range(0, rows, 5000):
+        batch = range(start, min(start + 5000, rows))
+        db.execute(insert(CashMovement), [{
+            "session_id": session_ids[i % days],
+            "movement_type": movement_types[i % len(movement_types)],
+            "amount": Decimal(1000),
+            "description": "Movimiento de prueba",
+            "created_at": moment(i)
+        } for i in batch])
+        db.execute(insert(Order), [{
+            "order_number": f"PL{i:08d}",
+            "waiter_id": user.id,
+            "status": order_statuses[i % len(order_statuses)],
+            "final_amount": Decimal(1000),
+            "created_at": moment(i)
+        } for i in batch])
+        db.execute(insert(Sale), [{
+            "sale_number": f"PLV{i:08d}",
+            "user_id": user.id,
+            "total": Decimal(1000),
+            "status": sale_statuses[i % len(sale_statuses)],
+            "created_at": moment(i)
+        } for i in batch])
+        db.execute(insert(InventoryMovement), [{
+            "product_id": product.id,
+            "user_id": user.id,
+            "adjustment_type": "salida",
+            "reason": "venta",
+            "quantity": 1,
+            "previous_stock": 1,
+            "new_stock": 0,
+            "created_at": moment(i)
+        } for i in batch])
+    db.commit()
+
+
+def explain(conn, statement: str, parameters) -> list:
+    """Tablas grandes recorridas completas por una sentencia"""
+    if conn.dialect.name == "postgresql":
+        plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        scans = []
+        pending = [plan[0]["Plan"]]
+        while pending:
+            node = pending.pop()
+            if node.get("Node Type") == "Seq Scan":
+                scans.append(node.get("Relation Name"))
+            pending.extend(node.get("Plans", []))
+        return scans
+
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return [match.group(1) for match in (SQLITE_SCAN.match(row[-1]) for row in rows) if match]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verificar que las consultas frecuentes usen índices")
+    parser.add_argument("--database-url", default="sqlite:///./verificar_planes.db",
+                        help="Base de datos de pruebas (se crean las tablas si no existen)")
+    parser.add_argument("--rows", type=int, default=20000, help="Filas por tabla grande")
+    parser.add_argument("--days", type=int, default=365, help="Días en los que se reparten las filas")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🔍 VERIFICACIÓN DE PLANES DE CONSULTA")
+    print("=" * 60)
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    if db.query(func.count(Order.id)).scalar() == 0:
+        print(f"📦 Generando {args.rows} filas por tabla grande...")
+        seed(db, args.rows, args.days)
+    with engine.begin() as conn:
+        for table in LARGE_TABLES:
+            conn.execute(text(f"ANALYZE {table}"))
+
+    register_id = db.query(CashRegister.id).scalar()
+    session_id = db.query(func.max(CashSession.id)).scalar()
+    today = date.today()
+
+    checks = [
+        ("Resumen de pedidos del día", lambda: OrderService.compute_orders_summary(db)),
+        ("Sesión activa de caja", lambda: CashService.get_active_session(db, register_id)),
+        ("Sesión de caja de hoy", lambda: CashService.get_today_session(db, register_id)),
+        ("Reporte diario de caja", lambda: CashService.get_daily_report(db, today)),
+        ("Conciliación de una sesión", lambda: CashService.reconcile_session_totals(db, session_id=session_id)),
+        ("Movimientos de la sesión", lambda: caja_ventas.get_movimientos_sesion(
+            session_id=session_id, skip=0, limit=100, db=db)),
+        ("Reporte diario de ventas", lambda: sales.get_daily_report(report_date=today, db=db, current_user=None)),
+        ("Reporte semanal de ventas", lambda: sales.get_weekly_report(db=db, current_user=None)),
+        ("Reporte diario de inventario", lambda: inventory.get_daily_inventory_report(
+            report_date=today, current_user=None, inventory_service=InventoryService(db))),
+    ]
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    failures = 0
+    for label, run in checks:
+        captured.clear()
+        event.listen(engine, "before_cursor_execute", capture)
+        error = None
+        try:
+            run()
+        except Exception as e:
+            error = e
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+        db.rollback()
+        
+        if error is not None:
+            failures += 1
+            print(f"❌ {label}: error al ejecutar ({error})")
+            continue
+
+        scans = set()
+        with engine.connect() as conn:
+            for statement, parameters in captured:
+                scans.update(table for table in explain(conn, statement, parameters) if table in LARGE_TABLES)
+
+        if scans:
+            failures += 1
+            print(f"❌ {label}: recorrido completo de {', '.join(sorted(scans))}")
+        else:
+            print(f"✅ {label} ({len(captured)} consultas)")
+
+    db.close()
+    print()
+    if failures:
+        print(f"❌ {failures} consulta(s) sin índice adecuado")
+        sys.exit(1)
+    print("✅ Todas las consultas usan índices")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,8 +18,8 @@ def test_imports():
         print(f"    ✅ Configuración cargada - Puerto: {settings.port}")
         
         print("  📦 Importando app.middleware...")
-        from app.middleware import AuthMiddleware, SessionTimeoutMiddleware
-        print("    ✅ Middlewares importados correctamente")
+        from app.middleware import AuthMiddleware
+        print("    ✅ Middleware importado correctamente")
         
         print("  📦 Importando app.main...")
         from app.main import app